@@ -7,8 +7,17 @@ import plotly.graph_objects as go
 import gspread
 from google.oauth2 import service_account
 from datetime import datetime
+import contextvars
+import hashlib
 import os
+import uuid
+from streamlit.runtime.uploaded_file_manager import UploadedFile
 from google import genai
+from carga_dados import (
+    URL_PLANILHA, carregar_dados, leitura_em_blocos, ler_planilha
+)
+from etapas_perfil import etapa, medido
+from perfil_dashboard import perfil_do_rerun
 
 # Configuração da página (mantido igual)
 st.set_page_config(
@@ -18,71 +27,116 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-@st.cache_data(ttl=300)
-def load_data(uploaded_file=None):
+# =============================================================================
+# UPLOADS: CACHE PELO CONTEÚDO (SHA-256) E LEITOR ESCOLHIDO PELOS BYTES INICIAIS
+# =============================================================================
+UPLOADS_EM_CACHE = 4                                  # Planilhas enviadas mantidas já lidas e limpas
+
+def digest_upload(uploaded_file):
+    """SHA-256 dos bytes do arquivo: o mesmo conteúdo tem a mesma chave, qualquer que seja o nome"""
+    return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+
+@st.cache_data(max_entries=UPLOADS_EM_CACHE, show_spinner="Lendo a planilha enviada...")
+def ler_upload(digest, _conteudo, projecao='analitica', _ao_progredir=None):
     """
-    Carrega dados do Google Sheets - PLANILHA relatorio_set_out
+    Planilha enviada já lida (e limpa, na projeção analítica), identificada pelo SHA-256 do conteúdo:
+    reenviar o mesmo arquivo, mesmo com outro nome, não lê nada de novo. `_conteudo` e
+    `_ao_progredir` não entram na chave. Sem elementos de interface aqui: ver ler_upload_com_progresso.
+    """
+    df = ler_planilha(_conteudo, projecao, ao_progredir=_ao_progredir)
+    return _marcar_impressao_digital(df) if projecao == 'analitica' else df
+
+def ler_upload_com_progresso(uploaded_file, projecao='analitica'):
     """
+    ler_upload com o progresso da leitura em blocos na sidebar. Chamada fora de qualquer função
+    cacheada: a barra é criada aqui e só aparece quando há leitura de fato (cache vazio), e as
+    atualizações rodam no contexto de fora do cache, para o st.cache_data não gravá-las e repeti-las
+    nos acertos seguintes.
+    """
+    conteudo = uploaded_file.getvalue()
+    if not leitura_em_blocos(conteudo):
+        return ler_upload(digest_upload(uploaded_file), conteudo, projecao)
+    
+    barra = st.sidebar.empty()
+    contexto = contextvars.copy_context()
+    
+    def ao_progredir(lidas, total):
+        texto = f"📥 {lidas:,} linhas lidas".replace(",", ".")
+        contexto.run(barra.progress, min(lidas / total, 1.0) if total else 0.0,
+                     text=texto + (f" de {total:,}".replace(",", ".") if total else ""))
+    
     try:
-        # Opção 1: Arquivo enviado via upload (prioridade) - MANTIDO IGUAL
-        if uploaded_file is not None:
-            try:
-                df = pd.read_excel(uploaded_file, sheet_name='dados', engine='openpyxl')
-                st.sidebar.success("✅ Arquivo carregado via upload")
-                return clean_data(df)
-            except:
-                try:
-                    df = pd.read_excel(uploaded_file, sheet_name='dados', engine='xlrd')
-                    st.sidebar.success("✅ Arquivo carregado via upload")
-                    return clean_data(df)
-                except Exception as e:
-                    st.sidebar.warning("⚠️ Erro no upload, usando Google Sheets")
-        
-        # Opção 2: Google Sheets - CORREÇÃO APENAS NA CONEXÃO
+        return ler_upload(digest_upload(uploaded_file), conteudo, projecao, _ao_progredir=ao_progredir)
+    finally:
+        barra.empty()
+
+def conta_servico():
+    """Credenciais da conta de serviço do Google Sheets em st.secrets (None se não configuradas)"""
+    try:
+        return st.secrets["relatorio_set_out_account"]
+    except Exception:
+        return None
+
+def _marcar_impressao_digital(df):
+    """
+    Guarda em df.attrs a impressão digital do conteúdo carregado. Calculada uma vez por carga
+    (o attrs sobrevive ao cache do st.cache_data), serve de chave para o que depende dos dados,
+    como o pré-cálculo do assistente: uma atualização do Sheets com o mesmo número de linhas muda a chave.
+    """
+    from novo_assistente import impressao_digital_dados
+    df.attrs['impressao_digital'] = impressao_digital_dados(df)
+    return df
+
+def carregar_base(uploaded_file=None):
+    """
+    Base do dashboard: a planilha enviada (prioridade) ou o load_data. Fica fora do cache para o
+    progresso da leitura em blocos do upload aparecer na sidebar; cada fonte tem o seu próprio cache.
+    """
+    # Opção 1: Arquivo enviado via upload (prioridade) - só as colunas do esquema analítico
+    if uploaded_file is not None:
         try:
-            # Configuração do Google Sheets API - MANTIDO
-            scope = [
-                'https://spreadsheets.google.com/feeds',
-                'https://www.googleapis.com/auth/drive',
-                'https://www.googleapis.com/auth/spreadsheets'
-            ]
-            
-            # CORREÇÃO: Nome correto do secret
-            credentials = service_account.Credentials.from_service_account_info(
-                st.secrets["relatorio_set_out_account"], scopes=scope  # Mudei apenas aqui
-            )
-            
-            client = gspread.authorize(credentials)
-            
-            sheet_url = "https://docs.google.com/spreadsheets/d/152DHhNzoLlUs0Vq_uRuVkfoq3C2A_lcJfJjambA6EWA/edit?gid=804702972#gid=804702972"
-            
-            # Abre a planilha pela URL - MANTIDO
-            spreadsheet = client.open_by_url(sheet_url)
-            
-            # Pega a primeira aba - MANTIDO
-            worksheet = spreadsheet.sheet1
-            
-            # Obtém TODOS os valores - MANTIDO
-            all_values = worksheet.get_all_values()
-            
-            if len(all_values) > 1:
-                headers = all_values[0]
-                data = all_values[1:]
-                df = pd.DataFrame(data, columns=headers)
-                
-                st.sidebar.success("✅ Dados carregados do Google Sheets")
-                return clean_data(df)  # Sua função clean_data mantida
-            else:
-                st.sidebar.warning("Planilha vazia")
-                return pd.DataFrame()  # Retorna DataFrame vazio
-            
+            df = ler_upload_com_progresso(uploaded_file)
+            st.sidebar.success("✅ Arquivo carregado via upload")
+            return df
         except Exception as e:
-            st.sidebar.info("📊 Google Sheets indisponível")
-            return pd.DataFrame()  # Retorna DataFrame vazio
-            
+            print(f"⚠️ Erro no upload: {e}")
+            st.sidebar.warning("⚠️ Erro no upload, usando Google Sheets")
+    
+    return load_data()
+
+@st.cache_data(ttl=300)
+def load_data():
+    """
+    Carrega dados do Google Sheets - PLANILHA relatorio_set_out
+    """
+    # Fonte injetada (benchmarks/testes, DASHBOARD_FONTE_DADOS) ou Google Sheets
+    try:
+        df, origem = carregar_dados(info_conta=conta_servico())
     except Exception as e:
-        st.sidebar.info("📋 Erro ao carregar dados")
+        print(f"⚠️ Erro ao carregar dados: {e}")
+        st.sidebar.info("📊 Google Sheets indisponível")
         return pd.DataFrame()  # SEMPRE retorna um DataFrame, nunca None
+    
+    if df.empty:
+        st.sidebar.warning("Planilha vazia")
+        return df
+    st.sidebar.success(f"✅ Dados carregados de {origem}" if origem != 'Google Sheets'
+                       else "✅ Dados carregados do Google Sheets")
+    return _marcar_impressao_digital(df)
+
+@st.cache_data(ttl=300, hash_funcs={UploadedFile: digest_upload})
+def load_colunas_extras(uploaded_file=None):
+    """
+    Colunas fora do esquema analítico (ex.: Contato), carregadas sob demanda.
+    O índice é o mesmo do load_data (posição da linha na origem), para juntar com df.join.
+    """
+    try:
+        if uploaded_file is not None:
+            return ler_upload(digest_upload(uploaded_file), uploaded_file.getvalue(), 'extras')
+        return carregar_dados(info_conta=conta_servico(), projecao='extras')[0]
+    except Exception as e:
+        print(f"⚠️ Erro ao carregar as colunas extras: {e}")
+        return pd.DataFrame()
 
 def test_relatorio_connection():
     """Testa a conexão com a planilha relatorio_set_out - CORREÇÃO APENAS NO SECRET"""
@@ -94,8 +148,7 @@ def test_relatorio_connection():
         )
         client = gspread.authorize(credentials)
         
-        sheet_url = "https://docs.google.com/spreadsheets/d/152DHhNzoLlUs0Vq_uRuVkfoq3C2A_lcJfJjambA6EWA/edit?gid=804702972#gid=804702972"
-        spreadsheet = client.open_by_url(sheet_url)
+        spreadsheet = client.open_by_url(URL_PLANILHA)
         
         st.success("✅ Conexão estabelecida com relatorio_set_out!")
         st.write(f"📊 Título: {spreadsheet.title}")
@@ -112,77 +165,29 @@ def test_relatorio_connection():
         st.error(f"❌ Erro: {e}")
         return False
     
-def corrigir_datas(df):
+# Filtros da sidebar: chave em filtros_ativos -> (coluna, opção que desativa o filtro)
+FILTROS_SIDEBAR = {
+    'atendente': ('Atendente', 'Todos'),
+    'modulo': ('Modulos', 'Todos'),
+    'uf': ('UF', 'TODOS'),
+    'categoria': ('Categorias', 'TODAS'),
+}
+
+@medido()
+def aplicar_filtros(df, filtros):
     """
-    Corrige problemas de conversão de datas do Google Sheets
+    Aplica os filtros da sidebar na mesma ordem do main: período e depois
+    atendente, módulo, UF e categoria. Sem Streamlit, para poder ser medida no benchmark.
     """
-    if 'Data' not in df.columns:
-        return df
-    
-    # Tentar diferentes formatos de data
-    date_formats = [
-        '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', 
-        '%d/%m/%y', '%d-%m-%y', '%m/%d/%Y',
-        '%Y/%m/%d'
-    ]
-    
-    for fmt in date_formats:
-        try:
-            df['Data'] = pd.to_datetime(df['Data'], format=fmt, errors='coerce')
-            # Verificar se conseguiu converter alguma data
-            if not df['Data'].isna().all():
-                break
-        except:
-            continue
+    if 'periodo' in filtros and 'Data' in df.columns:
+        inicio, fim = filtros['periodo']
+        datas = df['Data'].dt.date
+        df = df[(datas >= inicio) & (datas <= fim)]
     
-    # Se ainda não converteu, tentar método genérico
-    if df['Data'].isna().all():
-        df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
-    
-    # Remover registros com datas inválidas
-    datas_invalidas = df[df['Data'].isna()]
-    if len(datas_invalidas) > 0:
-        df = df.dropna(subset=['Data'])
-    
-    return df
-
-def clean_data(df):
-    """Função para limpeza e padronização dos dados"""
-    
-    # PRIMEIRO: Corrigir as datas
-    df = corrigir_datas(df)
-    
-    # Converter data (fallback)
-    date_columns = ['Data', 'DATA', 'data', 'Date', 'date']
-    for col in date_columns:
-        if col in df.columns and col != 'Data':
-            df['Data'] = pd.to_datetime(df[col], errors='coerce')
-            break
-    
-    # Se não encontrou coluna de data, criar uma dummy
-    if 'Data' not in df.columns or df['Data'].isna().all():
-        df['Data'] = pd.to_datetime('today')
-    
-    # Preencher valores vazios, nulos e espaços em branco
-    fill_columns = {
-        'UF': 'NÃO INFORMADO',
-        'Atendente': 'NÃO INFORMADO', 
-        'Categorias': 'NÃO INFORMADA',
-        'Tipos': 'NÃO INFORMADO',
-        'Modulos': 'NÃO INFORMADO',
-        'Canais': 'NÃO INFORMADO'
-    }
-    
-    for col, default_value in fill_columns.items():
-        if col in df.columns:
-            # Converter para string e tratar vários casos
-            df[col] = df[col].astype(str)
-            
-            # Substituir strings vazias, espaços e valores nulos
-            df[col] = df[col].replace(['', ' ', 'nan', 'NaN', 'None', 'null'], default_value)
-            
-            # Também tratar valores nulos do pandas
-            df[col] = df[col].fillna(default_value)
+    for chave, (coluna, todos) in FILTROS_SIDEBAR.items():
+        valor = filtros.get(chave)
+        if valor is not None and valor != todos and coluna in df.columns:
+            df = df[df[coluna] == valor]
     
     return df
 
@@ -608,13 +613,23 @@ def show_tipos_atendimento(df):
             st.plotly_chart(fig, use_container_width=True)
 
 # Função para mostrar dados completos
-def show_dados_completos(df):
+def show_dados_completos(df, carregar_extras=None):
+    """`carregar_extras`: função que devolve as colunas fora do esquema analítico (lidas só se pedidas)"""
     if df.empty:
         st.info("Nenhum dado encontrado com os filtros aplicados.")
         return
         
     st.subheader("📊 Dados Completos")
     
+    if carregar_extras is not None and st.toggle(
+        "📇 Incluir colunas de texto longo (ex.: Contato)",
+        key='dados_colunas_extras',
+        help="Essas colunas só são carregadas quando pedidas; valem para a tabela, a busca e o CSV."
+    ):
+        with st.spinner("Carregando colunas extras..."):
+            extras = carregar_extras()
+        df = df.join(extras[extras.columns.difference(df.columns)], how='left')
+    
     search_term = st.text_input("🔍 Buscar em todos os campos:")
     
     if search_term:
@@ -622,7 +637,10 @@ def show_dados_completos(df):
         for col in df.columns:
             if df[col].dtype == 'object':
                 mask = mask | df[col].astype(str).str.contains(search_term, case=False, na=False)
-        filtered_df = df[mask]
+            elif pd.api.types.is_string_dtype(df[col]):
+                # string[pyarrow]: a busca roda no Arrow, sem converter as células em objetos Python
+                mask = mask | df[col].str.contains(search_term, case=False, na=False)
+        filtered_df = df[mask.astype(bool)]
     else:
         filtered_df = df
     
@@ -715,25 +733,194 @@ def diagnostic_test():
 # FUNÇÃO DO ASSISTENTE IA 
 # =============================================================================
 
+INTERVALO_ATUALIZACAO_JOBS_S = 2  # Frequência com que o painel de respostas consulta os jobs pendentes
+
+def coletar_jobs_assistente():
+    """Move para o histórico os jobs concluídos e devolve os estados dos que ainda estão pendentes"""
+    from novo_assistente import estado_job, descartar_job
+
+    pendentes = []
+    for job_id in list(st.session_state.assistant_jobs):
+        estado = estado_job(job_id)
+        if estado is None:
+            # Job expirou no servidor
+            st.session_state.assistant_jobs.remove(job_id)
+            continue
+
+        if estado['status'] in ('na_fila', 'processando'):
+            pendentes.append(estado)
+            continue
+
+        if estado['status'] == 'erro':
+            error_msg = f"❌ Erro ao consultar assistente: {estado['erro']}"
+            # Se a análise local já estava pronta, ela continua sendo útil
+            resposta = estado['preliminar'] or error_msg
+        else:
+            resposta = estado['resposta']
+
+        nova_resposta = {
+            'id': job_id,
+            'pergunta': estado['pergunta'],
+            'resposta': resposta,
+            'preliminar': estado['preliminar'],
+            **estado['metadados']
+        }
+        st.session_state.assistant_responses.adicionar(nova_resposta)
+        st.session_state.last_response = resposta
+        st.session_state.last_preliminary = estado['preliminar']
+        st.session_state.last_route = nova_resposta.get('rota') or nova_resposta.get('modelo')
+
+        descartar_job(job_id)
+        st.session_state.assistant_jobs.remove(job_id)
+
+    return pendentes
+
+def id_consulta(resp):
+    """Identificador estável de uma consulta do histórico (o id do job; consultas antigas, sem id, usam hora + pergunta)"""
+    return resp.get('id') or f"{resp.get('timestamp')}|{resp['pergunta']}"
+
+def painel_respostas_assistente():
+    """Painel de respostas - roda como fragmento e se atualiza sozinho enquanto houver jobs pendentes"""
+    havia_jobs = bool(st.session_state.assistant_jobs)
+    pendentes = coletar_jobs_assistente()
+
+    # O run_every do fragmento foi fixado no último rerun completo: sem jobs pendentes,
+    # um rerun do app recria o fragmento sem atualização automática
+    if havia_jobs and not st.session_state.assistant_jobs:
+        st.rerun(scope="app")
+
+    # Perguntas na fila
+    if pendentes:
+        st.markdown("---")
+        st.subheader(f"⏳ Perguntas em andamento ({len(pendentes)})")
+        for estado in pendentes:
+            if estado['status'] == 'na_fila':
+                st.info(f"⏳ **{estado['pergunta'][:80]}** - aguardando vaga no Gemini, você é o {estado['posicao']}º da fila")
+            else:
+                st.info(f"🤖 **{estado['pergunta'][:80]}** - Gemini processando há {estado['segundos']:.0f}s")
+
+            if estado['preliminar']:
+                with st.expander("🕐 Resposta preliminar (análise local)"):
+                    st.caption("A resposta da IA substituirá este conteúdo assim que chegar.")
+                    st.markdown(estado['preliminar'])
+
+    # Mostrar última resposta
+    if st.session_state.last_response:
+        st.markdown("---")
+        st.subheader("📋 Resposta:")
+        st.markdown(st.session_state.last_response)
+
+        if st.button('📋 Copiar Resposta', key='copy_response'):
+            st.code(st.session_state.last_response, language='markdown')
+            st.success("✅ Resposta copiada para a área de transferência!")
+
+        # Resposta preliminar do modo corrida (quando diferente da final)
+        preliminar = st.session_state.get('last_preliminary')
+        if preliminar and preliminar != st.session_state.last_response:
+            with st.expander("🕐 Ver resposta preliminar (análise local)"):
+                st.markdown(preliminar)
+
+        # Informações do contexto
+        ultima = st.session_state.assistant_responses.ultima
+        if ultima:
+            with st.expander("ℹ️ Informações do contexto"):
+                st.write(f"**Modelo usado:** {st.session_state.get('last_route') or ultima.get('modelo')}")
+                st.write(f"**Registros analisados:** {ultima.get('registros')}")
+                st.write(f"**Data/hora:** {ultima.get('timestamp')}")
+
+    # Mostrar histórico de conversas
+    historico = st.session_state.assistant_responses
+    if len(historico) > 1:
+        st.markdown("---")
+        st.subheader("📚 Histórico de Consultas")
+
+        # Consultas antigas ficam em disco e só são lidas quando o usuário pede
+        anteriores = historico.recentes[:-1]
+        if historico.total_arquivadas and st.checkbox(
+            f"📦 Incluir {historico.total_arquivadas} consultas arquivadas", key='assistant_show_archived'
+        ):
+            anteriores = historico.carregar_arquivadas() + anteriores
+
+        # Do mais recente para o mais antigo (exceto o último que já está mostrado), pelo id da consulta:
+        # a escolha continua na mesma consulta quando uma resposta nova entra no histórico
+        por_id = {id_consulta(resp): resp for resp in reversed(anteriores)}
+        if st.session_state.get('assistant_history_choice') not in por_id:
+            st.session_state.assistant_history_choice = None
+        escolha = st.selectbox(
+            "Consultas anteriores",
+            options=[None] + list(por_id),
+            format_func=lambda i: "Selecione uma consulta para ver a resposta" if i is None
+                else f"🗨️ {por_id[i]['pergunta'][:50]}... - {por_id[i]['timestamp']}",
+            key='assistant_history_choice'
+        )
+
+        # Só a consulta escolhida é renderizada
+        if escolha is not None:
+            resp = por_id[escolha]
+            st.write(f"**Pergunta:** {resp['pergunta']}")
+            st.markdown("**Resposta:**")
+            st.markdown(resp['resposta'])
+            st.caption(f"Modelo: {resp.get('rota') or resp['modelo']} | Registros: {resp['registros']} | {resp['timestamp']}")
+
+DIGEST_IDADE_MAXIMA_H = 24  # Acima disso o resumo da manhã é sinalizado como desatualizado
+
+def show_digest_matinal():
+    """Mostra o resumo da manhã gerado em lote pelo digest_matinal.py (leitura instantânea do arquivo)"""
+    from digest_matinal import carregar_digest
+
+    digest = carregar_digest()
+    if not digest:
+        return
+
+    gerado_em = datetime.fromisoformat(digest['gerado_em'])
+    idade_h = (datetime.now() - gerado_em).total_seconds() / 3600
+    if idade_h < 1:
+        idade = f"há {idade_h * 60:.0f} min"
+    elif idade_h < 48:
+        idade = f"há {idade_h:.0f} h"
+    else:
+        idade = f"há {idade_h / 24:.0f} dias"
+    if idade_h > DIGEST_IDADE_MAXIMA_H:
+        st.warning(f"⚠️ O resumo da manhã foi gerado {idade} ({gerado_em.strftime('%d/%m/%Y %H:%M')}) e pode estar "
+                   "desatualizado. Confira o agendamento do digest_matinal.py.")
+
+    periodo = f" | Período: {digest['periodo'][0]} a {digest['periodo'][1]}" if digest.get('periodo') else ""
+    with st.expander(f"☀️ Resumo da manhã - gerado em {gerado_em.strftime('%d/%m/%Y %H:%M')} ({idade})"):
+        st.caption(f"Registros analisados: {digest['registros']}{periodo}")
+        for item in digest['respostas']:
+            st.markdown(f"**🗨️ {item['pergunta']}**")
+            st.markdown(item['resposta'])
+            st.markdown("---")
+
 def show_assistente_ia(df_filtrado, gemini_key=None):
     """Exibe a interface do assistente de IA com dados filtrados - VERSÃO FINAL CORRIGIDA"""
     st.header("🤖 Assistente de IA - Análise de Atendimentos")
     st.write("Faça perguntas em português sobre os dados de atendimentos e receba insights automatizados.")
     
     # Inicializar estado da sessão PARA O ASSISTENTE ESPECIFICAMENTE
-    if 'assistant_responses' not in st.session_state:
-        st.session_state.assistant_responses = []
     if 'current_question' not in st.session_state:
         st.session_state.current_question = ""
     if 'last_response' not in st.session_state:
         st.session_state.last_response = ""
-    if 'processing_question' not in st.session_state:
-        st.session_state.processing_question = False
+    if 'assistant_jobs' not in st.session_state:
+        # IDs dos jobs enviados ao pool e ainda não coletados
+        st.session_state.assistant_jobs = []
     if 'assistant_initialized' not in st.session_state:
         st.session_state.assistant_initialized = True      
-   
+    if 'assistant_session_id' not in st.session_state:
+        # Identifica a sessão na fila justa do limitador de chamadas ao Gemini
+        st.session_state.assistant_session_id = uuid.uuid4().hex
+    if 'assistant_responses' not in st.session_state:
+        from historico_assistente import HistoricoAssistente
+        
+        # Só as consultas mais recentes ficam em memória; as antigas vão para o disco
+        st.session_state.assistant_responses = HistoricoAssistente(st.session_state.assistant_session_id)
+
+    show_digest_matinal()
+
     # Configuração do modelo
     model_options = [
+        '🤖 Automático - Escolha pela Pergunta',
         '🚀 Gemini Pro - Análise Avançada',
         '⚡ Gemini Flash - Resposta Rápida' 
     ]
@@ -748,21 +935,36 @@ def show_assistente_ia(df_filtrado, gemini_key=None):
             key='assistant_model'
         )
     
-        if selected_model == '🚀 Gemini Pro - Análise Avançada':
+        if selected_model == '🤖 Automático - Escolha pela Pergunta':
+            st.caption("💡 Perguntas simples vão para o Flash; análises abertas, para o Pro")
+        elif selected_model == '🚀 Gemini Pro - Análise Avançada':
             st.caption("💡 Análises profundas e insights detalhados")
         elif selected_model == '⚡ Gemini Flash - Resposta Rápida':
             st.caption("💡 Respostas rápidas para perguntas simples")
+
+        modo_corrida = st.toggle(
+            "⚡ Mostrar resposta preliminar local enquanto a IA analisa",
+            value=True,
+            key='assistant_race_mode',
+            help="A análise local aparece em menos de um segundo e é substituída pela resposta da IA quando ela chegar."
+        )
+        
+        modo_ferramentas = st.toggle(
+            "🧰 Modo ferramentas (prompt enxuto)",
+            value=False,
+            key='assistant_tools_mode',
+            help="A IA recebe apenas o esquema dos dados e consulta contagens, rankings e séries diárias sob demanda."
+        )
     
     with col2:
         st.write("")
         st.write("")
         if st.button("🔄 Limpar Histórico", key='reset_assistant'):
-            st.session_state.assistant_responses = []
+            st.session_state.assistant_responses.limpar()
             st.session_state.last_response = ""
+            st.session_state.last_preliminary = None
             st.session_state.current_question = ""
-            st.session_state.processing_question = False
             st.success("✅ Histórico limpo!")
-            st.rerun()
     
     st.markdown("---")
     
@@ -778,108 +980,149 @@ def show_assistente_ia(df_filtrado, gemini_key=None):
     # Atualizar a pergunta atual no session_state
     st.session_state.current_question = user_question
     
-    col1, col2 = st.columns([1, 4])
+    consultar_button = st.button('🔍 Consultar Assistente', type='primary', key='assistant_btn')
+    
+    # ENVIAR A PERGUNTA PARA A FILA - não bloqueia a navegação pelos gráficos
+    if consultar_button and user_question:
+        from novo_assistente import submeter_job, classificar_complexidade
+        
+        tipo_modelo = selected_model
+        rota_descricao = None
+        if selected_model == '🤖 Automático - Escolha pela Pergunta':
+            rota = classificar_complexidade(user_question)
+            tipo_modelo = rota['modelo']
+            rota_descricao = f"Automático → {rota['modelo']} ({'; '.join(rota['motivos'])})"
+            print(f"🧭 Roteamento automático: {rota_descricao}")
+        
+        job_id = submeter_job(
+            pergunta=user_question,
+            df_filtrado=df_filtrado,
+            tipo_modelo=tipo_modelo,
+            gemini_key=gemini_key,
+            sessao_id=st.session_state.assistant_session_id,
+            modo="ferramentas" if modo_ferramentas else "relatorio",
+            corrida=modo_corrida,
+            # Impressão digital do recorte, se o pré-cálculo já a tiver: nada é recalculado no envio
+            chave_dados=(st.session_state.assistant_precalculo.chave_dados()
+                         if 'assistant_precalculo' in st.session_state else None),
+            metadados={
+                'modelo': tipo_modelo,
+                'rota': rota_descricao,
+                'timestamp': datetime.now().strftime('%d/%m/%Y %H:%M'),
+                'registros': len(df_filtrado)
+            }
+        )
+        st.session_state.assistant_jobs.append(job_id)
+        st.toast("📨 Pergunta enviada! Você pode continuar navegando enquanto a resposta chega.")
+    
+    # MOSTRAR RESPOSTAS - o fragmento só se atualiza sozinho enquanto houver jobs pendentes
+    intervalo = INTERVALO_ATUALIZACAO_JOBS_S if st.session_state.assistant_jobs else None
+    st.fragment(run_every=intervalo)(painel_respostas_assistente)()
+
+
+# =============================================================================
+# ÁREA ADMINISTRATIVA (TELEMETRIA DO ASSISTENTE)
+# =============================================================================
+
+def modo_admin():
+    """Aba de administração aparece só com ?admin=<token> na URL (token em [assistente] admin_token)"""
+    from novo_assistente import _ler_config
     
+    token = _ler_config("admin_token", "")
+    return bool(token) and st.query_params.get("admin") == token
+
+def show_admin():
+    """Telemetria do assistente: onde o tempo das consultas é gasto, por modelo e origem"""
+    from novo_assistente import carregar_telemetria, resumo_telemetria, METRICAS_TELEMETRIA
+    
+    st.header("🛠️ Telemetria do Assistente")
+    
+    telemetria = carregar_telemetria()
+    if telemetria.empty:
+        st.info("Nenhuma consulta registrada ainda.")
+        return
+    
+    cache = telemetria['cache_relatorio'].dropna()
+    fallback = telemetria['origem'] == 'fallback'
+    total_ms = pd.to_numeric(telemetria['total_ms'], errors='coerce')
+    
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        consultar_button = st.button('🔍 Consultar Assistente', type='primary', key='assistant_btn', use_container_width=True)
+        st.metric("Consultas registradas", len(telemetria))
+    with col2:
+        st.metric("Acerto do cache de relatório", f"{(cache == 'hit').mean():.0%}" if len(cache) else "-")
+    with col3:
+        st.metric("Respostas por fallback", f"{fallback.mean():.0%}")
+    with col4:
+        st.metric("Tempo total p95", f"{total_ms.quantile(0.95) / 1000:.1f}s")
     
+    metrica = st.selectbox("Métrica", METRICAS_TELEMETRIA, key='admin_metrica')
+    st.dataframe(resumo_telemetria(telemetria, metrica), use_container_width=True, hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Origem das respostas")
+        st.dataframe(telemetria['origem'].fillna('-').value_counts().rename('consultas'), use_container_width=True)
     with col2:
-        if st.session_state.last_response and not st.session_state.processing_question:
-            if st.button('📋 Copiar Resposta', key='copy_response', use_container_width=True):
-                st.code(st.session_state.last_response, language='markdown')
-                st.success("✅ Resposta copiada para a área de transferência!")
-    
-    # VERIFICAR SE HÁ UMA CONSULTA PENDENTE PARA PROCESSAR
-    if consultar_button and user_question and not st.session_state.processing_question:
-        # Marcar que estamos processando
-        st.session_state.processing_question = True
-        st.session_state.current_question = user_question
-        
-        # Armazenar a pergunta para processamento
-        st.session_state.pending_question = user_question
-        st.session_state.pending_model = selected_model
-        
-        # Forçar rerun imediatamente para mostrar o spinner
-        st.rerun()
+        st.subheader("Motivos de fallback")
+        motivos = telemetria['motivo_fallback'].dropna().value_counts().rename('consultas')
+        if motivos.empty:
+            st.caption("Nenhum fallback registrado.")
+        else:
+            st.dataframe(motivos, use_container_width=True)
     
-    # PROCESSAR A CONSULTA APÓS O RERUN (quando processing_question = True)
-    if st.session_state.get('processing_question', False) and st.session_state.get('pending_question'):
-        # Container para o spinner
-        processing_placeholder = st.empty()
-        
-        with processing_placeholder.container():
-            with st.spinner('🤔 Analisando os dados filtrados... Isso pode levar alguns segundos'):
-                try:
-                    # Importar e criar assistente
-                    from novo_assistente import consultar_assistente
-                    
-                    # Executar consulta com os dados pendentes
-                    resposta = consultar_assistente(
-                        pergunta=st.session_state.pending_question,
-                        df_filtrado=df_filtrado,
-                        tipo_modelo=st.session_state.pending_model,
-                        gemini_key=gemini_key
-
-                    )
-                    
-                    # Salvar no histórico
-                    nova_resposta = {
-                        'pergunta': st.session_state.pending_question,
-                        'resposta': resposta,
-                        'modelo': st.session_state.pending_model,
-                        'timestamp': datetime.now().strftime('%d/%m/%Y %H:%M'),
-                        'registros': len(df_filtrado)
-                    }
-                    
-                    st.session_state.assistant_responses.append(nova_resposta)
-                    st.session_state.last_response = resposta
-                    
-                except Exception as e:
-                    error_msg = f"❌ Erro ao consultar assistente: {str(e)}"
-                    st.error(error_msg)
-                    st.session_state.last_response = error_msg
-        
-        # Limpar estados de processamento
-        st.session_state.processing_question = False
-        st.session_state.pending_question = None
-        st.session_state.pending_model = None
-        
-        # Limpar o placeholder do spinner
-        processing_placeholder.empty()
-        
-        # Rerun final para mostrar a resposta
-        st.rerun()
+    with st.expander("📜 Últimas consultas"):
+        st.dataframe(telemetria.head(100), use_container_width=True, hide_index=True)
+
+def show_memoria(df):
+    """Quanto a base, os caches e as sessões estão ocupando (para dimensionar as réplicas)"""
+    from memoria_dashboard import (MEMORIA_ORCAMENTO_MB, caches_processo, rss_processo_mb,
+                                   uso_por_coluna, uso_sessoes, verificar_orcamento)
     
-    # MOSTRAR RESPOSTAS - APENAS quando não estiver processando
-    if not st.session_state.processing_question:
-        # Mostrar última resposta
-        if st.session_state.last_response:
-            st.markdown("---")
-            st.subheader("📋 Resposta:")
-            st.markdown(st.session_state.last_response)
-            
-            # Informações do contexto
-            with st.expander("ℹ️ Informações do contexto"):
-                st.write(f"**Modelo usado:** {selected_model}")
-                st.write(f"**Registros analisados:** {len(df_filtrado)}")
-                st.write(f"**Data/hora:** {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-        
-        # Mostrar histórico de conversas
-        if len(st.session_state.assistant_responses) > 1:
-            st.markdown("---")
-            st.subheader("📚 Histórico de Consultas")
-            
-            # Mostrar do mais recente para o mais antigo (exceto o último que já está mostrado)
-            for i, resp in enumerate(reversed(st.session_state.assistant_responses[:-1])):
-                with st.expander(f"🗨️ {resp['pergunta'][:50]}... - {resp['timestamp']}"):
-                    st.write(f"**Pergunta:** {resp['pergunta']}")
-                    st.markdown("**Resposta:**")
-                    st.markdown(resp['resposta'])
-                    st.caption(f"Modelo: {resp['modelo']} | Registros: {resp['registros']} | {resp['timestamp']}")
+    st.header("🧮 Memória")
+    
+    rss_mb, fonte_rss = rss_processo_mb()
+    _, excedido = verificar_orcamento()
+    colunas = uso_por_coluna(df)
+    caches = caches_processo()
+    sessoes = uso_sessoes()
+    
+    if excedido:
+        st.error(f"⚠️ Processo acima do orçamento de memória ({rss_mb:.0f} MB de {MEMORIA_ORCAMENTO_MB:.0f} MB)")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("RSS do processo", f"{rss_mb:.0f} MB" if rss_mb is not None else "-", help=f"Fonte: {fonte_rss}")
+    with col2:
+        st.metric("Orçamento", f"{MEMORIA_ORCAMENTO_MB:.0f} MB" if MEMORIA_ORCAMENTO_MB else "Sem limite")
+    with col3:
+        st.metric("Base carregada", f"{colunas['mb'].sum():.1f} MB")
+    with col4:
+        st.metric("Sessões ativas", len(sessoes))
+    
+    st.subheader("Base carregada por coluna")
+    st.dataframe(colunas, use_container_width=True, hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Caches do processo")
+        st.dataframe(caches, use_container_width=True, hide_index=True)
+    with col2:
+        st.subheader("Sessões (último rerun)")
+        if sessoes.empty:
+            st.caption("Nenhuma sessão registrada.")
+        else:
+            st.dataframe(sessoes, use_container_width=True, hide_index=True)
 
 
 # INTERFACE PRINCIPAL
 def main():
+    # Modo de perfil (?perfil=1 ou DASHBOARD_PERFIL=1): tempo de cada etapa em um expander da sidebar
+    with perfil_do_rerun(admin=modo_admin()):
+        montar_dashboard()
+
+
+def montar_dashboard():
     st.title("📊 Dashboard de Atendimentos - SAI")
     st.markdown("---")
     
@@ -887,7 +1130,9 @@ def main():
     uploaded_file = create_sidebar()
     
     # Carregar dados
-    df = load_data(uploaded_file)
+    with etapa("load_data"):
+        df = carregar_base(uploaded_file)
+        impressao_base = df.attrs.get('impressao_digital')
     
     if df.empty:
         st.info("""
@@ -905,10 +1150,14 @@ def main():
     st.sidebar.markdown("---")
     st.sidebar.header("📅 Filtros por Período")
     
+    # Estado dos filtros aplicados (usado como chave do pré-cálculo do assistente)
+    filtros_ativos = {}
+    
     if 'Data' in df.columns:
         # Garantir que as datas são válidas
-        df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
-        df = df.dropna(subset=['Data'])
+        with etapa("conversao_datas"):
+            df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
+            df = df.dropna(subset=['Data'])
         
         # Obter min e max reais dos dados
         min_date = df['Data'].min().date()
@@ -933,9 +1182,10 @@ def main():
                 max_value=max_date
             )
         
+        filtros_ativos['periodo'] = (start_date, end_date)
+        
         # Aplicar filtro diretamente
-        mask = (df['Data'].dt.date >= start_date) & (df['Data'].dt.date <= end_date)
-        df_filtered = df[mask]
+        df_filtered = aplicar_filtros(df, {'periodo': (start_date, end_date)})
         
         # Mostrar resultado do filtro
         st.sidebar.success(f"✅ Registros no período: {len(df_filtered)} de {len(df)}")
@@ -954,31 +1204,29 @@ def main():
     if 'Atendente' in df_filtered.columns:
         atendentes = ['Todos'] + sorted(df_filtered['Atendente'].unique().tolist())
         selected_atendente = st.sidebar.selectbox("Atendente", atendentes)
-        
-        if selected_atendente != 'Todos':
-            df_filtered = df_filtered[df_filtered['Atendente'] == selected_atendente]
+        filtros_ativos['atendente'] = selected_atendente
+        df_filtered = aplicar_filtros(df_filtered, {'atendente': selected_atendente})
     
     # Filtro de módulos
     if 'Modulos' in df_filtered.columns:
         modulos = ['Todos'] + sorted(df_filtered['Modulos'].unique().tolist())
         selected_modulo = st.sidebar.selectbox("Módulo", modulos)
-        
-        if selected_modulo != 'Todos':
-            df_filtered = df_filtered[df_filtered['Modulos'] == selected_modulo]
+        filtros_ativos['modulo'] = selected_modulo
+        df_filtered = aplicar_filtros(df_filtered, {'modulo': selected_modulo})
     
     # Filtro de UF
     if 'UF' in df_filtered.columns:
         uf_options = ['TODOS'] + sorted(df_filtered['UF'].unique().tolist())
         selected_uf = st.sidebar.selectbox("📍 UF", uf_options)
-        if selected_uf != 'TODOS':
-            df_filtered = df_filtered[df_filtered['UF'] == selected_uf]
+        filtros_ativos['uf'] = selected_uf
+        df_filtered = aplicar_filtros(df_filtered, {'uf': selected_uf})
     
     # Filtro de Categorias
     if 'Categorias' in df_filtered.columns:
         categoria_options = ['TODAS'] + sorted(df_filtered['Categorias'].unique().tolist())
         selected_categoria = st.sidebar.selectbox("📂 Categoria", categoria_options)
-        if selected_categoria != 'TODAS':
-            df_filtered = df_filtered[df_filtered['Categorias'] == selected_categoria]
+        filtros_ativos['categoria'] = selected_categoria
+        df_filtered = aplicar_filtros(df_filtered, {'categoria': selected_categoria})
 
     # =============================================================================
     # BUSCA E VERIFICAÇÃO DA CHAVE GEMINI (NOVO BLOCO CRÍTICO)
@@ -995,6 +1243,27 @@ def main():
     else:
         st.sidebar.error("❌ Chave Gemini NÃO encontrada. O Assistente IA estará desativado.")
     
+    # =============================================================================
+    # PRÉ-CÁLCULO DO CONTEXTO DO ASSISTENTE (EM SEGUNDO PLANO)
+    # =============================================================================
+    if st.sidebar.toggle(
+        "🧠 Pré-calcular contexto do assistente",
+        value=True,
+        key='assistant_precompute',
+        help="Monta o relatório do assistente em segundo plano assim que os filtros param de mudar."
+    ) and not df_filtered.empty:
+        from novo_assistente import PreCalculoContexto
+        
+        if 'assistant_precalculo' not in st.session_state:
+            st.session_state.assistant_precalculo = PreCalculoContexto()
+        
+        # Chave = estado dos filtros + conteúdo dos dados carregados
+        chave_filtros = (impressao_base, tuple(sorted(filtros_ativos.items())))
+        with etapa("precalculo_assistente"):
+            st.session_state.assistant_precalculo.agendar(chave_filtros, df_filtered)
+    elif 'assistant_precalculo' in st.session_state:
+        st.session_state.assistant_precalculo.cancelar_atual()
+    
     # =============================================================================
     # MÉTRICAS PRINCIPAIS
     # =============================================================================
@@ -1031,33 +1300,51 @@ def main():
     # =============================================================================
     
     st.markdown("---")
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+    nomes_abas = [
         "📈 Visão Geral", 
         "👥 Análise por Colaborador", 
         "📋 Tipos de Atendimento",
         "🔧 Análise por Módulo",
         "📊 Dados",
         "🤖 Assistente IA"
-    ])
+    ]
+    admin = modo_admin()
+    if admin:
+        nomes_abas.append("🛠️ Admin")
+    
+    abas = st.tabs(nomes_abas)
+    tab1, tab2, tab3, tab4, tab5, tab6 = abas[:6]
     
-    with tab1:
+    with tab1, etapa("show_overview"):
         show_overview(df_filtered)
     
-    with tab2:
+    with tab2, etapa("show_colaboradores"):
         show_colaboradores(df_filtered)
     
-    with tab3:
+    with tab3, etapa("show_tipos_atendimento"):
         show_tipos_atendimento(df_filtered)
     
-    with tab4:
+    with tab4, etapa("show_analise_modulos"):
         show_analise_modulos(df_filtered)
     
-    with tab5:
-        show_dados_completos(df_filtered)
+    with tab5, etapa("show_dados_completos"):
+        show_dados_completos(df_filtered, carregar_extras=lambda: load_colunas_extras(uploaded_file))
 
-    with tab6:  
+    with tab6, etapa("show_assistente_ia"):
         show_assistente_ia(df_filtered, gemini_key=gemini_key)
     
+    if admin:
+        with abas[6], etapa("show_admin"):
+            show_admin()
+            show_memoria(df)
+    
+    # Contabilidade de memória: fotografia desta sessão e aviso de orçamento no log
+    with etapa("memoria"):
+        from memoria_dashboard import registrar_sessao, verificar_orcamento
+        
+        registrar_sessao(st.session_state.get('assistant_session_id'), st.session_state, df_filtered)
+        verificar_orcamento()
+    
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
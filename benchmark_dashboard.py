@@ -0,0 +1,176 @@
+"""
+Benchmark de escala do dashboard com dados sintéticos (dados_sinteticos.py).
+
+Mede, para cada tamanho de base, clean_data, a cadeia de filtros da sidebar, cada show_*
+e criar_relatorio_supercompleto. Os resultados são acumulados em um JSONL com o commit atual,
+para comparar o desempenho entre commits:
+
+    python benchmark_dashboard.py --tamanhos 10000 100000 1000000 --repeticoes 3
+    python benchmark_dashboard.py --comparar      # compara com o último commit registrado
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from dados_sinteticos import gerar_atendimentos
+
+ARQUIVO_RESULTADOS = os.path.join("cache", "benchmark_dashboard.jsonl")
+TAMANHOS_PADRAO = [10_000, 100_000]
+
+
+def commit_atual():
+    """Hash curto do HEAD, marcado como '-modificado' se houver alterações não commitadas"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True, check=True).stdout.strip()
+        alterado = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        return f"{commit}-modificado" if alterado else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return {'mediana_ms': round(statistics.median(tempos), 2), 'min_ms': round(min(tempos), 2)}
+
+
+def silenciar_streamlit():
+    """
+    As funções show_* rodam sem servidor (modo "bare"): os avisos do Streamlit só poluem a saída.
+    O nível precisa ser ajustado depois que o Streamlit lê a própria configuração.
+    """
+    import streamlit.logger
+    from streamlit import config
+
+    config.get_option("logger.level")
+    streamlit.logger.set_log_level("error")
+
+
+def etapas_dashboard(df_bruto):
+    """Etapas medidas, na ordem em que o dashboard as executa: nome -> função sem argumentos"""
+    import app
+    from carga_dados import clean_data
+    from novo_assistente import criar_relatorio_supercompleto
+
+    # Mesmo preparo do main antes dos filtros
+    df = clean_data(df_bruto.copy())
+    df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
+    df = df.dropna(subset=['Data'])
+
+    fim = df['Data'].max().date()
+    filtros_periodo = {'periodo': (df['Data'].min().date(), fim)}
+    filtros_combinados = {
+        'periodo': (fim - timedelta(days=90), fim),
+        'atendente': df['Atendente'].value_counts().index[0],
+        'uf': 'SP',
+    }
+
+    return {
+        'clean_data': lambda: clean_data(df_bruto.copy()),
+        'filtros_periodo': lambda: app.aplicar_filtros(df, filtros_periodo),
+        'filtros_combinados': lambda: app.aplicar_filtros(df, filtros_combinados),
+        'show_overview': lambda: app.show_overview(df),
+        'show_colaboradores': lambda: app.show_colaboradores(df),
+        'show_tipos_atendimento': lambda: app.show_tipos_atendimento(df),
+        'show_analise_modulos': lambda: app.show_analise_modulos(df),
+        'show_dados_completos': lambda: app.show_dados_completos(df),
+        'criar_relatorio_supercompleto': lambda: criar_relatorio_supercompleto(df, ""),
+    }
+
+
+def executar_benchmark(tamanhos, repeticoes, semente=42):
+    commit = commit_atual()
+    momento = datetime.now().isoformat(timespec='seconds')
+    resultados = []
+
+    for tamanho in tamanhos:
+        print(f"\n📦 {tamanho:,} atendimentos".replace(",", "."))
+        df_bruto = gerar_atendimentos(tamanho, semente=semente)
+        for etapa, funcao in etapas_dashboard(df_bruto).items():
+            tempos = medir(funcao, repeticoes)
+            print(f"   {etapa:<32} {tempos['mediana_ms']:>10.1f} ms")
+            resultados.append({
+                'commit': commit,
+                'momento': momento,
+                'tamanho': tamanho,
+                'etapa': etapa,
+                'repeticoes': repeticoes,
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                **tempos,
+            })
+    return resultados
+
+
+def salvar_resultados(resultados, caminho=None):
+    caminho = caminho or ARQUIVO_RESULTADOS
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    with open(caminho, 'a', encoding='utf-8') as arquivo:
+        for resultado in resultados:
+            arquivo.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+    return caminho
+
+
+def carregar_resultados(caminho=None):
+    caminho = caminho or ARQUIVO_RESULTADOS
+    if not os.path.exists(caminho):
+        return pd.DataFrame()
+    return pd.read_json(caminho, lines=True)
+
+
+def comparar(resultados, historico, referencia=None):
+    """Tabela atual x referência (por padrão, a execução mais recente de outro commit)"""
+    atual = pd.DataFrame(resultados)
+    anteriores = historico[historico['commit'] != atual['commit'].iloc[0]] if not historico.empty else historico
+    if referencia:
+        anteriores = anteriores[anteriores['commit'] == referencia]
+    if anteriores.empty:
+        print("\nℹ️ Nenhuma execução de outro commit para comparar.")
+        return None
+
+    ultimo = anteriores.sort_values('momento').groupby(['tamanho', 'etapa']).last().reset_index()
+    tabela = atual.merge(ultimo[['tamanho', 'etapa', 'commit', 'mediana_ms']],
+                         on=['tamanho', 'etapa'], suffixes=('', '_ref'))
+    tabela['variacao'] = (tabela['mediana_ms'] / tabela['mediana_ms_ref'] - 1).map(lambda v: f"{v:+.0%}")
+    print(f"\n📊 Comparação com {', '.join(sorted(tabela['commit_ref'].unique()))}:")
+    print(tabela[['tamanho', 'etapa', 'mediana_ms_ref', 'mediana_ms', 'variacao']].to_string(index=False))
+    return tabela
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escala do dashboard de atendimentos")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default=None, help=f"Arquivo JSONL de resultados (padrão: {ARQUIVO_RESULTADOS})")
+    parser.add_argument('--comparar', nargs='?', const='', default=None, metavar='COMMIT',
+                        help="Compara com o commit informado (ou com o último commit registrado)")
+    args = parser.parse_args()
+
+    silenciar_streamlit()
+    historico = carregar_resultados(args.saida)
+    resultados = executar_benchmark(args.tamanhos, args.repeticoes, args.semente)
+    caminho = salvar_resultados(resultados, args.saida)
+    print(f"\n💾 Resultados acrescentados em {caminho}")
+
+    if args.comparar is not None:
+        comparar(resultados, historico, args.comparar or None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark ponta a ponta do dashboard: tempo de um rerun completo do app.py por interação,
+usando a API de testes do Streamlit (AppTest), sem navegador e sem Google Sheets.
+
+Os dados vêm de DASHBOARD_FONTE_DADOS (por padrão, dados sintéticos) e o assistente usa o
+backend simulado. Cada interação alterna entre dois estados, para que todo rerun medido
+tenha uma mudança real:
+
+    python benchmark_interacoes.py --linhas 100000 --repeticoes 10 --salvar-baseline
+    python benchmark_interacoes.py --linhas 100000 --repeticoes 10     # compara com o baseline
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmark_dashboard import commit_atual, silenciar_streamlit
+
+ARQUIVO_BASELINE = os.path.join("cache", "baseline_interacoes.json")
+TOLERANCIA_PADRAO = 0.25    # Regressão: mais de 25% acima do baseline...
+MARGEM_MINIMA_MS = 25.0     # ...e pelo menos 25 ms a mais (evita alarme por ruído em etapas rápidas)
+
+
+def _widget(colecao, rotulo):
+    for widget in colecao:
+        if widget.label == rotulo:
+            return widget
+    raise LookupError(f"Widget '{rotulo}' não encontrado no app")
+
+
+def _alternar_periodo(at, i, estado):
+    inicio = _widget(at.date_input, 'Data inicial')
+    if 'periodo_original' not in estado:
+        fim = _widget(at.date_input, 'Data final').value
+        estado['periodo_original'] = inicio.value
+        estado['periodo_alterado'] = inicio.value + timedelta(days=max(1, (fim - inicio.value).days // 2))
+    inicio.set_value(estado['periodo_alterado'] if i % 2 == 0 else estado['periodo_original'])
+
+
+def _alternar_selecao(rotulo, todos):
+    def alternar(at, i, estado):
+        caixa = _widget(at.selectbox, rotulo)
+        opcoes = [opcao for opcao in caixa.options if opcao != todos]
+        caixa.set_value(opcoes[0] if i % 2 == 0 and opcoes else todos)
+    return alternar
+
+
+def _alternar_busca(termo):
+    def alternar(at, i, estado):
+        _widget(at.text_input, '🔍 Buscar em todos os campos:').input(termo if i % 2 == 0 else "")
+    return alternar
+
+
+def interacoes(termo_busca):
+    """Interações medidas: nome -> função(at, repetição, estado) que altera um widget"""
+    return {
+        'rerun_sem_mudanca': lambda at, i, estado: None,
+        'periodo': _alternar_periodo,
+        'atendente': _alternar_selecao('Atendente', 'Todos'),
+        'modulo': _alternar_selecao('Módulo', 'Todos'),
+        'busca_dados': _alternar_busca(termo_busca),
+    }
+
+
+def executar(app, linhas, repeticoes, termo_busca, precalculo=False, timeout=300):
+    from streamlit.testing.v1 import AppTest
+
+    os.environ['DASHBOARD_FONTE_DADOS'] = f"sintetico:{linhas}"
+    at = AppTest.from_file(app, default_timeout=timeout)
+    at.secrets['assistente'] = {'backend': 'simulado', 'telemetria': False}
+
+    inicio = time.perf_counter()
+    at.run()
+    carga_inicial_ms = (time.perf_counter() - inicio) * 1000
+    if at.exception:
+        raise RuntimeError(f"O app falhou na carga inicial: {at.exception[0].message}")
+
+    if not precalculo:
+        # O pré-cálculo do assistente roda em segundo plano e adicionaria ruído às medições
+        at.toggle(key='assistant_precompute').set_value(False).run()
+
+    resultados = {'carga_inicial': {'amostras_ms': [round(carga_inicial_ms, 1)]}}
+    for nome, alterar in interacoes(termo_busca).items():
+        estado = {}
+        tempos = []
+        for i in range(repeticoes):
+            alterar(at, i, estado)
+            inicio = time.perf_counter()
+            at.run()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            if at.exception:
+                raise RuntimeError(f"O app falhou na interação '{nome}': {at.exception[0].message}")
+        if repeticoes % 2:
+            # Volta ao estado inicial antes da próxima interação (rerun não medido)
+            alterar(at, repeticoes, estado)
+            at.run()
+        resultados[nome] = {'amostras_ms': [round(t, 1) for t in tempos]}
+
+    for nome, resultado in resultados.items():
+        amostras = resultado['amostras_ms']
+        resultado['p50_ms'] = round(float(np.percentile(amostras, 50)), 1)
+        resultado['p95_ms'] = round(float(np.percentile(amostras, 95)), 1)
+    return resultados
+
+
+def comparar_com_baseline(resultados, baseline, tolerancia, margem_ms):
+    """Lista as interações cujo p50 ou p95 piorou além da tolerância"""
+    regressoes = []
+    for nome, atual in resultados.items():
+        referencia = baseline.get('interacoes', {}).get(nome)
+        if not referencia:
+            continue
+        for percentil in ('p50_ms', 'p95_ms'):
+            antes, agora = referencia[percentil], atual[percentil]
+            if agora > antes * (1 + tolerancia) and agora - antes > margem_ms:
+                regressoes.append((nome, percentil, antes, agora))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de reruns do dashboard por interação (AppTest)")
+    parser.add_argument('--app', default='app.py')
+    parser.add_argument('--linhas', type=int, default=50000, help="Registros sintéticos carregados")
+    parser.add_argument('--repeticoes', type=int, default=10)
+    parser.add_argument('--termo-busca', default='Fiscal')
+    parser.add_argument('--com-precalculo', action='store_true', help="Mantém o pré-cálculo do assistente ligado")
+    parser.add_argument('--baseline', default=ARQUIVO_BASELINE)
+    parser.add_argument('--salvar-baseline', action='store_true', help="Grava esta execução como baseline")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO)
+    parser.add_argument('--margem-ms', type=float, default=MARGEM_MINIMA_MS)
+    args = parser.parse_args()
+
+    silenciar_streamlit()
+    print(f"🚀 {args.linhas} registros sintéticos, {args.repeticoes} reruns por interação")
+    resultados = executar(args.app, args.linhas, args.repeticoes, args.termo_busca, args.com_precalculo)
+
+    print(f"\n{'interação':<20} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for nome, resultado in resultados.items():
+        print(f"{nome:<20} {resultado['p50_ms']:>10.1f} {resultado['p95_ms']:>10.1f}")
+
+    if args.salvar_baseline:
+        pasta = os.path.dirname(args.baseline)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        baseline = {
+            'commit': commit_atual(),
+            'momento': datetime.now().isoformat(timespec='seconds'),
+            'linhas': args.linhas,
+            'repeticoes': args.repeticoes,
+            'interacoes': resultados,
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as arquivo:
+            json.dump(baseline, arquivo, ensure_ascii=False, indent=2)
+        print(f"\n💾 Baseline salvo em {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nℹ️ Sem baseline em {args.baseline}; use --salvar-baseline para criar um.")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as arquivo:
+        baseline = json.load(arquivo)
+    if baseline.get('linhas') != args.linhas:
+        print(f"\n⚠️ Baseline medido com {baseline.get('linhas')} registros; a comparação pode não ser justa.")
+
+    regressoes = comparar_com_baseline(resultados, baseline, args.tolerancia, args.margem_ms)
+    if not regressoes:
+        print(f"\n✅ Nenhuma regressão em relação ao baseline ({baseline.get('commit')})")
+        return 0
+
+    print(f"\n❌ Regressões em relação ao baseline ({baseline.get('commit')}):")
+    for nome, percentil, antes, agora in regressoes:
+        print(f"   {nome:<20} {percentil}: {antes:.1f} → {agora:.1f} ms ({agora / antes - 1:+.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
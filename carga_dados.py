@@ -0,0 +1,336 @@
+"""
+Carga e limpeza dos dados de atendimentos, sem Streamlit.
+
+Usado pelo dashboard (app.py, que acrescenta o cache e as mensagens da sidebar) e por scripts
+sem interface, como o digest_matinal.py: o mesmo esquema de colunas, os mesmos leitores
+(planilha enviada, arquivo local, fonte injetada ou Google Sheets) e o mesmo clean_data.
+
+    df, origem = carregar_dados(info_conta=credenciais_da_conta_de_servico)
+"""
+
+import importlib.util
+import io
+import os
+
+import gspread
+import pandas as pd
+from google.oauth2 import service_account
+
+from ingestao_planilha import ler_xlsx_em_blocos
+from leitura_sheets import ler_colunas_paginadas
+from etapas_perfil import etapa, medido
+
+# =============================================================================
+# ESQUEMA DA ABA 'dados': QUAIS COLUNAS SÃO CARREGADAS
+# =============================================================================
+# Colunas usadas pelas análises e pelo assistente: carregadas sempre, com tipo fixo
+# (None = tipo decidido pelo leitor; a Data é convertida depois, em corrigir_datas)
+COLUNAS_ANALITICAS = {
+    'Data': None,
+    'UF': str,
+    'Atendente': str,
+    'Categorias': str,
+    'Tipos': str,
+    'Modulos': str,
+    'Canais': str,
+    'Cliente': str,
+    'Nucleos': str,
+    'Produtos': str,
+}
+# Outros nomes de coluna de data aceitos pelo clean_data
+COLUNAS_DATA_ALTERNATIVAS = ['DATA', 'data', 'Date', 'date']
+TIPOS_ANALITICOS = {coluna: tipo for coluna, tipo in COLUNAS_ANALITICAS.items() if tipo is not None}
+
+# Texto com muitos valores distintos: guardado como string[pyarrow] quando o pyarrow está instalado
+# (DASHBOARD_TEXTO_ARROW=0 desliga). Cada célula object custa 50+ bytes de overhead de objeto Python;
+# no Arrow o texto fica num buffer contínuo e str.contains/value_counts rodam no Arrow compute.
+COLUNAS_TEXTO_ARROW = ['Cliente', 'Contato', 'Produtos', 'Nucleos']
+try:
+    import pyarrow  # noqa: F401
+    TEXTO_ARROW = os.getenv('DASHBOARD_TEXTO_ARROW', '1') != '0'
+except ImportError:
+    TEXTO_ARROW = False
+
+def para_texto_arrow(df, colunas=None):
+    """Converte as colunas de texto (object) para string[pyarrow]; sem pyarrow, devolve o df como está"""
+    if not TEXTO_ARROW:
+        return df
+    for col in (COLUNAS_TEXTO_ARROW if colunas is None else colunas):
+        if col in df.columns and df[col].dtype == 'object':
+            df[col] = df[col].astype('string[pyarrow]')
+    return df
+
+def coluna_analitica(nome):
+    return nome in COLUNAS_ANALITICAS or nome in COLUNAS_DATA_ALTERNATIVAS
+
+def coluna_extra(nome):
+    """Demais colunas (texto largo, como Contato): só carregadas pela aba Dados e pela exportação"""
+    return not coluna_analitica(nome)
+
+def carregar_fonte_injetada(fonte, colunas=coluna_analitica):
+    """
+    Fonte de dados definida em DASHBOARD_FONTE_DADOS, para benchmarks e testes sem o Google Sheets:
+    "sintetico:<linhas>[:<semente>]" gera dados com dados_sinteticos; qualquer outro valor é
+    o caminho de uma planilha (aba 'dados') ou de um CSV. `colunas` escolhe as colunas pelo nome.
+    """
+    if fonte.startswith('sintetico'):
+        from dados_sinteticos import gerar_atendimentos
+        
+        partes = fonte.split(':')
+        linhas = int(partes[1]) if len(partes) > 1 else 10000
+        semente = int(partes[2]) if len(partes) > 2 else 42
+        df = gerar_atendimentos(linhas, semente=semente)
+        return df[[coluna for coluna in df.columns if colunas(coluna)]]
+    
+    if fonte.lower().endswith('.csv'):
+        return pd.read_csv(fonte, dtype=str, keep_default_na=False, usecols=colunas)
+    return pd.read_excel(fonte, sheet_name='dados', usecols=colunas, dtype=TIPOS_ANALITICOS)
+
+# =============================================================================
+# PLANILHAS EXCEL: LEITOR ESCOLHIDO PELOS BYTES INICIAIS
+# =============================================================================
+ASSINATURA_XLSX = b'PK\x03\x04'                       # .xlsx é um zip (Office Open XML)
+ASSINATURA_XLS = bytes.fromhex('D0CF11E0A1B11AE1')    # .xls é um documento OLE2 (Excel 97-2003)
+# Leitor em Rust (pacote python-calamine, pandas >= 2.2): bem mais rápido que o openpyxl
+CALAMINE_DISPONIVEL = importlib.util.find_spec('python_calamine') is not None
+# .xlsx a partir deste tamanho são lidos em blocos (memória limitada, com progresso)
+INGESTAO_BLOCOS_MIN_MB = float(os.getenv('DASHBOARD_INGESTAO_BLOCOS_MB', 5))
+
+def motor_excel(conteudo):
+    """Engine do pd.read_excel pelo formato real do arquivo (a extensão pode mentir)"""
+    if conteudo.startswith(ASSINATURA_XLSX):
+        return 'openpyxl'
+    if conteudo.startswith(ASSINATURA_XLS):
+        return 'xlrd'
+    raise ValueError("O arquivo enviado não é uma planilha Excel (.xlsx ou .xls)")
+
+def _ler_excel(conteudo, colunas, tipos=None):
+    """Lê a aba 'dados' dos bytes enviados, só com as colunas pedidas"""
+    motor = motor_excel(conteudo)
+    if CALAMINE_DISPONIVEL:
+        try:
+            return pd.read_excel(io.BytesIO(conteudo), sheet_name='dados', engine='calamine',
+                                 usecols=colunas, dtype=tipos)
+        except Exception as e:
+            print(f"⚠️ calamine falhou ({e}); lendo com {motor}")
+    return pd.read_excel(io.BytesIO(conteudo), sheet_name='dados', engine=motor, usecols=colunas, dtype=tipos)
+
+def leitura_em_blocos(conteudo):
+    """.xlsx grandes são lidos em blocos; os demais, de uma vez pelo pd.read_excel"""
+    return motor_excel(conteudo) == 'openpyxl' and len(conteudo) >= INGESTAO_BLOCOS_MIN_MB * 1024 * 1024
+
+def ler_planilha(conteudo, projecao='analitica', ao_progredir=None):
+    """
+    Aba 'dados' dos bytes de uma planilha, já limpa. Projeção 'analitica' = esquema das análises
+    (clean_data); 'extras' = demais colunas, como texto. .xlsx grandes são lidos em blocos e
+    chamam ao_progredir(linhas lidas, total estimado) a cada bloco.
+    """
+    if projecao == 'extras':
+        colunas, tipos, limpar = coluna_extra, str, limpar_extras
+    else:
+        colunas, tipos, limpar = coluna_analitica, TIPOS_ANALITICOS, clean_data
+
+    if leitura_em_blocos(conteudo):
+        # Arquivo grande: linhas lidas e limpas em blocos, sem materializar a aba inteira
+        if limpar is clean_data:
+            limpar = _limpeza_em_blocos()
+        return ler_xlsx_em_blocos(conteudo, colunas, tipos, limpar, ao_progredir=ao_progredir)
+    return limpar(_ler_excel(conteudo, colunas, tipos))
+
+def _limpeza_em_blocos():
+    """
+    clean_data para a leitura em blocos: o formato da Data é detectado no primeiro bloco que tem
+    datas e repassado aos seguintes, para que um bloco não seja lido com outro formato (ex.: dia/mês
+    num bloco e mês/dia no seguinte) só porque a detecção deu outro resultado nele.
+    """
+    formato = {}
+    
+    def limpar(bloco):
+        if 'data' not in formato and 'Data' in bloco.columns:
+            detectado = detectar_formato_data(bloco['Data'])
+            if detectado is not None:
+                formato['data'] = detectado
+        return clean_data(bloco, formato.get('data'))
+    return limpar
+
+def limpar_extras(df):
+    return para_texto_arrow(df.fillna(''), df.columns)
+
+# =============================================================================
+# GOOGLE SHEETS
+# =============================================================================
+URL_PLANILHA = "https://docs.google.com/spreadsheets/d/152DHhNzoLlUs0Vq_uRuVkfoq3C2A_lcJfJjambA6EWA/edit?gid=804702972#gid=804702972"
+ESCOPOS_PLANILHA = [
+    'https://spreadsheets.google.com/feeds',
+    'https://www.googleapis.com/auth/drive',
+    'https://www.googleapis.com/auth/spreadsheets'
+]
+
+def abrir_planilha(info_conta):
+    """Primeira aba da planilha relatorio_set_out, com as credenciais da conta de serviço (dict)"""
+    if not info_conta:
+        raise ValueError("Credenciais da conta de serviço (relatorio_set_out_account) não configuradas")
+    credentials = service_account.Credentials.from_service_account_info(info_conta, scopes=ESCOPOS_PLANILHA)
+    client = gspread.authorize(credentials)
+    return client.open_by_url(URL_PLANILHA).sheet1
+
+def ler_colunas_planilha(worksheet, colunas):
+    """
+    Lê do Google Sheets só as colunas cujo cabeçalho passa em `colunas`, em páginas de linhas
+    lidas em paralelo (leitura_sheets), em vez de um get_all_values da aba inteira.
+    Devolve {coluna: lista de textos}, já no formato colunar (sem montar linhas).
+    """
+    return ler_colunas_paginadas(worksheet, colunas)
+
+# =============================================================================
+# LIMPEZA
+# =============================================================================
+# Formatos tentados, em ordem, para a coluna de datas
+FORMATOS_DATA = [
+    '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', 
+    '%d/%m/%y', '%d-%m-%y', '%m/%d/%Y',
+    '%Y/%m/%d'
+]
+
+def detectar_formato_data(datas):
+    """
+    Primeiro formato de FORMATOS_DATA que converte alguma data (None = nenhum; usa a conversão genérica)
+    """
+    for fmt in FORMATOS_DATA:
+        try:
+            if pd.to_datetime(datas, format=fmt, errors='coerce').notna().any():
+                return fmt
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def converter_datas(datas, formato=None):
+    """
+    Converte a coluna de datas do Google Sheets para datetime (NaT onde não converter).
+    Sem `formato`, ele é detectado nos próprios valores; a leitura em blocos detecta uma vez
+    e repassa o mesmo formato a todos os blocos, que o aplicam sem nova detecção.
+    """
+    if formato is not None:
+        return pd.to_datetime(datas, format=formato, errors='coerce')
+    
+    formato = detectar_formato_data(datas)
+    if formato is not None:
+        return pd.to_datetime(datas, format=formato, errors='coerce')
+    
+    # Se não converteu, tentar método genérico
+    return pd.to_datetime(datas, errors='coerce')
+
+def corrigir_datas(df, formato_data=None):
+    """
+    Corrige problemas de conversão de datas do Google Sheets
+    """
+    if 'Data' not in df.columns:
+        return df
+    
+    df['Data'] = converter_datas(df['Data'], formato_data)
+    
+    # Remover registros com datas inválidas
+    datas_invalidas = df[df['Data'].isna()]
+    if len(datas_invalidas) > 0:
+        df = df.dropna(subset=['Data'])
+    
+    return df
+
+# Valor usado no lugar de vazios/nulos em cada coluna categórica
+VALORES_PADRAO = {
+    'UF': 'NÃO INFORMADO',
+    'Atendente': 'NÃO INFORMADO', 
+    'Categorias': 'NÃO INFORMADA',
+    'Tipos': 'NÃO INFORMADO',
+    'Modulos': 'NÃO INFORMADO',
+    'Canais': 'NÃO INFORMADO'
+}
+VALORES_VAZIOS = ['', ' ', 'nan', 'NaN', 'None', 'null']
+
+@medido()
+def clean_data(df, formato_data=None):
+    """Função para limpeza e padronização dos dados (formato_data: formato já detectado, ver converter_datas)"""
+    
+    # PRIMEIRO: Corrigir as datas
+    df = corrigir_datas(df, formato_data)
+    
+    # Converter data (fallback)
+    date_columns = ['Data', 'DATA', 'data', 'Date', 'date']
+    for col in date_columns:
+        if col in df.columns and col != 'Data':
+            df['Data'] = pd.to_datetime(df[col], errors='coerce')
+            break
+    
+    # Se não encontrou coluna de data, criar uma dummy
+    if 'Data' not in df.columns or df['Data'].isna().all():
+        df['Data'] = pd.to_datetime('today')
+    
+    # Preencher valores vazios, nulos e espaços em branco
+    for col, default_value in VALORES_PADRAO.items():
+        if col in df.columns:
+            df[col] = preencher_vazios(df[col], default_value)
+    
+    return para_texto_arrow(df)
+
+def preencher_vazios(serie, default_value):
+    # Converter para string e tratar vários casos
+    serie = serie.astype(str)
+    
+    # Substituir strings vazias, espaços e valores nulos
+    serie = serie.replace(VALORES_VAZIOS, default_value)
+    
+    # Também tratar valores nulos do pandas
+    return serie.fillna(default_value)
+
+def montar_dataframe_planilha(colunas):
+    """
+    DataFrame limpo direto das colunas do Google Sheets ({coluna: lista de textos}), com o mesmo
+    resultado de clean_data(pd.DataFrame(colunas)), mas trabalhando sobre os rótulos distintos:
+    cada data/rótulo é convertido uma única vez e todas as células apontam para o mesmo objeto
+    (sem a cópia linha a linha do DataFrame de objetos nem a do astype(str) de cada coluna).
+    """
+    if 'Data' not in colunas or any(alternativa in colunas for alternativa in COLUNAS_DATA_ALTERNATIVAS):
+        return clean_data(pd.DataFrame(colunas))
+    
+    dados = {}
+    for nome, valores in colunas.items():
+        codigos, rotulos = pd.factorize(pd.Series(valores, dtype=object), use_na_sentinel=False)
+        if nome == 'Data':
+            rotulos = converter_datas(pd.Series(rotulos, dtype=object))
+            if rotulos.isna().all():
+                return clean_data(pd.DataFrame(colunas))
+        elif nome in VALORES_PADRAO:
+            rotulos = preencher_vazios(pd.Series(rotulos, dtype=object), VALORES_PADRAO[nome])
+        else:
+            rotulos = pd.Series(rotulos, dtype=object)
+        dados[nome] = rotulos.to_numpy()[codigos]
+    
+    df = pd.DataFrame(dados)
+    df = df.dropna(subset=['Data'])
+    return para_texto_arrow(df)
+
+
+# =============================================================================
+# CARGA COMPLETA (SEM CACHE NEM INTERFACE)
+# =============================================================================
+
+def carregar_dados(arquivo=None, info_conta=None, projecao='analitica'):
+    """
+    (df limpo, origem) a partir de `arquivo` (planilha com aba 'dados' ou CSV), da fonte
+    injetada em DASHBOARD_FONTE_DADOS ou do Google Sheets, nesta ordem.
+    Erros de leitura são propagados para quem chamou decidir o que mostrar.
+    """
+    colunas = coluna_extra if projecao == 'extras' else coluna_analitica
+    fonte = arquivo or os.getenv('DASHBOARD_FONTE_DADOS')
+    if fonte:
+        df = carregar_fonte_injetada(fonte, colunas)
+        return (limpar_extras(df) if projecao == 'extras' else clean_data(df)), fonte
+
+    worksheet = abrir_planilha(info_conta)
+    with etapa("google_sheets"):
+        valores = ler_colunas_planilha(worksheet, colunas)
+    if not valores or not any(valores.values()):
+        return pd.DataFrame(), 'Google Sheets'
+    if projecao == 'extras':
+        return limpar_extras(pd.DataFrame(valores)), 'Google Sheets'
+    return montar_dataframe_planilha(valores), 'Google Sheets'  # Mesmo resultado do clean_data
@@ -0,0 +1,132 @@
+"""
+Gerador de atendimentos sintéticos com distribuições realistas, para benchmarks e testes de carga.
+
+Reproduz o formato bruto da planilha (tudo texto, como vem do Google Sheets):
+atendentes e módulos com concentração tipo Zipf, sazonalidade por dia da semana,
+UFs brasileiras, clientes recorrentes e datas "sujas" que o corrigir_datas precisa tratar.
+
+    from dados_sinteticos import gerar_atendimentos
+    df = gerar_atendimentos(100_000, semente=42)
+"""
+
+import numpy as np
+import pandas as pd
+
+# UFs em ordem aproximada de volume (o peso segue a posição na lista)
+UFS = [
+    'SP', 'MG', 'RJ', 'BA', 'PR', 'RS', 'PE', 'CE', 'PA', 'SC', 'GO', 'MA', 'AM', 'ES',
+    'PB', 'RN', 'MT', 'AL', 'PI', 'DF', 'MS', 'SE', 'RO', 'TO', 'AC', 'AP', 'RR',
+]
+
+NOMES = ['Ana', 'João', 'Maria', 'Pedro', 'Carla', 'Lucas', 'Juliana', 'Rafael', 'Fernanda', 'Bruno',
+         'Patrícia', 'Marcos', 'Camila', 'Diego', 'Aline', 'Thiago', 'Larissa', 'Gustavo', 'Beatriz', 'Felipe']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Almeida', 'Ribeiro', 'Gomes']
+
+MODULOS = ['Fiscal', 'Folha de Pagamento', 'Financeiro', 'Estoque', 'Vendas', 'Compras', 'Contábil',
+           'Faturamento', 'PDV', 'CRM', 'Produção', 'Patrimônio', 'Logística', 'BI', 'Integrações']
+
+CATEGORIAS = {'Dúvida': 0.45, 'Erro': 0.25, 'Configuração': 0.15, 'Melhoria': 0.10, 'Treinamento': 0.05}
+TIPOS = {'Consulta': 0.40, 'Problema': 0.30, 'Solicitação': 0.20, 'Sugestão': 0.07, 'Reclamação': 0.03}
+CANAIS = {'Telefone': 0.35, 'Chat': 0.30, 'WhatsApp': 0.20, 'E-mail': 0.15}
+NUCLEOS = ['Varejo', 'Indústria', 'Serviços', 'Agro', 'Saúde', 'Educação']
+PRODUTOS = ['ERP Completo', 'ERP Light', 'Gestão Fiscal', 'PDV Cloud', 'Folha Online']
+
+# Volume relativo por dia da semana (segunda = 0)
+SAZONALIDADE_SEMANAL = [1.25, 1.15, 1.10, 1.05, 0.95, 0.30, 0.08]
+
+# Formatos que aparecem na planilha real e os "lixos" mais comuns
+FORMATO_DATA_PADRAO = '%d/%m/%Y'
+FORMATOS_DATA_SUJOS = ['%d-%m-%Y', '%Y-%m-%d', '%d/%m/%y']
+VALORES_DATA_INVALIDOS = ['', ' ', 'nan', 'sem data', '31/02/2024']
+VALORES_VAZIOS = ['', ' ', 'nan', 'None']
+
+
+def _pesos_zipf(quantidade, expoente=1.1):
+    pesos = 1.0 / np.arange(1, quantidade + 1) ** expoente
+    return pesos / pesos.sum()
+
+
+def _sortear(gerador, opcoes, linhas, pesos=None):
+    """Sorteia índices e só depois converte para os rótulos (bem mais rápido para milhões de linhas)"""
+    opcoes = np.asarray(opcoes, dtype=object)
+    return opcoes[gerador.choice(len(opcoes), size=linhas, p=pesos)]
+
+
+def _sujar(gerador, valores, taxa, lixo):
+    """Troca uma fração dos valores por vazios/nulos, como na planilha preenchida à mão"""
+    if taxa <= 0:
+        return valores
+    posicoes = np.flatnonzero(gerador.random(len(valores)) < taxa)
+    valores[posicoes] = _sortear(gerador, lixo, len(posicoes))
+    return valores
+
+
+def gerar_atendimentos(linhas, semente=42, inicio='2024-01-01', dias=365, atendentes=25, clientes=None,
+                       taxa_datas_sujas=0.03, taxa_vazios=0.01):
+    """
+    Gera `linhas` atendimentos no formato bruto da planilha (todas as colunas como texto).
+
+    :param semente: mesma semente, mesmos dados
+    :param clientes: tamanho da carteira; o padrão (linhas / 8) faz cada cliente voltar várias vezes
+    :param taxa_datas_sujas: fração de datas em outros formatos ou inválidas
+    :param taxa_vazios: fração de campos categóricos vazios
+    """
+    gerador = np.random.default_rng(semente)
+    clientes = clientes or max(10, linhas // 8)
+
+    # Datas: sazonalidade semanal + leve crescimento ao longo do período
+    calendario = pd.date_range(inicio, periods=dias, freq='D')
+    pesos_dias = np.array([SAZONALIDADE_SEMANAL[d] for d in calendario.dayofweek])
+    pesos_dias = pesos_dias * np.linspace(0.85, 1.15, dias)
+    indices_dias = gerador.choice(dias, size=linhas, p=pesos_dias / pesos_dias.sum())
+
+    datas = calendario.strftime(FORMATO_DATA_PADRAO).to_numpy(dtype=object)[indices_dias]
+    sujas = np.flatnonzero(gerador.random(linhas) < taxa_datas_sujas)
+    if len(sujas):
+        # Três quartos em outros formatos, um quarto inválido
+        formatos = gerador.integers(0, len(FORMATOS_DATA_SUJOS) + 1, len(sujas))
+        for i, formato in enumerate(FORMATOS_DATA_SUJOS):
+            posicoes = sujas[formatos == i]
+            datas[posicoes] = calendario[indices_dias[posicoes]].strftime(formato)
+        invalidas = sujas[formatos == len(FORMATOS_DATA_SUJOS)]
+        datas[invalidas] = _sortear(gerador, VALORES_DATA_INVALIDOS, len(invalidas))
+
+    # Equipe e módulos concentrados (poucos atendentes/módulos respondem pela maior parte)
+    nomes_atendentes = [
+        f"{NOMES[i % len(NOMES)]} {SOBRENOMES[(i + i // len(NOMES)) % len(SOBRENOMES)]}" for i in range(atendentes)
+    ]
+    ordem_atendentes = gerador.permutation(atendentes)
+
+    # Carteira de clientes: cada cliente tem UF, núcleo, produto e contato fixos
+    uf_cliente = _sortear(gerador, UFS, clientes, _pesos_zipf(len(UFS), 0.9))
+    nucleo_cliente = _sortear(gerador, NUCLEOS, clientes)
+    produto_cliente = _sortear(gerador, PRODUTOS, clientes, _pesos_zipf(len(PRODUTOS), 0.8))
+    ids_clientes = np.arange(clientes)
+    nome_cliente = np.array([f"Cliente {i:06d}" for i in ids_clientes], dtype=object)
+    contato_cliente = np.array(
+        [f"Responsável {i:06d} - contato{i}@cliente{i:06d}.com.br - (11) 9{i % 10000:04d}-{(i * 37) % 10000:04d}"
+         for i in ids_clientes],
+        dtype=object
+    )
+    cliente = gerador.choice(clientes, size=linhas, p=_pesos_zipf(clientes, 0.8))
+
+    df = pd.DataFrame({
+        'Data': datas,
+        'UF': _sujar(gerador, uf_cliente[cliente], taxa_vazios, VALORES_VAZIOS),
+        'Atendente': _sujar(gerador, np.asarray(nomes_atendentes, dtype=object)[
+            ordem_atendentes[gerador.choice(atendentes, size=linhas, p=_pesos_zipf(atendentes))]
+        ], taxa_vazios, VALORES_VAZIOS),
+        'Categorias': _sujar(gerador, _sortear(gerador, list(CATEGORIAS), linhas, list(CATEGORIAS.values())),
+                             taxa_vazios, VALORES_VAZIOS),
+        'Tipos': _sujar(gerador, _sortear(gerador, list(TIPOS), linhas, list(TIPOS.values())),
+                        taxa_vazios, VALORES_VAZIOS),
+        'Modulos': _sujar(gerador, _sortear(gerador, MODULOS, linhas, _pesos_zipf(len(MODULOS))),
+                          taxa_vazios, VALORES_VAZIOS),
+        'Canais': _sujar(gerador, _sortear(gerador, list(CANAIS), linhas, list(CANAIS.values())),
+                         taxa_vazios, VALORES_VAZIOS),
+        'Cliente': nome_cliente[cliente],
+        'Nucleos': nucleo_cliente[cliente],
+        'Produtos': produto_cliente[cliente],
+        'Contato': contato_cliente[cliente],
+    })
+    return df
@@ -0,0 +1,170 @@
+"""
+Resumo da manhã (digest) do assistente.
+
+Roda sem interface, de preferência agendado fora do horário de pico (cron / Agendador de Tarefas):
+
+    python digest_matinal.py
+    python digest_matinal.py --arquivo relatorio_set_out.xlsx --perguntas perguntas.txt --paralelo 2
+
+Carrega os dados com o mesmo carga_dados do dashboard (sem importar o app), faz a lista de perguntas
+ao assistente com paralelismo limitado e grava as respostas em um arquivo JSON que o
+dashboard mostra instantaneamente na aba do assistente.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import streamlit as st
+
+from carga_dados import carregar_dados
+from novo_assistente import _ler_config, classificar_complexidade, consultar_assistente
+
+# =============================================================================
+# CONFIGURAÇÃO DO DIGEST
+# =============================================================================
+
+ARQUIVO_DIGEST = _ler_config("digest_arquivo", os.path.join("cache", "digest_matinal.json"))
+DIGEST_PARALELISMO = _ler_config("digest_paralelo", 3)
+
+# Perguntas padrão dos coordenadores - podem ser trocadas por um arquivo (uma pergunta por linha)
+PERGUNTAS_PADRAO = [
+    "Quais foram os top 5 atendentes ontem?",
+    "Quantos atendimentos tivemos ontem?",
+    "Quais módulos tiveram mais atendimentos ontem?",
+    "Qual a média diária de atendimentos nos últimos 7 dias?",
+    "Quais módulos tiveram um pico de atendimentos na última semana em relação à anterior?",
+    "Quais clientes são recorrentes nos últimos 30 dias?",
+    "Quais UFs concentram mais atendimentos este mês?",
+    "Quais categorias mais cresceram nos últimos 7 dias?",
+    "Existe alguma anomalia ou tendência preocupante nos últimos 30 dias?",
+]
+
+
+def _chave_gemini():
+    """Mesma ordem de busca da chave usada pelo dashboard: st.secrets, depois variável de ambiente"""
+    try:
+        if "gemini" in st.secrets and "api_key" in st.secrets.gemini:
+            return st.secrets.gemini.api_key
+    except Exception:
+        pass
+    return os.getenv('GEMINI_API_KEY')
+
+
+def _conta_servico():
+    """Credenciais do Google Sheets, do mesmo secrets.toml do dashboard"""
+    try:
+        return st.secrets["relatorio_set_out_account"]
+    except Exception:
+        return None
+
+
+def carregar_perguntas(caminho=None):
+    """Lê as perguntas de um arquivo texto (uma por linha, # para comentários) ou usa as padrão"""
+    if not caminho:
+        return list(PERGUNTAS_PADRAO)
+
+    with open(caminho, encoding='utf-8') as arquivo:
+        perguntas = [linha.strip() for linha in arquivo]
+    return [p for p in perguntas if p and not p.startswith('#')]
+
+
+def _responder(pergunta, df, gemini_key):
+    """Consulta uma pergunta escolhendo o modelo pela complexidade, como o modo automático da aba"""
+    rota = classificar_complexidade(pergunta)
+    inicio = time.perf_counter()
+    try:
+        resposta = consultar_assistente(pergunta, df, tipo_modelo=rota['modelo'], gemini_key=gemini_key,
+                                        sessao_id="digest_matinal")
+    except Exception as e:
+        resposta = f"❌ Erro ao consultar assistente: {e}"
+    duracao = time.perf_counter() - inicio
+    print(f"   ✅ {pergunta[:60]} ({duracao:.1f}s)")
+    return {
+        'pergunta': pergunta,
+        'resposta': resposta,
+        'modelo': rota['modelo'],
+        'duracao_s': round(duracao, 2),
+    }
+
+
+def gerar_digest(df, perguntas=None, gemini_key=None, paralelo=None):
+    """Responde às perguntas com no máximo `paralelo` consultas simultâneas, preservando a ordem"""
+    perguntas = perguntas or list(PERGUNTAS_PADRAO)
+    paralelo = max(1, int(paralelo or DIGEST_PARALELISMO))
+    inicio = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=paralelo, thread_name_prefix="digest") as executor:
+        respostas = list(executor.map(lambda p: _responder(p, df, gemini_key), perguntas))
+
+    periodo = None
+    if 'Data' in df.columns and not df.empty:
+        periodo = [df['Data'].min().strftime('%d/%m/%Y'), df['Data'].max().strftime('%d/%m/%Y')]
+
+    return {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'registros': len(df),
+        'periodo': periodo,
+        'duracao_s': round(time.perf_counter() - inicio, 2),
+        'respostas': respostas,
+    }
+
+
+def salvar_digest(digest, caminho=None):
+    """Grava o digest de forma atômica para o dashboard nunca ler um arquivo pela metade"""
+    caminho = caminho or ARQUIVO_DIGEST
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(digest, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def carregar_digest(caminho=None):
+    """Lê o último digest gerado; retorna None se ainda não existir ou estiver inválido"""
+    caminho = caminho or ARQUIVO_DIGEST
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o resumo da manhã do assistente de atendimentos")
+    parser.add_argument('--arquivo', help="Planilha local (aba 'dados') ou CSV; sem ela, usa o Google Sheets")
+    parser.add_argument('--perguntas', help="Arquivo texto com uma pergunta por linha")
+    parser.add_argument('--saida', default=None, help=f"Arquivo do digest (padrão: {ARQUIVO_DIGEST})")
+    parser.add_argument('--paralelo', type=int, default=None, help="Consultas simultâneas ao assistente")
+    args = parser.parse_args()
+
+    # Mesma carga e limpeza do dashboard
+    print("📥 Carregando dados...")
+    try:
+        df, origem = carregar_dados(args.arquivo, info_conta=_conta_servico())
+    except Exception as e:
+        print(f"❌ Erro ao carregar dados: {e}")
+        return 1
+    print(f"✅ {len(df)} registros carregados de {origem}")
+    if df.empty:
+        print("❌ Nenhum dado carregado - digest não gerado")
+        return 1
+
+    perguntas = carregar_perguntas(args.perguntas)
+    print(f"🤖 Respondendo {len(perguntas)} perguntas sobre {len(df)} registros...")
+
+    digest = gerar_digest(df, perguntas, gemini_key=_chave_gemini(), paralelo=args.paralelo)
+    caminho = salvar_digest(digest, args.saida)
+    print(f"🎉 Digest salvo em {caminho} ({digest['duracao_s']:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
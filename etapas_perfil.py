@@ -0,0 +1,48 @@
+"""
+Medição por etapas do modo de perfil, sem Streamlit: etapa() e @medido() podem ser usados por
+módulos sem interface (ex.: carga_dados). O perfil do rerun e a cascata na sidebar ficam no
+perfil_dashboard; sem perfil ativo na thread, as duas funções não fazem nada.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+_perfil_atual = threading.local()
+
+
+@contextmanager
+def etapa(nome):
+    """Mede o bloco como uma etapa do rerun atual; sem perfil ativo, não faz nada"""
+    perfil = getattr(_perfil_atual, 'perfil', None)
+    if perfil is None:
+        yield
+        return
+
+    inicio = time.perf_counter()
+    nivel = perfil.nivel
+    perfil.nivel += 1
+    try:
+        yield
+    finally:
+        perfil.nivel = nivel
+        perfil.etapas.append({
+            'etapa': nome,
+            'inicio_ms': (inicio - perfil.inicio) * 1000,
+            'duracao_ms': (time.perf_counter() - inicio) * 1000,
+            'nivel': nivel,
+        })
+
+
+def medido(nome=None):
+    """Decorador: cada chamada da função vira uma etapa (chamadas seguidas são somadas na cascata)"""
+    def decorador(funcao):
+        rotulo = nome or funcao.__name__
+
+        @wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with etapa(rotulo):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
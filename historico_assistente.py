@@ -0,0 +1,92 @@
+"""
+Histórico de consultas do assistente com limite de memória.
+
+Só as consultas mais recentes ficam no session_state; as mais antigas são gravadas em
+um arquivo JSONL por sessão e lidas do disco apenas quando o usuário pede para vê-las.
+"""
+
+import json
+import os
+import threading
+import time
+
+from novo_assistente import _ler_config
+
+HISTORICO_LIMITE_MEMORIA = _ler_config("historico_limite", 10)
+PASTA_HISTORICO = _ler_config("historico_pasta", os.path.join("cache", "historico"))
+HISTORICO_EXPIRACAO_DIAS = _ler_config("historico_expiracao_dias", 7)
+
+
+def _remover_arquivos_expirados(pasta, dias):
+    """Apaga históricos de sessões antigas para a pasta não crescer indefinidamente"""
+    limite = time.time() - dias * 86400
+    try:
+        for nome in os.listdir(pasta):
+            caminho = os.path.join(pasta, nome)
+            if nome.endswith('.jsonl') and os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+    except OSError:
+        pass
+
+
+class HistoricoAssistente:
+    """
+    Lista das consultas de uma sessão: as `limite` mais recentes em memória, o restante em disco.
+    """
+
+    def __init__(self, sessao_id, limite=None, pasta=None):
+        self.limite = max(1, int(limite or HISTORICO_LIMITE_MEMORIA))
+        self.pasta = pasta or PASTA_HISTORICO
+        self.arquivo = os.path.join(self.pasta, f"{sessao_id}.jsonl")
+        self.recentes = []
+        self.total_arquivadas = 0
+        self._lock = threading.Lock()
+        _remover_arquivos_expirados(self.pasta, HISTORICO_EXPIRACAO_DIAS)
+
+    def __len__(self):
+        return len(self.recentes) + self.total_arquivadas
+
+    def __bool__(self):
+        return len(self) > 0
+
+    @property
+    def ultima(self):
+        return self.recentes[-1] if self.recentes else None
+
+    def adicionar(self, entrada):
+        """Inclui a consulta e grava em disco as que excederem o limite de memória"""
+        with self._lock:
+            self.recentes.append(entrada)
+            excedentes = self.recentes[:-self.limite]
+            if not excedentes:
+                return
+
+            try:
+                os.makedirs(self.pasta, exist_ok=True)
+                with open(self.arquivo, 'a', encoding='utf-8') as arquivo:
+                    for antiga in excedentes:
+                        arquivo.write(json.dumps(antiga, ensure_ascii=False) + "\n")
+                self.total_arquivadas += len(excedentes)
+            except OSError as e:
+                # Sem disco disponível a entrada é descartada - o limite de memória prevalece
+                print(f"⚠️ Não foi possível arquivar o histórico do assistente: {e}")
+            self.recentes = self.recentes[-self.limite:]
+
+    def carregar_arquivadas(self):
+        """Lê do disco as consultas arquivadas, da mais antiga para a mais recente"""
+        if not self.total_arquivadas:
+            return []
+        try:
+            with open(self.arquivo, encoding='utf-8') as arquivo:
+                return [json.loads(linha) for linha in arquivo if linha.strip()]
+        except (OSError, ValueError):
+            return []
+
+    def limpar(self):
+        with self._lock:
+            self.recentes = []
+            self.total_arquivadas = 0
+            try:
+                os.remove(self.arquivo)
+            except OSError:
+                pass
@@ -0,0 +1,128 @@
+"""
+Ingestão em blocos de planilhas .xlsx grandes (openpyxl em modo read_only).
+
+O pd.read_excel monta a aba inteira como listas de células Python antes de criar o DataFrame,
+e o clean_data depois processa tudo de uma vez: o pico de memória fica várias vezes maior que o
+arquivo. Aqui as linhas são lidas uma a uma, só nas colunas pedidas, e a cada `tamanho_bloco`
+linhas o bloco é limpo e guardado por coluna, com o texto repetido codificado em inteiros.
+
+    df = ler_xlsx_em_blocos(conteudo, colunas=lambda nome: nome != 'Contato', limpar=clean_data)
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+TAMANHO_BLOCO = 20000
+
+
+class ArmazemColunar:
+    """
+    Blocos já limpos, guardados coluna a coluna. Colunas de texto (object) viram códigos int32
+    mais uma tabela de rótulos por coluna: cada rótulo repetido existe uma única vez na memória.
+    """
+
+    def __init__(self):
+        self.colunas = None
+        self._indices = []
+        self._partes = {}
+        self._rotulos = {}
+
+    def anexar(self, bloco):
+        if self.colunas is None:
+            self.colunas = list(bloco.columns)
+        self._indices.append(bloco.index.to_numpy())
+        for coluna in self.colunas:
+            serie = bloco[coluna]
+            if serie.dtype == 'object':
+                serie = self._codificar(coluna, serie)
+            self._partes.setdefault(coluna, []).append(serie)
+
+    def _codificar(self, coluna, serie):
+        """Códigos do bloco (pd.factorize) traduzidos para os códigos globais da coluna; nulos = -1"""
+        codigos, rotulos_bloco = pd.factorize(serie)
+        rotulos = self._rotulos.setdefault(coluna, {})
+        globais = np.array([rotulos.setdefault(rotulo, len(rotulos)) for rotulo in rotulos_bloco] + [-1],
+                           dtype=np.int32)
+        return globais[codigos]  # código -1 do factorize pega o último item (-1)
+
+    def montar(self):
+        if self.colunas is None:
+            return pd.DataFrame()
+        indice = pd.Index(np.concatenate(self._indices))
+        dados = {}
+        for coluna in self.colunas:
+            partes = self._partes[coluna]
+            if coluna in self._rotulos:
+                # Último item = nulo, para o código -1
+                rotulos = np.empty(len(self._rotulos[coluna]) + 1, dtype=object)
+                rotulos[:-1] = list(self._rotulos[coluna])
+                rotulos[-1] = None
+                dados[coluna] = rotulos[np.concatenate(partes)]
+            else:
+                dados[coluna] = pd.concat(partes, ignore_index=True).array
+        return pd.DataFrame(dados, index=indice)
+
+
+def _montar_bloco(linhas, selecionadas, inicio, tipos):
+    """DataFrame do bloco, com índice = posição da linha na aba (como no pd.read_excel)"""
+    dados = {}
+    for posicao, nome in selecionadas:
+        valores = [linha[posicao] if posicao < len(linha) else None for linha in linhas]
+        tipo = tipos.get(nome) if isinstance(tipos, dict) else tipos
+        if tipo is str:
+            valores = [None if valor is None else str(valor) for valor in valores]
+        dados[nome] = pd.Series(valores, dtype=object)
+    bloco = pd.DataFrame(dados)
+    bloco.index = pd.RangeIndex(inicio, inicio + len(linhas))
+    return bloco
+
+
+def ler_xlsx_em_blocos(conteudo, colunas, tipos=None, limpar=None, tamanho_bloco=TAMANHO_BLOCO,
+                       ao_progredir=None, aba='dados'):
+    """
+    Lê a aba de um .xlsx em blocos de `tamanho_bloco` linhas.
+
+    :param colunas: função nome -> bool que escolhe as colunas lidas
+    :param tipos: str ou {coluna: str} para ler as células como texto (como o dtype do pd.read_excel)
+    :param limpar: função aplicada a cada bloco (ex.: clean_data); deve preservar o índice
+    :param ao_progredir: chamada com (linhas lidas, total estimado ou 0) a cada bloco
+    """
+    from openpyxl import load_workbook
+
+    limpar = limpar or (lambda bloco: bloco)
+    livro = load_workbook(io.BytesIO(conteudo), read_only=True, data_only=True)
+    try:
+        planilha = livro[aba]
+        linhas = planilha.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return pd.DataFrame()
+
+        selecionadas = [(posicao, str(nome)) for posicao, nome in enumerate(cabecalho)
+                        if nome is not None and colunas(str(nome))]
+        total = max((planilha.max_row or 0) - 1, 0)  # Dimensão declarada no arquivo (pode faltar)
+        armazem = ArmazemColunar()
+
+        bloco, inicio, lidas = [], 0, 0
+        for linha in linhas:
+            lidas += 1
+            bloco.append(linha)
+            if len(bloco) == tamanho_bloco:
+                armazem.anexar(limpar(_montar_bloco(bloco, selecionadas, inicio, tipos)))
+                inicio += len(bloco)
+                bloco = []
+                if ao_progredir:
+                    ao_progredir(lidas, total)
+
+        # Linhas vazias no fim da aba não viram registros (o pd.read_excel também as descarta)
+        while bloco and all(valor is None for valor in bloco[-1]):
+            bloco.pop()
+        if bloco or armazem.colunas is None:
+            armazem.anexar(limpar(_montar_bloco(bloco, selecionadas, inicio, tipos)))
+        if ao_progredir:
+            ao_progredir(lidas, total)
+        return armazem.montar()
+    finally:
+        livro.close()
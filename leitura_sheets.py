@@ -0,0 +1,134 @@
+"""
+Leitura paginada e paralela de colunas do Google Sheets.
+
+Uma única requisição com a aba inteira fica lenta (e às vezes estoura o tempo) conforme a
+planilha cresce. Aqui as linhas são divididas em páginas; cada página é um batch_get com os
+intervalos das colunas pedidas (ex.: "C2:C20001"), lido em um pool pequeno de threads dentro
+da cota de leituras por minuto. Uma página que falha é repetida sozinha (backoff exponencial
+com jitter) e as páginas são remontadas na ordem das linhas.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import gspread
+
+PAGINA_LINHAS = int(os.getenv('DASHBOARD_SHEETS_PAGINA_LINHAS', 20000))
+PARALELISMO = int(os.getenv('DASHBOARD_SHEETS_PARALELISMO', 4))
+# Cota padrão da API do Sheets: 60 leituras por minuto por usuário (conta de serviço)
+LEITURAS_POR_MINUTO = int(os.getenv('DASHBOARD_SHEETS_LEITURAS_POR_MINUTO', 60))
+TENTATIVAS_POR_PAGINA = int(os.getenv('DASHBOARD_SHEETS_TENTATIVAS', 4))
+BACKOFF_BASE_S = 1.0
+STATUS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+
+
+class CotaLeituras:
+    """Janela deslizante de 60 s: no máximo `por_minuto` requisições iniciadas por janela"""
+
+    def __init__(self, por_minuto):
+        self.por_minuto = por_minuto
+        self._inicios = deque()
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        if not self.por_minuto:
+            return
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                while self._inicios and agora - self._inicios[0] >= 60:
+                    self._inicios.popleft()
+                if len(self._inicios) < self.por_minuto:
+                    self._inicios.append(agora)
+                    return
+                espera = 60 - (agora - self._inicios[0])
+            time.sleep(espera)
+
+
+# Compartilhada por todas as sessões: a cota é da conta de serviço, não de quem está no dashboard
+cota_leituras = CotaLeituras(LEITURAS_POR_MINUTO)
+
+
+def _erro_transitorio_sheets(erro):
+    """Cota estourada, 5xx ou falha de rede: vale tentar a página de novo"""
+    if isinstance(erro, (TimeoutError, ConnectionError)):
+        return True
+    if isinstance(erro, gspread.exceptions.APIError):
+        status = getattr(getattr(erro, 'response', None), 'status_code', None)
+        return status in STATUS_TRANSITORIOS
+    try:
+        import requests
+        return isinstance(erro, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+    except ImportError:
+        return False
+
+
+def _letra(indice_coluna):
+    return gspread.utils.rowcol_to_a1(1, indice_coluna).rstrip('0123456789')
+
+
+def _ler_pagina(worksheet, letras, primeira, ultima):
+    """Uma página (linhas primeira..ultima) de cada coluna, completada com '' até o tamanho da página"""
+    intervalos = [f"{letra}{primeira}:{letra}{ultima}" for letra in letras]
+    tamanho = ultima - primeira + 1
+
+    for tentativa in range(1, TENTATIVAS_POR_PAGINA + 1):
+        cota_leituras.aguardar()
+        try:
+            blocos = worksheet.batch_get(intervalos, major_dimension=gspread.utils.Dimension.cols)
+            break
+        except Exception as e:
+            if tentativa == TENTATIVAS_POR_PAGINA or not _erro_transitorio_sheets(e):
+                raise
+            espera = random.uniform(0, BACKOFF_BASE_S * (2 ** (tentativa - 1)))
+            print(f"⚠️ Página {primeira}-{ultima} do Sheets falhou ({e}); nova tentativa em {espera:.1f}s")
+            time.sleep(espera)
+
+    # O Sheets omite as células vazias no fim de cada coluna
+    colunas = []
+    for bloco in blocos:
+        valores = list(bloco[0]) if bloco else []
+        colunas.append(valores + [''] * (tamanho - len(valores)))
+    return colunas
+
+
+def ler_colunas_paginadas(worksheet, colunas, pagina_linhas=None, paralelismo=None):
+    """
+    {coluna: lista de textos} das colunas cujo cabeçalho passa em `colunas`, lidas em páginas
+    de `pagina_linhas` linhas, `paralelismo` páginas por vez.
+    """
+    pagina_linhas = pagina_linhas or PAGINA_LINHAS
+    paralelismo = paralelismo or PARALELISMO
+
+    cota_leituras.aguardar()
+    headers = worksheet.row_values(1)
+    selecionadas = [(indice, nome) for indice, nome in enumerate(headers, start=1) if colunas(nome)]
+    if not selecionadas:
+        return {}
+
+    # row_count vem dos metadados da aba (já carregados ao abrir a planilha): inclui linhas em branco
+    letras = [_letra(indice) for indice, _ in selecionadas]
+    paginas = [(primeira, min(primeira + pagina_linhas - 1, worksheet.row_count))
+               for primeira in range(2, worksheet.row_count + 1, pagina_linhas)]
+    if not paginas:
+        return {nome: [] for _, nome in selecionadas}
+
+    if len(paginas) == 1:
+        resultados = [_ler_pagina(worksheet, letras, *paginas[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(paralelismo, len(paginas)), thread_name_prefix="sheets") as executor:
+            # map devolve na ordem das páginas, qualquer que seja a ordem de chegada
+            resultados = list(executor.map(lambda pagina: _ler_pagina(worksheet, letras, *pagina), paginas))
+
+    valores = {nome: [celula for pagina in resultados for celula in pagina[posicao]]
+               for posicao, (_, nome) in enumerate(selecionadas)}
+
+    # Linhas em branco no fim da grade não são registros
+    total = len(next(iter(valores.values())))
+    while total and all(coluna[total - 1] == '' for coluna in valores.values()):
+        total -= 1
+    return {nome: coluna[:total] for nome, coluna in valores.items()}
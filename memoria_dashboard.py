@@ -0,0 +1,182 @@
+"""
+Contabilidade de memória do dashboard: quanto ocupa cada coluna da base carregada, o que os
+caches (st.cache_data, relatórios e cubos do assistente) e as sessões estão segurando, e o RSS
+do processo, com aviso quando o orçamento configurado em [assistente] memoria_orcamento_mb
+(ou ASSISTENTE_MEMORIA_ORCAMENTO_MB) é ultrapassado.
+"""
+
+import sys
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+from novo_assistente import _ler_config
+
+MEMORIA_ORCAMENTO_MB = _ler_config("memoria_orcamento_mb", 0.0)   # 0 = sem orçamento
+INTERVALO_AVISO_S = 60          # Evita repetir o aviso no log a cada rerun
+SESSAO_EXPIRACAO_S = 3600       # Sessões sem rerun há mais tempo saem da contabilidade
+AMOSTRA_ESTIMATIVA = 2000       # Linhas medidas para estimar frames grandes
+
+MB = 1024 * 1024
+
+_sessoes = {}
+_lock_sessoes = threading.Lock()
+_ultimo_aviso = 0.0
+
+
+def tamanho_profundo(objeto, _vistos=None):
+    """Bytes de um objeto e de tudo que ele referencia (DataFrames pelo memory_usage profundo)"""
+    _vistos = set() if _vistos is None else _vistos
+    if id(objeto) in _vistos:
+        return 0
+    _vistos.add(id(objeto))
+
+    if isinstance(objeto, pd.DataFrame):
+        return int(objeto.memory_usage(index=True, deep=True).sum())
+    if isinstance(objeto, (pd.Series, pd.Index)):
+        return int(objeto.memory_usage(deep=True))
+    if isinstance(objeto, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(objeto)
+
+    tamanho = sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        tamanho += sum(tamanho_profundo(k, _vistos) + tamanho_profundo(v, _vistos) for k, v in objeto.items())
+    elif isinstance(objeto, (list, tuple, set, frozenset, deque)):
+        tamanho += sum(tamanho_profundo(item, _vistos) for item in objeto)
+    elif hasattr(objeto, '__dict__') and not isinstance(objeto, type):
+        tamanho += tamanho_profundo(vars(objeto), _vistos)
+    return tamanho
+
+
+def estimar_bytes(df, amostra=None):
+    """Memória profunda de um DataFrame; acima da amostra, extrapola a partir de linhas sorteadas"""
+    amostra = amostra or AMOSTRA_ESTIMATIVA
+    if len(df) <= amostra:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    medida = df.sample(amostra, random_state=0).memory_usage(index=True, deep=True).sum()
+    return int(medida / amostra * len(df))
+
+
+def uso_por_coluna(df):
+    """Memória profunda por coluna, da maior para a menor"""
+    if df.empty:
+        return pd.DataFrame(columns=['coluna', 'dtype', 'mb', 'bytes_por_linha', 'percentual'])
+    bytes_colunas = df.memory_usage(index=False, deep=True)
+    total = bytes_colunas.sum()
+    uso = pd.DataFrame({
+        'coluna': bytes_colunas.index,
+        'dtype': [str(df[coluna].dtype) for coluna in bytes_colunas.index],
+        'mb': (bytes_colunas.values / MB).round(2),
+        'bytes_por_linha': (bytes_colunas.values / len(df)).round(1),
+        'percentual': (bytes_colunas.values / total * 100).round(1),
+    })
+    return uso.sort_values('mb', ascending=False, ignore_index=True)
+
+
+def rss_processo_mb():
+    """(RSS atual em MB, fonte da medida); psutil é opcional, /proc cobre o Linux sem ele"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / MB, 'psutil'
+    except ImportError:
+        pass
+
+    try:
+        with open('/proc/self/status', encoding='ascii') as status:
+            for linha in status:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1]) * 1024 / MB, '/proc'
+    except OSError:
+        pass
+
+    try:
+        import resource
+        # Sem RSS atual disponível: usa o pico (em KB no Linux, bytes no macOS)
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return (pico if sys.platform == 'darwin' else pico * 1024) / MB, 'pico (resource)'
+    except ImportError:
+        return None, 'indisponível'
+
+
+def _estatisticas_cache_streamlit():
+    """
+    [(função, itens, bytes)] do st.cache_data. A API de estatísticas é interna ao Streamlit:
+    se mudar numa atualização, devolve None e o painel mostra "n/d" em vez de quebrar.
+    """
+    try:
+        from streamlit.runtime.caching import get_data_cache_stats_provider
+        estatisticas = get_data_cache_stats_provider().get_stats()
+        if isinstance(estatisticas, dict):
+            estatisticas = [stat for lista in estatisticas.values() for stat in lista]
+        por_funcao = {}
+        for stat in estatisticas:
+            itens, total = por_funcao.get(stat.cache_name, (0, 0))
+            por_funcao[stat.cache_name] = (itens + 1, total + stat.byte_length)
+        return [(nome, itens, total) for nome, (itens, total) in por_funcao.items()]
+    except Exception as e:
+        print(f"⚠️ Estatísticas do st.cache_data indisponíveis: {e}")
+        return None
+
+
+def caches_processo():
+    """Caches compartilhados por todas as sessões do processo (itens e MB; "n/d" quando indisponível)"""
+    from novo_assistente import estatisticas_cache
+
+    caches = []
+    estatisticas_streamlit = _estatisticas_cache_streamlit()
+    if estatisticas_streamlit is None:
+        caches.append({'cache': "st.cache_data (serializado)", 'itens': "n/d", 'mb': "n/d"})
+    for nome, itens, total in estatisticas_streamlit or []:
+        caches.append({'cache': f"st.cache_data (serializado): {nome}", 'itens': str(itens),
+                       'mb': f"{total / MB:.2f}"})
+
+    for nome, itens in estatisticas_cache().items():
+        caches.append({'cache': nome, 'itens': str(len(itens)), 'mb': f"{tamanho_profundo(itens) / MB:.2f}"})
+
+    return pd.DataFrame(caches)
+
+
+def registrar_sessao(sessao_id, session_state, df_filtrado=None):
+    """
+    Fotografia do que a sessão está segurando, atualizada a cada rerun.
+    Guarda só os tamanhos (nunca referências), para não prolongar a vida dos objetos.
+    """
+    if not sessao_id:
+        return
+    objetos = {chave: session_state[chave] for chave in session_state.keys()}
+    historico = objetos.get('assistant_responses')
+    foto = {
+        'momento': time.time(),
+        'df_filtrado_mb': estimar_bytes(df_filtrado) / MB if df_filtrado is not None else 0.0,
+        'historico_mb': tamanho_profundo(historico) / MB if historico is not None else 0.0,
+        'session_state_mb': tamanho_profundo(objetos) / MB,
+    }
+    with _lock_sessoes:
+        _sessoes[sessao_id] = foto
+        limite = time.time() - SESSAO_EXPIRACAO_S
+        for antiga in [s for s, f in _sessoes.items() if f['momento'] < limite]:
+            _sessoes.pop(antiga)
+
+
+def uso_sessoes():
+    with _lock_sessoes:
+        fotos = [{'sessao': sessao[:8], **foto} for sessao, foto in _sessoes.items()]
+    if not fotos:
+        return pd.DataFrame()
+    uso = pd.DataFrame(fotos)
+    uso['ultimo_rerun'] = pd.to_datetime(uso.pop('momento'), unit='s').dt.strftime('%H:%M:%S')
+    return uso.sort_values('session_state_mb', ascending=False, ignore_index=True).round(2)
+
+
+def verificar_orcamento():
+    """(RSS em MB, orçamento excedido?) - registra um aviso no log no máximo a cada minuto"""
+    global _ultimo_aviso
+    rss_mb, _ = rss_processo_mb()
+    excedido = bool(MEMORIA_ORCAMENTO_MB) and rss_mb is not None and rss_mb > MEMORIA_ORCAMENTO_MB
+    if excedido and time.time() - _ultimo_aviso > INTERVALO_AVISO_S:
+        _ultimo_aviso = time.time()
+        print(f"⚠️ Memória acima do orçamento: {rss_mb:.0f} MB de {MEMORIA_ORCAMENTO_MB:.0f} MB "
+              f"({len(_sessoes)} sessões ativas)")
+    return rss_mb, excedido
@@ -0,0 +1,173 @@
+"""
+Modelo simulado para testes de carga do assistente sem chamar a API do Gemini.
+
+Imita a interface usada pelo novo_assistente (generate_content com stream e request_options):
+latência configurável, resposta entregue em trechos (streaming), respeito ao timeout da
+requisição e injeção de erros transitórios ou permanentes. Ativado com o backend "simulado":
+
+    [assistente]
+    backend = "simulado"
+
+ou ASSISTENTE_BACKEND=simulado. Os parâmetros ficam na mesma seção, com o prefixo "simulado_".
+"""
+
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from novo_assistente import _ler_config
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:
+    google_exceptions = None
+
+SIMULADO_LATENCIA_S = _ler_config("simulado_latencia_s", 1.0)       # Tempo total médio da resposta
+SIMULADO_VARIACAO_S = _ler_config("simulado_variacao_s", 0.3)       # Desvio padrão da latência
+SIMULADO_TTFT_S = _ler_config("simulado_ttft_s", 0.3)               # Tempo até o primeiro trecho
+SIMULADO_TRECHOS = _ler_config("simulado_trechos", 5)
+SIMULADO_TAXA_ERRO = _ler_config("simulado_taxa_erro", 0.0)         # Probabilidade de erro por chamada
+SIMULADO_ERRO_PERMANENTE = _ler_config("simulado_erro_permanente", False)
+SIMULADO_SEMENTE = _ler_config("simulado_semente", 0)               # 0 = aleatório a cada execução
+
+RESPOSTA_PADRAO = (
+    "📊 **Resposta simulada ({modelo})**\n\n"
+    "Pergunta recebida: *{pergunta}*\n\n"
+    "O prompt tinha {caracteres} caracteres. Esta resposta foi gerada pelo modelo simulado "
+    "para testes de carga e não reflete uma análise real dos dados."
+)
+
+
+class EstatisticasSimulado:
+    """Contadores compartilhados por todas as instâncias, para conferir o comportamento sob carga"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        with self._lock:
+            self.chamadas = 0
+            self.erros_injetados = 0
+            self.timeouts = 0
+            self.simultaneas = 0
+            self.simultaneas_max = 0
+
+    def entrar(self):
+        with self._lock:
+            self.chamadas += 1
+            self.simultaneas += 1
+            self.simultaneas_max = max(self.simultaneas_max, self.simultaneas)
+
+    def sair(self):
+        with self._lock:
+            self.simultaneas -= 1
+
+    def contar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def resumo(self):
+        with self._lock:
+            return {
+                'chamadas': self.chamadas,
+                'erros_injetados': self.erros_injetados,
+                'timeouts': self.timeouts,
+                'simultaneas_max': self.simultaneas_max,
+            }
+
+
+estatisticas = EstatisticasSimulado()
+
+_aleatorio = random.Random(SIMULADO_SEMENTE or None)
+_lock_aleatorio = threading.Lock()
+
+
+def _sortear(funcao, *args):
+    with _lock_aleatorio:
+        return funcao(*args)
+
+
+def _erro_injetado():
+    if SIMULADO_ERRO_PERMANENTE:
+        return ValueError("Erro permanente injetado pelo modelo simulado")
+    if google_exceptions is not None:
+        return google_exceptions.ServiceUnavailable("Erro transitório injetado pelo modelo simulado")
+    return ConnectionError("Erro transitório injetado pelo modelo simulado")
+
+
+class RespostaSimulada:
+    """Resposta iterável: com stream=True, cada trecho só 'chega' quando é consumido"""
+
+    def __init__(self, trechos, atrasos, prompt_chars, ao_terminar=None):
+        self._trechos = trechos
+        self._atrasos = atrasos
+        self._ao_terminar = ao_terminar
+        self.text = "".join(trechos)
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_chars // 4,
+            candidates_token_count=len(self.text) // 4,
+        )
+
+    def __iter__(self):
+        try:
+            for trecho, atraso in zip(self._trechos, self._atrasos):
+                time.sleep(atraso)
+                yield SimpleNamespace(text=trecho)
+        finally:
+            self._atrasos = [0.0] * len(self._trechos)
+            if self._ao_terminar is not None:
+                self._ao_terminar()
+                self._ao_terminar = None
+
+
+class ModeloSimulado:
+    """Substituto do genai.GenerativeModel com latência, streaming e erros configuráveis"""
+
+    def __init__(self, nome_modelo, latencia_s=None, ttft_s=None, trechos=None, taxa_erro=None, resposta=None):
+        self.nome_modelo = nome_modelo
+        self.latencia_s = SIMULADO_LATENCIA_S if latencia_s is None else latencia_s
+        self.ttft_s = SIMULADO_TTFT_S if ttft_s is None else ttft_s
+        self.trechos = max(1, int(trechos or SIMULADO_TRECHOS))
+        self.taxa_erro = SIMULADO_TAXA_ERRO if taxa_erro is None else taxa_erro
+        self.resposta = resposta or RESPOSTA_PADRAO
+
+    def _texto(self, prompt):
+        encontrada = re.search(r"PERGUNTA DO USUÁRIO:\s*(.+)", prompt)
+        pergunta = encontrada.group(1).strip() if encontrada else ""
+        return self.resposta.format(modelo=self.nome_modelo, pergunta=pergunta, caracteres=len(prompt))
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        timeout = (request_options or {}).get("timeout")
+        estatisticas.entrar()
+        em_stream = False
+        try:
+            if _sortear(_aleatorio.random) < self.taxa_erro:
+                estatisticas.contar('erros_injetados')
+                time.sleep(min(self.ttft_s, timeout or self.ttft_s))
+                raise _erro_injetado()
+
+            latencia = max(self.ttft_s, _sortear(_aleatorio.gauss, self.latencia_s, SIMULADO_VARIACAO_S))
+            if timeout is not None and latencia > timeout:
+                estatisticas.contar('timeouts')
+                time.sleep(timeout)
+                raise TimeoutError(f"Modelo simulado excedeu o timeout de {timeout:.1f}s")
+
+            texto = self._texto(prompt)
+            tamanho = -(-len(texto) // self.trechos)
+            partes = [texto[i:i + tamanho] for i in range(0, len(texto), tamanho)]
+            intervalo = (latencia - self.ttft_s) / max(1, len(partes) - 1)
+            atrasos = [self.ttft_s] + [intervalo] * (len(partes) - 1)
+
+            # A chamada só termina quando o último trecho é consumido
+            resposta = RespostaSimulada(partes, atrasos, len(prompt), ao_terminar=estatisticas.sair)
+            em_stream = True
+            if not stream:
+                # Sem streaming, a resposta só volta inteira
+                list(resposta)
+            return resposta
+        finally:
+            if not em_stream:
+                estatisticas.sair()
@@ -0,0 +1,496 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import pandas as pd
+
+# =============================================================================
+# MOTOR LOCAL DE INTENÇÕES
+# Responde perguntas quantitativas simples (contagem, média diária, top-N,
+# participação) sem chamar o Gemini, a partir de agregados pré-calculados.
+# =============================================================================
+
+# Dimensões conhecidas: coluna -> palavras (já normalizadas) que a identificam
+DIMENSOES = {
+    'Atendente': ['atendente', 'atendentes', 'colaborador', 'colaboradores', 'analista', 'analistas'],
+    'Modulos': ['modulo', 'modulos', 'sistema', 'sistemas'],
+    'UF': ['uf', 'ufs', 'estado', 'estados'],
+    'Canais': ['canal', 'canais'],
+    'Cliente': ['cliente', 'clientes'],
+    'Tipos': ['tipo', 'tipos'],
+    'Categorias': ['categoria', 'categorias'],
+}
+
+NOMES_DIMENSOES = {
+    'Atendente': 'atendente',
+    'Modulos': 'módulo',
+    'UF': 'UF',
+    'Canais': 'canal',
+    'Cliente': 'cliente',
+    'Tipos': 'tipo',
+    'Categorias': 'categoria',
+}
+
+# Colunas com muitos valores distintos ficam fora do cubo de agregados
+DIMENSOES_ALTA_CARDINALIDADE = {'Cliente'}
+
+# Termos que indicam análise aberta: essas perguntas continuam indo para o Gemini.
+# Termo -> expressão sobre o texto normalizado, só palavras inteiras ou radicais no início da palavra
+# (os radicais em comum usam as mesmas expressões de VERBOS_ANALITICOS, no novo_assistente)
+TERMOS_ANALISE_ABERTA = {
+    'por que': r'\bpor ?que\b',
+    'motivo': r'\bmotivos?\b',
+    'sugir': r'\bsug(ir|ere|erir|ira|iram|estao|estoes)\b',
+    'recomend': r'\brecomend\w*',
+    'analis': r'\banalis\w*',
+    'tendencia': r'\btendencias?\b',
+    'padrao': r'\bpadr(ao|oes)\b',
+    'insight': r'\binsights?\b',
+    'explic': r'\bexplic\w*',
+    'compar': r'\bcompar(ar|e|em|ando|ado|ada|ados|adas|acao|acoes|ativo|ativa|ativos|ativas)\b',
+    'sazonal': r'\bsazona\w*',
+    'melhorar': r'\bmelhor(ar|ia|ias)\b',
+    'estrateg': r'\bestrateg\w*',
+    'previs': r'\b(previs\w*|prever|preveja)\b',
+    'correla': r'\bcorrela\w*',
+    'o que voce acha': r'\bo que voce acha\b',
+    'avali': r'\bavali\w*',
+    'gargalo': r'\bgargalos?\b',
+    'oportunidade': r'\boportunidades?\b',
+    'como podemos': r'\bcomo (podemos|posso)\b',
+    'resum': r'\bresum\w*',
+}
+_PADROES_ANALISE_ABERTA = [re.compile(padrao) for padrao in TERMOS_ANALISE_ABERTA.values()]
+
+# Preposições que marcam uma sigla de UF escrita em minúsculas ("em sp", "do mg")
+PREPOSICOES_UF = ('em', 'no', 'na', 'do', 'da', 'de')
+
+# Palavras que podem seguir o nome de uma dimensão sem citar um valor dela ("quantos clientes
+# distintos", "atendentes do módulo X"); qualquer outra palavra depois da dimensão é tratada como
+# o nome de um valor (ex.: "o atendente Fulano de Tal")
+PALAVRAS_APOS_DIMENSAO = {
+    'o', 'a', 'os', 'as', 'um', 'uma', 'em', 'no', 'na', 'nos', 'nas', 'por', 'para', 'com', 'sem',
+    'que', 'qual', 'quais', 'quem', 'e', 'ou', 'mais', 'menos', 'tem', 'temos', 'ha', 'houve',
+    'existe', 'existem', 'sao', 'foram', 'estao', 'distintos', 'distintas', 'diferentes', 'unicos',
+    'unicas', 'ativos', 'ativas', 'atendidos', 'atendidas', 'atendeu', 'atenderam', 'atendimento',
+    'atendimentos', 'chamado', 'chamados', 'fez', 'fizeram', 'teve', 'tiveram', 'registrados',
+    'registradas', 'cadastrados', 'cadastradas', 'hoje', 'ontem', 'anteontem', 'este', 'esta',
+    'esse', 'essa', 'neste', 'nesta', 'nesse', 'nessa', 'mes', 'semana', 'ano', 'dia', 'dias',
+    'ultimo', 'ultima', 'ultimos', 'ultimas', 'passado', 'passada', 'atual', 'total', 'media',
+    'diaria', 'diario', 'percentual', 'porcentagem', 'participacao', 'proporcao', 'ranking', 'top',
+}
+# Artigos e preposições entre a dimensão e o valor citado ("estado de Goiás", "módulo do Fiscal")
+LIGACOES_DIMENSAO = {'de', 'do', 'da', 'dos', 'das', 'o', 'a', 'os', 'as'}
+
+TERMOS_METRICAS = [
+    ('participacao', ['percentual', 'porcentagem', '%', 'participacao', 'proporcao', 'fatia']),
+    ('media_diaria', ['media', 'por dia', 'diaria', 'diario']),
+    ('top_n', ['top', 'ranking', 'maiores', 'principais', 'quem mais', 'que mais', 'mais atend', 'mais chamad']),
+    ('contagem', ['quantos', 'quantas', 'total', 'quantidade', 'numero de']),
+]
+
+MESES = {
+    'janeiro': 1, 'fevereiro': 2, 'marco': 3, 'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12,
+}
+# Nomes com acento para os rótulos das respostas (as chaves de MESES são o texto normalizado)
+NOMES_MESES = {
+    1: 'janeiro', 2: 'fevereiro', 3: 'março', 4: 'abril', 5: 'maio', 6: 'junho',
+    7: 'julho', 8: 'agosto', 9: 'setembro', 10: 'outubro', 11: 'novembro', 12: 'dezembro',
+}
+
+VALORES_PADRAO = {'NAO INFORMADO', 'NAO INFORMADA'}
+
+MAX_PALAVRAS = 25
+TOP_N_PADRAO = 5
+
+
+def _sem_acentos(texto):
+    texto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos, para comparar palavras-chave"""
+    return ' '.join(_sem_acentos(texto).lower().split())
+
+
+def _contem_palavra(texto_norm, termo):
+    return re.search(r'(?<!\w)' + re.escape(termo) + r'(?!\w)', texto_norm) is not None
+
+
+# =============================================================================
+# INTERPRETAÇÃO DA PERGUNTA
+# =============================================================================
+
+def _fim_do_mes(ano, mes):
+    if mes == 12:
+        return date(ano, 12, 31)
+    return date(ano, mes + 1, 1) - timedelta(days=1)
+
+
+def extrair_periodo(texto_norm, data_referencia):
+    """Retorna (inicio, fim, rotulo) ou None quando a pergunta não cita período"""
+    ref = data_referencia
+
+    if _contem_palavra(texto_norm, 'anteontem'):
+        dia = ref - timedelta(days=2)
+        return dia, dia, f"anteontem ({dia.strftime('%d/%m/%Y')})"
+    if _contem_palavra(texto_norm, 'ontem'):
+        dia = ref - timedelta(days=1)
+        return dia, dia, f"ontem ({dia.strftime('%d/%m/%Y')})"
+    if _contem_palavra(texto_norm, 'hoje'):
+        return ref, ref, f"hoje ({ref.strftime('%d/%m/%Y')})"
+
+    m = re.search(r'ultim[oa]s (\d{1,3}) dias', texto_norm)
+    if m:
+        n = max(1, int(m.group(1)))
+        return ref - timedelta(days=n - 1), ref, f"últimos {n} dias"
+
+    if re.search(r'semana passada|ultima semana', texto_norm):
+        return ref - timedelta(days=6), ref, "últimos 7 dias"
+    if re.search(r'(esta|nesta|essa|nessa) semana', texto_norm):
+        inicio = ref - timedelta(days=ref.weekday())
+        return inicio, ref, "esta semana"
+
+    if re.search(r'mes passado|ultimo mes', texto_norm):
+        fim = ref.replace(day=1) - timedelta(days=1)
+        return fim.replace(day=1), fim, f"mês passado ({fim.strftime('%m/%Y')})"
+    if re.search(r'(este|neste|esse|nesse) mes|mes atual', texto_norm):
+        return ref.replace(day=1), ref, f"este mês ({ref.strftime('%m/%Y')})"
+
+    m = re.search(r'(?<!\d)(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?(?!\d)', texto_norm)
+    if m:
+        dia, mes = int(m.group(1)), int(m.group(2))
+        ano = int(m.group(3)) if m.group(3) else ref.year
+        if ano < 100:
+            ano += 2000
+        try:
+            alvo = date(ano, mes, dia)
+        except ValueError:
+            return None
+        return alvo, alvo, alvo.strftime('%d/%m/%Y')
+
+    m = re.search(r'\b(?:em|de|no mes de) (' + '|'.join(MESES) + r')(?: de (\d{4}))?', texto_norm)
+    if m:
+        mes = MESES[m.group(1)]
+        ano = int(m.group(2)) if m.group(2) else (ref.year if mes <= ref.month else ref.year - 1)
+        return date(ano, mes, 1), _fim_do_mes(ano, mes), f"{NOMES_MESES[mes]} de {ano}"
+
+    return None
+
+
+def _extrair_filtros(pergunta, texto_norm, df):
+    """Procura na pergunta valores existentes das dimensões (ex.: nome de atendente, módulo, UF)"""
+    filtros = {}
+    tokens_originais = set(re.findall(r'\b[A-Z]{2}\b', pergunta))
+
+    for coluna in DIMENSOES:
+        if coluna not in df.columns or coluna in DIMENSOES_ALTA_CARDINALIDADE:
+            continue
+
+        candidatos = []
+        for valor in df[coluna].dropna().unique():
+            valor_str = str(valor)
+            valor_norm = normalizar(valor_str)
+            if valor_norm.upper() in VALORES_PADRAO or len(valor_norm) < 2:
+                continue
+            if coluna == 'UF':
+                # Siglas de UF valem em maiúsculas ("SP", "MG") ou logo depois de uma preposição
+                # ("em sp", "do mg"), para não confundir com "se", "ao"...
+                if valor_str.upper() in tokens_originais or any(
+                        _contem_palavra(texto_norm, f"{prep} {valor_norm}") for prep in PREPOSICOES_UF):
+                    candidatos.append(valor)
+            elif len(valor_norm) >= 3 and _contem_palavra(texto_norm, valor_norm):
+                candidatos.append(valor)
+
+        if candidatos:
+            # Prefere o valor mais específico (mais longo)
+            filtros[coluna] = max(candidatos, key=lambda v: len(str(v)))
+
+    return filtros
+
+
+def _sem_valores_filtrados(texto, filtros):
+    """Texto da pergunta sem os valores já reconhecidos como filtro (ex.: o módulo "Previsão de Vendas")"""
+    for valor in filtros.values():
+        texto = re.sub(r'(?<!\w)' + re.escape(_sem_acentos(valor)) + r'(?!\w)', ' ', texto, flags=re.IGNORECASE)
+    return texto
+
+
+def _valor_nao_resolvido(pergunta, filtros, df):
+    """
+    Coluna cuja dimensão é seguida, na pergunta, pelo nome de um valor que não virou filtro
+    ("do cliente Cliente 000000", "o atendente Fulano de Tal"), ou None. Responder sem esse
+    filtro seria responder outra pergunta.
+    """
+    palavras = re.findall(r'\w+', _sem_valores_filtrados(_sem_acentos(pergunta), filtros))
+    minusculas = [p.lower() for p in palavras]
+    termos_dimensoes = {t for termos in DIMENSOES.values() for t in termos}
+
+    for coluna, termos in DIMENSOES.items():
+        if coluna not in df.columns or coluna in filtros:
+            continue
+        for i, palavra in enumerate(minusculas):
+            if palavra not in termos:
+                continue
+            # "por atendente", "de cada módulo": agrupamento, não um valor
+            if i and minusculas[i - 1] in ('por', 'cada'):
+                continue
+            j = i + 1
+            while j < len(palavras) and minusculas[j] in LIGACOES_DIMENSAO:
+                j += 1
+            if j == len(palavras):
+                continue
+            seguinte, seguinte_min = palavras[j], minusculas[j]
+            if seguinte[0].isdigit() or seguinte_min not in PALAVRAS_APOS_DIMENSAO | termos_dimensoes \
+                    or (seguinte[0].isupper() and seguinte_min not in PALAVRAS_APOS_DIMENSAO):
+                return coluna
+    return None
+
+
+def _extrair_top_n(texto_norm):
+    m = re.search(r'top ?(\d{1,2})|(\d{1,2}) (?:maiores|principais|primeiros|mais)', texto_norm)
+    if m:
+        return max(1, int(m.group(1) or m.group(2)))
+    return TOP_N_PADRAO
+
+
+def interpretar_pergunta(pergunta, df, data_referencia=None):
+    """
+    Extrai a intenção de uma pergunta em português.
+
+    Retorna um dict com 'metrica', 'dimensao', 'agrupar', 'periodo', 'filtros' e 'n',
+    ou None se a pergunta for aberta demais para o motor local.
+    """
+    if not pergunta or not isinstance(df, pd.DataFrame) or df.empty:
+        return None
+
+    texto_norm = normalizar(pergunta)
+    if len(texto_norm.split()) > MAX_PALAVRAS:
+        return None
+    filtros = None
+    if any(padrao.search(texto_norm) for padrao in _PADROES_ANALISE_ABERTA):
+        # O termo pode ser só parte de um valor citado (módulo "Previsão de Vendas"): confere sem os valores
+        filtros = _extrair_filtros(pergunta, texto_norm, df)
+        texto_sem_valores = normalizar(_sem_valores_filtrados(texto_norm, filtros))
+        if any(padrao.search(texto_sem_valores) for padrao in _PADROES_ANALISE_ABERTA):
+            return None
+
+    metrica = None
+    for nome, termos in TERMOS_METRICAS:
+        if any((termo in texto_norm) if ' ' in termo or not termo.isalnum() else _contem_palavra(texto_norm, termo)
+               for termo in termos):
+            metrica = nome
+            break
+    if metrica is None:
+        return None
+
+    if filtros is None:
+        filtros = _extrair_filtros(pergunta, texto_norm, df)
+    # Valor citado que não virou filtro (nome inexistente ou dimensão de alta cardinalidade, que
+    # nunca vira filtro): a pergunta vai para o Gemini em vez de receber o total sem o recorte
+    if _valor_nao_resolvido(pergunta, filtros, df) is not None:
+        return None
+
+    # Dimensão de agrupamento: citada na pergunta e sem valor já usado como filtro
+    dimensao = None
+    agrupar = False
+    for coluna, termos in DIMENSOES.items():
+        if coluna not in df.columns or coluna in filtros:
+            continue
+        termo = next((t for t in termos if t != 'quem' and _contem_palavra(texto_norm, t)), None)
+        if termo is not None:
+            dimensao = coluna
+            agrupar = any(_contem_palavra(texto_norm, f"{prefixo} {termo}") for prefixo in ('por', 'de cada', 'cada'))
+            break
+
+    # "Quem mais atendeu?" sem outra dimensão citada refere-se aos atendentes
+    if dimensao is None and _contem_palavra(texto_norm, 'quem') and 'Atendente' in df.columns and 'Atendente' not in filtros:
+        dimensao = 'Atendente'
+
+    if metrica == 'top_n' and dimensao is None:
+        return None
+
+    if data_referencia is None:
+        data_referencia = date.today()
+
+    return {
+        'metrica': metrica,
+        'dimensao': dimensao,
+        'agrupar': agrupar,
+        'periodo': extrair_periodo(texto_norm, data_referencia),
+        'filtros': filtros,
+        'n': _extrair_top_n(texto_norm),
+    }
+
+
+# =============================================================================
+# AGREGADOS PRÉ-CALCULADOS
+# =============================================================================
+
+_cache_cubos = OrderedDict()
+_lock_cubos = threading.Lock()
+MAX_CUBOS_EM_CACHE = 8
+
+
+def _construir_cubo(df):
+    """Contagem de atendimentos por dia e por todas as dimensões de baixa cardinalidade"""
+    dimensoes = [c for c in DIMENSOES if c in df.columns and c not in DIMENSOES_ALTA_CARDINALIDADE]
+    dia = pd.to_datetime(df['Data'], errors='coerce').dt.normalize().rename('Data')
+    cubo = df.groupby([dia] + [df[c] for c in dimensoes], observed=True, dropna=False).size()
+    return cubo.rename('Quantidade').reset_index()
+
+
+def obter_cubo(df, chave_dados=None):
+    """Retorna o cubo de agregados do DataFrame, reaproveitando o cache pela chave dos dados"""
+    if chave_dados is None:
+        return _construir_cubo(df)
+
+    with _lock_cubos:
+        cubo = _cache_cubos.get(chave_dados)
+        if cubo is not None:
+            _cache_cubos.move_to_end(chave_dados)
+            return cubo
+
+    cubo = _construir_cubo(df)
+    with _lock_cubos:
+        _cache_cubos[chave_dados] = cubo
+        while len(_cache_cubos) > MAX_CUBOS_EM_CACHE:
+            _cache_cubos.popitem(last=False)
+    return cubo
+
+
+def cubos_em_cache():
+    """Cubos retidos no cache (cópia da lista, para a contabilidade de memória)"""
+    with _lock_cubos:
+        return list(_cache_cubos.values())
+
+
+def _base_agregada(df, intencao, chave_dados):
+    """Escolhe a base da consulta: o cubo, ou os dados brutos quando a dimensão é de alta cardinalidade"""
+    dimensao = intencao['dimensao']
+    if dimensao in DIMENSOES_ALTA_CARDINALIDADE:
+        colunas = [dimensao] + [c for c in intencao['filtros'] if c != dimensao]
+        base = df[colunas].copy()
+        base['Data'] = pd.to_datetime(df['Data'], errors='coerce').dt.normalize()
+        base['Quantidade'] = 1
+        return base
+    return obter_cubo(df, chave_dados)
+
+
+# =============================================================================
+# RESPOSTA
+# =============================================================================
+
+def _descrever_filtros(filtros):
+    return ', '.join(f"{NOMES_DIMENSOES.get(col, col)} **{valor}**" for col, valor in filtros.items())
+
+
+def responder_pergunta_local(pergunta, df, chave_dados=None, data_referencia=None):
+    """
+    Tenta responder a pergunta apenas com os agregados locais.
+    Retorna o texto em markdown, ou None se a pergunta precisar do Gemini.
+    """
+    if 'Data' not in getattr(df, 'columns', []):
+        return None
+
+    intencao = interpretar_pergunta(pergunta, df, data_referencia)
+    if intencao is None:
+        return None
+
+    try:
+        base = _base_agregada(df, intencao, chave_dados)
+    except Exception as e:
+        print(f"⚠️ Motor local não conseguiu montar os agregados: {e}")
+        return None
+
+    periodo = intencao['periodo']
+    if periodo is not None:
+        inicio, fim, rotulo_periodo = periodo
+        base = base[(base['Data'] >= pd.Timestamp(inicio)) & (base['Data'] <= pd.Timestamp(fim))]
+    else:
+        rotulo_periodo = "todo o período filtrado"
+
+    for coluna, valor in intencao['filtros'].items():
+        base = base[base[coluna] == valor]
+
+    metrica = intencao['metrica']
+    dimensao = intencao['dimensao']
+    nome_dimensao = NOMES_DIMENSOES.get(dimensao, dimensao)
+    total = int(base['Quantidade'].sum())
+    dias = base.loc[base['Quantidade'] > 0, 'Data'].nunique()
+
+    linhas = ["⚡ **Resposta instantânea (análise local):**", ""]
+    contexto = f"Período: {rotulo_periodo}"
+    if intencao['filtros']:
+        contexto += f" | Filtros: {_descrever_filtros(intencao['filtros'])}"
+    linhas.append(f"*{contexto}*")
+    linhas.append("")
+
+    if total == 0:
+        datas = pd.to_datetime(df['Data'], errors='coerce')
+        linhas.append("📭 Nenhum atendimento encontrado para esse recorte.")
+        linhas.append(
+            f"ℹ️ Os dados filtrados vão de {datas.min().strftime('%d/%m/%Y')} a {datas.max().strftime('%d/%m/%Y')}."
+        )
+        return "\n".join(linhas)
+
+    if dimensao is not None:
+        por_dimensao = base.groupby(dimensao, observed=True)['Quantidade'].sum().sort_values(ascending=False)
+        por_dimensao = por_dimensao[por_dimensao > 0]
+
+    if metrica == 'contagem':
+        if dimensao is None:
+            linhas.append(f"• **Total de atendimentos:** {total}")
+        elif intencao['agrupar']:
+            linhas.append(f"📋 **Atendimentos por {nome_dimensao}:**")
+            for i, (valor, quantidade) in enumerate(por_dimensao.head(10).items(), 1):
+                linhas.append(f"{i}. **{valor}**: {quantidade} atendimentos")
+            if len(por_dimensao) > 10:
+                linhas.append(f"... e mais {len(por_dimensao) - 10} valores")
+        else:
+            linhas.append(f"• **Quantidade de {nome_dimensao}s distintos:** {len(por_dimensao)}")
+            linhas.append(f"• **Total de atendimentos:** {total}")
+
+    elif metrica == 'media_diaria':
+        if dimensao is not None and intencao['agrupar']:
+            dias_por_valor = base[base['Quantidade'] > 0].groupby(dimensao, observed=True)['Data'].nunique()
+            medias = (por_dimensao / dias_por_valor.reindex(por_dimensao.index)).sort_values(ascending=False)
+            linhas.append(f"📈 **Média diária por {nome_dimensao}** (dias com registro):")
+            for i, (valor, media) in enumerate(medias.head(10).items(), 1):
+                linhas.append(f"{i}. **{valor}**: {media:.1f} atendimentos/dia")
+        else:
+            linhas.append(f"• **Média diária:** {total / max(dias, 1):.1f} atendimentos/dia")
+            linhas.append(f"• **Dias com registro:** {dias}")
+            linhas.append(f"• **Total de atendimentos:** {total}")
+
+    elif metrica == 'top_n':
+        n = intencao['n']
+        linhas.append(f"🏆 **Top {n} {nome_dimensao}s por atendimentos:**")
+        for i, (valor, quantidade) in enumerate(por_dimensao.head(n).items(), 1):
+            percentual = quantidade / total * 100
+            linhas.append(f"{i}. **{valor}**: {quantidade} atendimentos ({percentual:.1f}%)")
+
+    elif metrica == 'participacao':
+        if dimensao is not None:
+            n = max(intencao['n'], 10)
+            linhas.append(f"📊 **Participação por {nome_dimensao}:**")
+            for valor, quantidade in por_dimensao.head(n).items():
+                linhas.append(f"• **{valor}**: {quantidade / total * 100:.1f}% ({quantidade} atendimentos)")
+        elif intencao['filtros']:
+            # Participação do recorte filtrado sobre o total do período
+            referencia = _base_agregada(df, {**intencao, 'filtros': {}}, chave_dados)
+            if periodo is not None:
+                referencia = referencia[(referencia['Data'] >= pd.Timestamp(inicio)) & (referencia['Data'] <= pd.Timestamp(fim))]
+            total_periodo = int(referencia['Quantidade'].sum())
+            linhas.append(
+                f"• **Participação:** {total / max(total_periodo, 1) * 100:.1f}% "
+                f"({total} de {total_periodo} atendimentos)"
+            )
+        else:
+            return None
+
+    return "\n".join(linhas)
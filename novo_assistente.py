@@ -3,482 +3,1693 @@ import pandas as pd
 from datetime import datetime
 import numpy as np
 import os
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+from types import SimpleNamespace
 import streamlit as st # Usado apenas para st.secrets em debug, mas mantido para robustez
+from motor_intencoes import (DIMENSOES, cubos_em_cache, extrair_periodo, normalizar, obter_cubo,
+                             responder_pergunta_local)
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # google-api-core vem junto com o SDK, mas não quebramos sem ele
+    google_exceptions = None
+
+# =============================================================================
+# CONFIGURAÇÃO DE RESILIÊNCIA (timeout, retentativas e circuit breaker)
+# =============================================================================
+
+def _ler_config(nome, padrao):
+    """
+    Lê uma configuração do assistente.
+    Prioridade: seção [assistente] do secrets.toml, depois variável de ambiente ASSISTENTE_<NOME>.
+    """
+    valor = None
+    try:
+        if "assistente" in st.secrets and nome in st.secrets.assistente:
+            valor = st.secrets.assistente[nome]
+    except Exception:
+        valor = None
+
+    if valor is None:
+        valor = os.getenv(f"ASSISTENTE_{nome.upper()}")
+
+    if valor is None:
+        return padrao
+
+    try:
+        return type(padrao)(valor)
+    except (TypeError, ValueError):
+        print(f"⚠️ Configuração inválida para '{nome}': {valor!r}. Usando padrão {padrao!r}")
+        return padrao
+
+
+GEMINI_TIMEOUT_S = _ler_config("timeout_s", 30.0)            # Limite de cada tentativa
+GEMINI_PRAZO_TOTAL_S = _ler_config("prazo_total_s", 60.0)    # Limite somando todas as tentativas
+GEMINI_MAX_TENTATIVAS = _ler_config("max_tentativas", 3)
+GEMINI_BACKOFF_BASE_S = _ler_config("backoff_base_s", 1.0)
+BREAKER_LIMITE_FALHAS = _ler_config("breaker_limite_falhas", 3)
+BREAKER_RESFRIAMENTO_S = _ler_config("breaker_resfriamento_s", 120.0)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker compartilhado entre todas as sessões do servidor.
+
+    - fechado: chamadas passam normalmente
+    - aberto: após falhas seguidas, as perguntas vão direto para a análise local
+    - meio-aberto: terminado o resfriamento, uma única chamada de teste é liberada
+    """
+
+    def __init__(self, limite_falhas, resfriamento_s):
+        self.limite_falhas = limite_falhas
+        self.resfriamento_s = resfriamento_s
+        self._lock = threading.Lock()
+        self._falhas_seguidas = 0
+        self._aberto_ate = 0.0
+        self._teste_em_andamento = False
+
+    def permitir_chamada(self):
+        with self._lock:
+            if self._falhas_seguidas < self.limite_falhas:
+                return True
+            if time.monotonic() < self._aberto_ate:
+                return False
+            # Meio-aberto: apenas uma chamada de teste por vez
+            if self._teste_em_andamento:
+                return False
+            self._teste_em_andamento = True
+            return True
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self._falhas_seguidas = 0
+            self._aberto_ate = 0.0
+            self._teste_em_andamento = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self._falhas_seguidas += 1
+            self._teste_em_andamento = False
+            if self._falhas_seguidas >= self.limite_falhas:
+                self._aberto_ate = time.monotonic() + self.resfriamento_s
+                print(f"🔌 Circuit breaker ABERTO por {self.resfriamento_s:.0f}s após {self._falhas_seguidas} falhas")
+
+    def cancelar_teste(self):
+        """Libera a vaga de teste sem contar sucesso nem falha (ex.: desistiu na fila)"""
+        with self._lock:
+            self._teste_em_andamento = False
+
+    def segundos_restantes(self):
+        with self._lock:
+            return max(0.0, self._aberto_ate - time.monotonic())
+
+
+# Instância única por processo: todas as sessões do Streamlit compartilham o mesmo estado
+breaker_gemini = CircuitBreaker(BREAKER_LIMITE_FALHAS, BREAKER_RESFRIAMENTO_S)
+
+
+def _erro_transitorio(erro):
+    """Indica se vale a pena tentar de novo (timeout, sobrecarga, erro 5xx, limite de cota)"""
+    if isinstance(erro, (TimeoutError, ConnectionError)):
+        return True
+    if google_exceptions is not None:
+        transitorios = (
+            google_exceptions.DeadlineExceeded,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.InternalServerError,
+            google_exceptions.ResourceExhausted,
+            google_exceptions.TooManyRequests,
+        )
+        return isinstance(erro, transitorios)
+    return False
+
+
+# =============================================================================
+# TELEMETRIA: ONDE O TEMPO DE CADA CONSULTA É GASTO
+# =============================================================================
+
+TELEMETRIA_ATIVA = _ler_config("telemetria", True)
+ARQUIVO_TELEMETRIA = _ler_config("telemetria_arquivo", os.path.join("cache", "telemetria_assistente.sqlite"))
+
+# Colunas gravadas por consulta (tempos em milissegundos)
+CAMPOS_TELEMETRIA = {
+    'momento': 'TEXT',
+    'sessao_id': 'TEXT',
+    'modelo': 'TEXT',
+    'modo': 'TEXT',
+    'origem': 'TEXT',             # motor_local, gemini, ferramentas, fallback ou coalescida
+    'motivo_fallback': 'TEXT',
+    'cache_relatorio': 'TEXT',    # hit ou miss
+    'registros': 'INTEGER',
+    'pergunta_chars': 'INTEGER',
+    'relatorio_ms': 'REAL',
+    'prompt_chars': 'INTEGER',
+    'prompt_tokens': 'INTEGER',   # contagem do Gemini (usage_metadata) ou estimativa de 4 caracteres/token
+    'resposta_tokens': 'INTEGER',
+    'chamadas_modelo': 'INTEGER',
+    'fila_ms': 'REAL',
+    'modelo_ms': 'REAL',
+    'ttft_ms': 'REAL',            # tempo até o primeiro trecho da resposta (streaming)
+    'total_ms': 'REAL',
+}
+
+_telemetria_atual = threading.local()
+_job_atual = threading.local()  # Job em execução na thread: vira o ticket na fila do limitador
+_lock_telemetria = threading.Lock()
+
+
+def _anotar(**campos):
+    """Atualiza o registro da consulta em andamento nesta thread (sem efeito fora de uma consulta)"""
+    registro = getattr(_telemetria_atual, 'registro', None)
+    if registro is not None:
+        registro.update(campos)
+
+
+def _somar(campo, valor):
+    registro = getattr(_telemetria_atual, 'registro', None)
+    if registro is not None and valor is not None:
+        registro[campo] = (registro.get(campo) or 0) + valor
+
+
+@contextmanager
+def _medir(campo):
+    """Soma ao registro atual o tempo gasto no bloco, em ms"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _somar(campo, (time.perf_counter() - inicio) * 1000)
+
+
+@contextmanager
+def _registro_telemetria(**campos):
+    """Abre o registro de uma consulta na thread atual e grava ao final"""
+    registro = {'momento': datetime.now().isoformat(timespec='seconds'), **campos}
+    anterior = getattr(_telemetria_atual, 'registro', None)
+    _telemetria_atual.registro = registro
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro['total_ms'] = (time.perf_counter() - inicio) * 1000
+        _telemetria_atual.registro = anterior
+        if TELEMETRIA_ATIVA:
+            registrar_telemetria(registro)
+
+
+def _conectar_telemetria(arquivo):
+    pasta = os.path.dirname(arquivo)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    conexao = sqlite3.connect(arquivo, timeout=5)
+    colunas = ", ".join(f"{nome} {tipo}" for nome, tipo in CAMPOS_TELEMETRIA.items())
+    conexao.execute(f"CREATE TABLE IF NOT EXISTS consultas ({colunas})")
+    return conexao
+
+
+def registrar_telemetria(registro, arquivo=None):
+    """Grava o registro no SQLite local; falhas de disco nunca afetam a resposta"""
+    valores = [registro.get(campo) for campo in CAMPOS_TELEMETRIA]
+    try:
+        with _lock_telemetria:
+            conexao = _conectar_telemetria(arquivo or ARQUIVO_TELEMETRIA)
+            with conexao:
+                conexao.execute(
+                    f"INSERT INTO consultas ({', '.join(CAMPOS_TELEMETRIA)}) "
+                    f"VALUES ({', '.join('?' for _ in CAMPOS_TELEMETRIA)})",
+                    valores
+                )
+            conexao.close()
+    except Exception as e:
+        print(f"⚠️ Não foi possível gravar a telemetria: {e}")
+
+
+def carregar_telemetria(limite=5000, arquivo=None):
+    """Últimas consultas registradas, da mais recente para a mais antiga"""
+    arquivo = arquivo or ARQUIVO_TELEMETRIA
+    if not os.path.exists(arquivo):
+        return pd.DataFrame(columns=list(CAMPOS_TELEMETRIA))
+    with _lock_telemetria:
+        conexao = _conectar_telemetria(arquivo)
+        try:
+            return pd.read_sql_query(
+                "SELECT * FROM consultas ORDER BY rowid DESC LIMIT ?", conexao, params=(int(limite),)
+            )
+        finally:
+            conexao.close()
+
+
+METRICAS_TELEMETRIA = ['total_ms', 'relatorio_ms', 'fila_ms', 'modelo_ms', 'ttft_ms', 'prompt_chars', 'prompt_tokens']
+
+
+def resumo_telemetria(df_telemetria, metrica='total_ms', por=('modelo', 'origem')):
+    """Percentis (p50/p90/p95/p99) de uma métrica, agrupados por modelo e origem"""
+    if df_telemetria.empty:
+        return pd.DataFrame()
+
+    dados = df_telemetria.copy()
+    dados[list(por)] = dados[list(por)].fillna('-')
+    dados[metrica] = pd.to_numeric(dados[metrica], errors='coerce')
+    dados = dados.dropna(subset=[metrica])
+    if dados.empty:
+        return pd.DataFrame()
+
+    agrupado = dados.groupby(list(por))[metrica]
+    resumo = agrupado.quantile([0.5, 0.9, 0.95, 0.99]).unstack()
+    resumo.columns = ['p50', 'p90', 'p95', 'p99']
+    resumo.insert(0, 'consultas', agrupado.size())
+    return resumo.round(1).sort_values('consultas', ascending=False).reset_index()
+
+# =============================================================================
+# LIMITE GLOBAL DE CHAMADAS SIMULTÂNEAS (fila justa por sessão)
+# =============================================================================
+
+LIMITE_SIMULTANEAS_PRO = _ler_config("limite_simultaneas_pro", 2)
+LIMITE_SIMULTANEAS_FLASH = _ler_config("limite_simultaneas_flash", 4)
+ESPERA_MAX_FILA_S = _ler_config("espera_max_fila_s", 90.0)
+# Consultas que podem esperar vaga ao mesmo tempo; acima disso a resposta vem da análise local
+FILA_MAX_CONSULTAS = _ler_config("fila_max_consultas", 16)
+
+
+class FilaCheiaError(TimeoutError):
+    """A consulta esperou demais por uma vaga no limitador"""
+
+
+class LimitadorConcorrencia:
+    """
+    Semáforo limitado compartilhado pelo processo, com fila justa por sessão.
+
+    Cada sessão tem sua própria fila e as vagas são distribuídas em rodízio entre
+    as sessões: quem dispara várias perguntas seguidas não passa na frente das demais.
+    """
+
+    def __init__(self, nome, limite):
+        self.nome = nome
+        self.limite = max(1, int(limite))
+        self._cond = threading.Condition()
+        self._em_uso = 0
+        self._filas = OrderedDict()  # sessao_id -> deque de tickets, na ordem do rodízio
+
+    def _ordem_atendimento(self):
+        """Simula o rodízio e retorna os tickets na ordem em que serão atendidos"""
+        filas = [list(fila) for fila in self._filas.values() if fila]
+        ordem = []
+        for rodada in range(max((len(fila) for fila in filas), default=0)):
+            for fila in filas:
+                if rodada < len(fila):
+                    ordem.append(fila[rodada])
+        return ordem
+
+    def _remover(self, sessao_id, ticket):
+        fila = self._filas.get(sessao_id)
+        if fila is not None:
+            try:
+                fila.remove(ticket)
+            except ValueError:
+                pass
+            if not fila:
+                del self._filas[sessao_id]
+
+    def adquirir(self, sessao_id, timeout=None, ticket=None):
+        """
+        Espera por uma vaga; levanta FilaCheiaError se o timeout for atingido.
+        `ticket` identifica quem espera (ex.: o id do job) para consultar a posição depois.
+        """
+        ticket = ticket if ticket is not None else object()
+        prazo = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            self._filas.setdefault(sessao_id, deque()).append(ticket)
+            while True:
+                fila = next((f for f in self._filas.values() if f), None)
+                if self._em_uso < self.limite and fila is not None and fila[0] is ticket:
+                    self._remover(sessao_id, ticket)
+                    if sessao_id in self._filas:
+                        # Sessão atendida vai para o fim do rodízio
+                        self._filas.move_to_end(sessao_id)
+                    self._em_uso += 1
+                    self._cond.notify_all()
+                    return
+
+                restante = None if prazo is None else prazo - time.monotonic()
+                if restante is not None and restante <= 0:
+                    self._remover(sessao_id, ticket)
+                    self._cond.notify_all()
+                    raise FilaCheiaError(f"Sem vaga no limitador {self.nome} após {timeout:.0f}s")
+                self._cond.wait(timeout=restante)
+
+    def liberar(self):
+        with self._cond:
+            self._em_uso = max(0, self._em_uso - 1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def vaga(self, sessao_id, timeout=None):
+        self.adquirir(sessao_id, timeout=timeout)
+        try:
+            yield
+        finally:
+            self.liberar()
+
+    def posicao(self, sessao_id, ticket=None):
+        """
+        Posição (1 = próxima) do ticket na fila, ou da primeira pergunta da sessão se nenhum
+        ticket for informado; 0 se não estiver esperando.
+        """
+        with self._cond:
+            fila = self._filas.get(sessao_id)
+            if not fila:
+                return 0
+            ordem = self._ordem_atendimento()
+            if ticket is None:
+                return ordem.index(fila[0]) + 1
+            return ordem.index(ticket) + 1 if ticket in fila else 0
+
+    def estado(self):
+        with self._cond:
+            return {
+                'em_uso': self._em_uso,
+                'limite': self.limite,
+                'na_fila': sum(len(f) for f in self._filas.values())
+            }
+
+
+limitadores_gemini = {
+    'pro': LimitadorConcorrencia('Gemini Pro', LIMITE_SIMULTANEAS_PRO),
+    'flash': LimitadorConcorrencia('Gemini Flash', LIMITE_SIMULTANEAS_FLASH),
+}
+
+
+def _familia_modelo(tipo_modelo):
+    return 'pro' if "Pro" in tipo_modelo else 'flash'
+
+
+# =============================================================================
+# ROTEAMENTO AUTOMÁTICO FLASH/PRO
+# =============================================================================
+
+MODELO_PRO = '🚀 Gemini Pro - Análise Avançada'
+MODELO_FLASH = '⚡ Gemini Flash - Resposta Rápida'
+
+# Termo -> expressão sobre o texto normalizado (sem acentos). Só palavras inteiras ou radicais no
+# início da palavra: "projeto", "melhor atendente" ou "comparecimento" não são pedidos analíticos.
+VERBOS_ANALITICOS = {
+    'analis': r'\banalis\w*',
+    'compar': r'\bcompar(ar|e|em|ando|ado|ada|ados|adas|acao|acoes|ativo|ativa|ativos|ativas)\b',
+    'explic': r'\bexplic\w*',
+    'por que': r'\bpor ?que\b',
+    'motivo': r'\bmotivos?\b',
+    'sugir': r'\bsug(ir|ere|erir|ira|iram|estao|estoes)\b',
+    'recomend': r'\brecomend\w*',
+    'tendencia': r'\btendencias?\b',
+    'padrao': r'\bpadr(ao|oes)\b',
+    'sazonal': r'\bsazona\w*',
+    'correla': r'\bcorrela\w*',
+    'previs': r'\b(previs\w*|prever|preveja)\b',
+    'projet': r'\b(projet(ar|e|em|ando|ado|ada|ados|adas)|projec(ao|oes))\b',
+    'avali': r'\bavali\w*',
+    'estrateg': r'\bestrateg\w*',
+    'insight': r'\binsights?\b',
+    'gargalo': r'\bgargalos?\b',
+    'otimiz': r'\botimiz\w*',
+    'diagnost': r'\bdiagnost\w*',
+    'impacto': r'\bimpact(o|os|ou|aram|a|am|ar)\b',
+    'relacion': r'\brelacion\w*',
+}
+_PADROES_ANALITICOS = {termo: re.compile(padrao) for termo, padrao in VERBOS_ANALITICOS.items()}
+# Pedidos de explicação, causa ou recomendação já justificam o Pro sozinhos
+VERBOS_ABERTOS = ['por que', 'motivo', 'explic', 'sugir', 'recomend', 'previs', 'estrateg']
+PONTUACAO_MINIMA_PRO = _ler_config("pontuacao_minima_pro", 2)
+
+
+def classificar_complexidade(pergunta):
+    """
+    Classifica a pergunta localmente para escolher entre Flash e Pro.
+    Retorna {'modelo', 'pontuacao', 'motivos'}.
+    """
+    texto = normalizar(pergunta)
+    palavras = len(texto.split())
+    pontuacao = 0
+    motivos = []
+
+    if palavras > 25:
+        pontuacao += 2
+        motivos.append(f"pergunta longa ({palavras} palavras)")
+    elif palavras > 12:
+        pontuacao += 1
+        motivos.append(f"pergunta média ({palavras} palavras)")
+
+    verbos = [termo for termo, padrao in _PADROES_ANALITICOS.items() if padrao.search(texto)]
+    if verbos:
+        aberto = any(v in verbos for v in VERBOS_ABERTOS)
+        pontuacao += 2 if aberto or len(verbos) > 1 else 1
+        motivos.append(f"termos analíticos: {', '.join(verbos[:3])}")
+
+    dimensoes = [col for col, termos in DIMENSOES.items() if any(re.search(rf"\b{t}\b", texto) for t in termos)]
+    if len(dimensoes) >= 2:
+        pontuacao += 1
+        motivos.append(f"{len(dimensoes)} dimensões ({', '.join(dimensoes)})")
+
+    if texto.count('?') > 1 or ' e tambem ' in texto:
+        pontuacao += 1
+        motivos.append("várias perguntas em uma")
+
+    modelo = MODELO_PRO if pontuacao >= PONTUACAO_MINIMA_PRO else MODELO_FLASH
+    if not motivos:
+        motivos.append("consulta simples")
+    return {'modelo': modelo, 'pontuacao': pontuacao, 'motivos': motivos}
+
+
+def posicao_na_fila(tipo_modelo, sessao_id, job_id=None):
+    """Usado pela interface para mostrar a posição do job (ou da sessão) na fila do modelo"""
+    return limitadores_gemini[_familia_modelo(tipo_modelo)].posicao(sessao_id, ticket=job_id)
+
+
+def _gerar_com_resiliencia(model, prompt, limitador=None, sessao_id=None):
+    """
+    Chama generate_content respeitando o prazo total, com retentativas
+    (backoff exponencial com jitter) apenas para erros transitórios.
+    Cada tentativa ocupa uma vaga do limitador; o tempo na fila não conta no prazo.
+    A resposta é recebida em streaming para medir o tempo até o primeiro trecho.
+    """
+    inicio = time.monotonic()
+    ultimo_erro = None
+    _somar('prompt_chars', len(prompt))
+
+    for tentativa in range(1, GEMINI_MAX_TENTATIVAS + 1):
+        if limitador is not None:
+            chegada_fila = time.monotonic()
+            limitador.adquirir(sessao_id, timeout=ESPERA_MAX_FILA_S, ticket=getattr(_job_atual, 'id', None))
+            espera_fila = time.monotonic() - chegada_fila
+            inicio += espera_fila
+            _somar('fila_ms', espera_fila * 1000)
+
+        try:
+            restante = GEMINI_PRAZO_TOTAL_S - (time.monotonic() - inicio)
+            if restante <= 0:
+                break
+            _somar('chamadas_modelo', 1)
+            with _medir('modelo_ms'):
+                envio = time.perf_counter()
+                response = model.generate_content(
+                    prompt,
+                    stream=True,
+                    request_options={"timeout": min(GEMINI_TIMEOUT_S, restante)}
+                )
+                for _ in response:
+                    registro = getattr(_telemetria_atual, 'registro', None)
+                    if registro is not None and registro.get('ttft_ms') is None:
+                        registro['ttft_ms'] = (time.perf_counter() - envio) * 1000
+                texto = response.text
+
+            uso = getattr(response, 'usage_metadata', None)
+            _somar('prompt_tokens', getattr(uso, 'prompt_token_count', None) or len(prompt) // 4)
+            _somar('resposta_tokens', getattr(uso, 'candidates_token_count', None))
+            return texto
+        except Exception as e:
+            ultimo_erro = e
+            if not _erro_transitorio(e) or tentativa == GEMINI_MAX_TENTATIVAS:
+                raise
+        finally:
+            if limitador is not None:
+                limitador.liberar()
+
+        # Full jitter: espera aleatória entre 0 e base * 2^(tentativa-1), fora da vaga do limitador
+        espera = random.uniform(0, GEMINI_BACKOFF_BASE_S * (2 ** (tentativa - 1)))
+        espera = min(espera, max(0.0, GEMINI_PRAZO_TOTAL_S - (time.monotonic() - inicio)))
+        print(f"🔁 Erro transitório na tentativa {tentativa}: {ultimo_erro}. Nova tentativa em {espera:.1f}s")
+        time.sleep(espera)
+
+    raise TimeoutError(f"Prazo total de {GEMINI_PRAZO_TOTAL_S:.0f}s esgotado") from ultimo_erro
+
+# =============================================================================
+# SINGLE-FLIGHT: CONSULTAS IDÊNTICAS EM ANDAMENTO COMPARTILHAM A MESMA CHAMADA
+# =============================================================================
+
+def impressao_digital_dados(df):
+    """Hash do conteúdo do DataFrame (valores + índice), usado para identificar o mesmo recorte de dados"""
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return "vazio"
+    try:
+        hashes = pd.util.hash_pandas_object(df, index=True).values
+        return hashlib.sha256(hashes.tobytes()).hexdigest()
+    except TypeError:
+        # Colunas com tipos não hasheáveis (listas, dicts): hash do texto de cada célula,
+        # para que recortes diferentes nunca compartilhem a mesma chamada
+        hashes = pd.util.hash_pandas_object(df.astype(str), index=True).values
+        return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+
+class SingleFlight:
+    """
+    Garante que, para uma mesma chave, apenas uma execução esteja em voo por processo.
+    Quem chega enquanto a primeira execução roda espera e recebe o mesmo resultado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_voo = {}
+
+    def executar(self, chave, funcao, *args, **kwargs):
+        with self._lock:
+            future = self._em_voo.get(chave)
+            lider = future is None
+            if lider:
+                future = Future()
+                self._em_voo[chave] = future
+
+        if not lider:
+            print("🔗 Consulta idêntica já em andamento; aguardando o mesmo resultado")
+            return future.result()
+
+        try:
+            resultado = funcao(*args, **kwargs)
+            future.set_result(resultado)
+            return resultado
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._em_voo.pop(chave, None)
+
+    def em_andamento(self):
+        with self._lock:
+            return len(self._em_voo)
+
+
+_consultas_em_voo = SingleFlight()
+
+
+# Parte fixa do prompt: idêntica em todas as chamadas para formar um prefixo cacheável
+INSTRUCOES_ASSISTENTE = """VOCÊ: Especialista em análise completa de dados de atendimentos ao cliente
+
+CONTEXTO DAS COLUNAS:
+- Data: Data do atendimento
+- UF: Estado do cliente
+- Atendente: Colaborador que realizou o atendimento
+- Cliente: Cliente atendido
+- Modulos: Módulo do sistema relacionado ao atendimento
+- Tipos: Tipo de atendimento
+- Categorias: Categoria do atendimento
+- Canais: Canal de atendimento
+- Nucleos / Produtos: Núcleo e produto do cliente
+- Contato: Informações de contato do cliente
+
+FORMATO DOS DADOS:
+- Cada seção começa com "## TÍTULO"
+- Linhas "rótulo: valor" são fatos isolados
+- Blocos "[nome]" são tabelas separadas por TAB; a primeira linha é o cabeçalho
+
+NOVAS INSTRUÇÕES INTELIGENTES:
+- Analise padrões sazonais e tendências temporais
+- Identifique correlações entre módulos, atendentes e clientes
+- Detecte oportunidades de melhoria nos processos
+- Sugira ações baseadas nos dados (ex: treinamento, otimização)
+- Compare performance entre períodos diferentes
+- Identifique clientes que precisam de atenção especial
+- Analise eficiência por canal de atendimento
+- Detecte gargalos operacionais
+- Forneça insights preditivos quando possível
+- Relacione volume de atendimentos com complexidade
+- Use formatação markdown organizada com tópicos claros
+- Destaque os 3 principais insights em cada análise
+
+FORMATO DA RESPOSTA:
+## 📊 Análise Principal
+[Resumo dos principais achados]
+
+## 🎯 Insights Estratégicos
+[3-5 insights acionáveis]
+
+## 📈 Recomendações
+[Ações específicas baseadas nos dados]
+
+## 🔍 Detalhes Técnicos
+[Análises específicas por categoria]
+"""
+
+
+def montar_prompt(relatorio, pergunta):
+    """Instruções fixas + dados + pergunta, nessa ordem"""
+    return f"{INSTRUCOES_ASSISTENTE}\nDADOS COMPLETOS DISPONÍVEIS:\n{relatorio}\n\nPERGUNTA DO USUÁRIO: {pergunta}\n\nRESPOSTA:\n"
+
+
+def _chave_consulta(pergunta, tipo_modelo, chave_dados, modo="relatorio"):
+    pergunta_normalizada = " ".join(str(pergunta).lower().split())
+    return (pergunta_normalizada, tipo_modelo, chave_dados, modo)
+
+
+# Perguntas quantitativas simples são respondidas pelo motor local, sem chamar o Gemini
+MOTOR_LOCAL_ATIVO = _ler_config("motor_local", True)
+
+# =============================================================================
+# BACKEND DO MODELO (Gemini real ou simulado para testes de carga)
+# =============================================================================
+
+BACKEND_MODELO = _ler_config("backend", "gemini")
+
+
+def _modelo_gemini(nome_modelo, gemini_key):
+    genai.configure(api_key=gemini_key)
+    return genai.GenerativeModel(nome_modelo)
+
+
+def _modelo_simulado(nome_modelo, gemini_key):
+    from modelo_simulado import ModeloSimulado
+    return ModeloSimulado(nome_modelo)
+
+
+# Nome do backend -> fábrica(nome_modelo, gemini_key) que devolve um objeto com generate_content
+BACKENDS_MODELO = {
+    'gemini': _modelo_gemini,
+    'simulado': _modelo_simulado,
+}
+
+
+def criar_modelo(nome_modelo, gemini_key=None):
+    fabrica = BACKENDS_MODELO.get(BACKEND_MODELO)
+    if fabrica is None:
+        raise ValueError(f"Backend de modelo desconhecido: '{BACKEND_MODELO}'. Opções: {', '.join(BACKENDS_MODELO)}")
+    return fabrica(nome_modelo, gemini_key)
 
 # =============================================================================
 # FUNÇÃO PRINCIPAL
 # =============================================================================
 
-def consultar_assistente(pergunta, df_filtrado, tipo_modelo="Gemini Pro", gemini_key=None):
+def consultar_assistente(pergunta, df_filtrado, tipo_modelo="Gemini Pro", gemini_key=None, sessao_id=None, modo="relatorio",
+                         chave_dados=None):
     """
     Função principal do assistente. Recebe a chave diretamente do app.py e faz a chamada.
+    Perguntas quantitativas simples são respondidas na hora pelo motor local de intenções;
+    consultas simultâneas idênticas (mesma pergunta, modelo e dados) são unificadas
+    em uma única chamada ao Gemini.
     
     :param gemini_key: Chave de API passada do st.secrets (app.py)
+    :param sessao_id: Identificador da sessão, usado na fila justa do limitador de concorrência
+    :param modo: "relatorio" envia o relatório completo; "ferramentas" envia só o esquema
+                 e deixa o modelo consultar os agregados sob demanda
+    :param chave_dados: impressão digital de df_filtrado, se quem chama já a tiver (ex.: do pré-cálculo)
     """
+    registros = len(df_filtrado) if isinstance(df_filtrado, pd.DataFrame) else 0
+    with _registro_telemetria(sessao_id=sessao_id, modelo=tipo_modelo, modo=modo,
+                              registros=registros, pergunta_chars=len(str(pergunta))) as registro:
+        chave_dados = chave_dados or impressao_digital_dados(df_filtrado)
+
+        if MOTOR_LOCAL_ATIVO:
+            try:
+                resposta_local = responder_pergunta_local(pergunta, df_filtrado, chave_dados=chave_dados)
+            except Exception as e:
+                print(f"⚠️ Erro no motor local de intenções: {e}")
+                resposta_local = None
+            if resposta_local:
+                print(f"⚡ Pergunta respondida pelo motor local: {pergunta}")
+                registro['origem'] = 'motor_local'
+                return resposta_local
+
+        chave = _chave_consulta(pergunta, tipo_modelo, chave_dados, modo)
+        resposta = _consultas_em_voo.executar(
+            chave, _consultar_assistente_gemini, pergunta, df_filtrado, tipo_modelo, gemini_key, sessao_id, modo, chave_dados
+        )
+        # Sem origem anotada: outra sessão fez a chamada e esta só aguardou o resultado
+        registro.setdefault('origem', 'coalescida')
+        return resposta
+
+
+def _consultar_assistente_gemini(pergunta, df_filtrado, tipo_modelo="Gemini Pro", gemini_key=None, sessao_id=None,
+                                 modo="relatorio", chave_dados=None):
+    """Executa de fato a consulta ao Gemini (com fallback local)"""
     
     # 1. VERIFICAÇÃO CRÍTICA DA CHAVE: Se a chave não foi passada, retorne o fallback
-    if not gemini_key:
+    if not gemini_key and BACKEND_MODELO == 'gemini':
         print("❌ Chave Gemini não fornecida. Retornando fallback com erro de configuração.")
-        return analise_local_supercompleta(pergunta, df_filtrado, is_fallback_mode=True)
+        _anotar(origem='fallback', motivo_fallback='sem_chave')
+        return analise_local_supercompleta(pergunta, df_filtrado, is_fallback_mode=True, chave_dados=chave_dados)
     
     # 2. CONFIGURAÇÃO E EXECUÇÃO DA IA
     try:
-        # Tenta configurar o Gemini com a chave fornecida
-        genai.configure(api_key=gemini_key)
-        
         # 3. VERIFICAÇÃO DO DATAFRAME
         if not isinstance(df_filtrado, pd.DataFrame) or df_filtrado.empty:
+            _anotar(origem='fallback', motivo_fallback='sem_dados')
             return "❌ Não há dados para análise com os filtros atuais."
         
+        # Circuit breaker aberto: não adianta esperar a API, responde direto com a análise local
+        if not breaker_gemini.permitir_chamada():
+            segundos = breaker_gemini.segundos_restantes()
+            print(f"🔌 Circuit breaker aberto ({segundos:.0f}s restantes). Usando análise local.")
+            _anotar(origem='fallback', motivo_fallback='breaker_aberto')
+            aviso = (
+                "⏸️ *O Gemini está instável no momento; esta resposta foi gerada pela análise local. "
+                f"Nova tentativa com a IA em cerca de {max(1, round(segundos))}s.*\n\n"
+            )
+            return aviso + analise_local_supercompleta(pergunta, df_filtrado, chave_dados=chave_dados)
+
         print(f"🔍 Consultando Gemini ({tipo_modelo}): {pergunta}")
         
         # 4. Escolher modelo
         # Note: Use gemini-2.5-pro/flash se estiver usando a biblioteca google-genai
-        modelo_gemini = "gemini-2.5-pro" if "Pro" in tipo_modelo else "gemini-2.5-flash"
+        familia = _familia_modelo(tipo_modelo)
+        modelo_gemini = "gemini-2.5-pro" if familia == 'pro' else "gemini-2.5-flash"
+        model = criar_modelo(modelo_gemini, gemini_key)
+
+        if modo == "ferramentas":
+            # Prompt enxuto: o modelo recebe o esquema e pede os números às ferramentas locais
+            texto = consultar_com_ferramentas(
+                pergunta, df_filtrado, model,
+                limitador=limitadores_gemini[familia], sessao_id=sessao_id
+            )
+            breaker_gemini.registrar_sucesso()
+            _anotar(origem='ferramentas')
+            print(f"✅ Resposta (modo ferramentas) recebida!")
+            return texto
+
+        # 5. Criar relatório COMPLETO (ou hierárquico, por mês, para períodos longos).
+        #    Se o pré-cálculo em segundo plano já montou o relatório, ele vem do cache.
+        with _medir('relatorio_ms'):
+            relatorio_completo = obter_relatorio(df_filtrado, chave_dados)
+
+        # 7. Prompt ESPECIALIZADO: instruções fixas primeiro (prefixo estável e cacheável),
+        #    depois os dados e, por último, a pergunta
+        prompt = montar_prompt(relatorio_completo, pergunta)
 
-        # 5. Criar relatório COMPLETO
-        relatorio_completo = criar_relatorio_supercompleto(df_filtrado, pergunta)
+        # 6. Fazer consulta (com prazo, retentativas e circuit breaker)
+        texto = _gerar_com_resiliencia(model, prompt, limitadores_gemini[familia], sessao_id)
+        breaker_gemini.registrar_sucesso()
+        _anotar(origem='gemini')
+        print(f"✅ Resposta completa recebida!")
+        return texto
 
-        # 6. Configurar e chamar o modelo
-        model = genai.GenerativeModel(modelo_gemini)
+    except FilaCheiaError as e:
+        # Fila lotada não é falha da API: não conta para o circuit breaker
+        breaker_gemini.cancelar_teste()
+        print(f"⏳ {e}. Usando análise local.")
+        _anotar(origem='fallback', motivo_fallback='fila_cheia')
+        return _resposta_fila_cheia(pergunta, df_filtrado, chave_dados)
 
-        # 7. Prompt ESPECIALIZADO - (Mantenho o seu prompt detalhado)
-        prompt = f"""
-        VOCÊ: Especialista em análise completa de dados de atendimentos ao cliente
+    except Exception as e:
+        # Só erros transitórios da API (já com as retentativas esgotadas) ou o prazo total estourado
+        # contam para o breaker; bugs locais e 4xx definitivos não indicam instabilidade do Gemini
+        if _erro_transitorio(e):
+            breaker_gemini.registrar_falha()
+        else:
+            breaker_gemini.cancelar_teste()
+        print(f"❌ Erro na API do Gemini durante a chamada: {e}")
+        _anotar(origem='fallback', motivo_fallback=f"erro: {type(e).__name__}")
+        # Se houver um erro de conexão ou qualquer outro erro da API, usa o fallback local sem o flag de modo de erro
+        return analise_local_supercompleta(pergunta, df_filtrado, chave_dados=chave_dados)
 
-        DADOS COMPLETOS DISPONÍVEIS:
-        {relatorio_completo}
+def _resposta_fila_cheia(pergunta, df_filtrado, chave_dados=None):
+    aviso = "⏳ *Muitas consultas simultâneas ao Gemini; esta resposta foi gerada pela análise local.*\n\n"
+    return aviso + analise_local_supercompleta(pergunta, df_filtrado, chave_dados=chave_dados)
 
-        PERGUNTA DO USUÁRIO: {pergunta}
 
-        CONTEXTO DAS COLUNAS:
-        - Data: Data do atendimento
-        - UF: Estado do cliente
-        # ... (Resto do contexto das colunas) ...
-        - Contato: Informações de contato do cliente
+# Pool compartilhado para as chamadas ao Gemini disparadas em paralelo com a análise local.
+# Tem uma thread para cada vaga dos limitadores mais cada lugar da fila: toda consulta admitida
+# ganha thread na hora, então a espera acontece só na fila justa do limitador (com o prazo de
+# ESPERA_MAX_FILA_S e visível em posicao_na_fila), nunca na fila FIFO interna do executor.
+_MAX_CONSULTAS_EM_VOO = LIMITE_SIMULTANEAS_PRO + LIMITE_SIMULTANEAS_FLASH + FILA_MAX_CONSULTAS
+_executor_assistente = ThreadPoolExecutor(max_workers=_MAX_CONSULTAS_EM_VOO, thread_name_prefix="assistente")
+_admissao_consultas = threading.BoundedSemaphore(_MAX_CONSULTAS_EM_VOO)
 
-        NOVAS INSTRUÇÕES INTELIGENTES:
-        - Analise padrões sazonais e tendências temporais
-        - Identifique correlações entre módulos, atendentes e clientes
-        - Detecte oportunidades de melhoria nos processos
-        - Sugira ações baseadas nos dados (ex: treinamento, otimização)
-        - Compare performance entre períodos diferentes
-        - Identifique clientes que precisam de atenção especial
-        - Analise eficiência por canal de atendimento
-        - Detecte gargalos operacionais
-        - Forneça insights preditivos quando possível
-        - Relacione volume de atendimentos com complexidade
-        - Use formatação markdown organizada com tópicos claros
-        - Destaque os 3 principais insights em cada análise
 
-        FORMATO DA RESPOSTA:
-        ## 📊 Análise Principal
-        [Resumo dos principais achados]
+def _executar_como_job(job_id, funcao, *args):
+    _job_atual.id = job_id
+    try:
+        return funcao(*args)
+    finally:
+        _job_atual.id = None
 
-        ## 🎯 Insights Estratégicos
-        [3-5 insights acionáveis]
 
-        ## 📈 Recomendações
-        [Ações específicas baseadas nos dados]
+def submeter_consulta(pergunta, df_filtrado, tipo_modelo="Gemini Pro", gemini_key=None, sessao_id=None, modo="relatorio",
+                      job_id=None, chave_dados=None):
+    """
+    Executa consultar_assistente no pool compartilhado e retorna o future.
+    Com todas as threads ocupadas, o future já vem resolvido com a análise local.
+    """
+    if not _admissao_consultas.acquire(blocking=False):
+        print(f"⏳ {_MAX_CONSULTAS_EM_VOO} consultas em andamento. Usando análise local.")
+        future = Future()
+        future.set_result(_resposta_fila_cheia(pergunta, df_filtrado, chave_dados))
+        return future
 
-        ## 🔍 Detalhes Técnicos
-        [Análises específicas por categoria]
+    try:
+        future = _executor_assistente.submit(
+            _executar_como_job, job_id, consultar_assistente, pergunta, df_filtrado, tipo_modelo, gemini_key, sessao_id, modo,
+            chave_dados
+        )
+    except Exception:
+        _admissao_consultas.release()
+        raise
+    # Também dispara quando o job expira e o future é cancelado antes de rodar
+    future.add_done_callback(lambda _: _admissao_consultas.release())
+    return future
 
-        RESPOSTA:
-        """
 
-        # 6. Fazer consulta
-        response = model.generate_content(prompt)
-        print(f"✅ Resposta completa recebida!")
-        return response.text
+def consultar_assistente_em_corrida(pergunta, df_filtrado, tipo_modelo="Gemini Pro", gemini_key=None, sessao_id=None, modo="relatorio",
+                                    job_id=None, chave_dados=None):
+    """
+    Dispara o Gemini em segundo plano e, ao mesmo tempo, calcula a análise local.
+
+    Retorna (resposta_local, future): a resposta local fica pronta em milissegundos
+    e serve como resposta preliminar; o future entrega a resposta do Gemini
+    (ou o fallback local, se a API falhar) quando ela chegar. A preliminar é a resposta
+    do motor de intenções quando ele entende a pergunta, senão a análise local completa,
+    com as partes fixas do pré-cálculo (chave_dados).
+    """
+    chave_dados = chave_dados or impressao_digital_dados(df_filtrado)
+    future = submeter_consulta(pergunta, df_filtrado, tipo_modelo, gemini_key, sessao_id, modo, job_id, chave_dados)
+
+    resposta_local = None
+    if MOTOR_LOCAL_ATIVO:
+        try:
+            resposta_local = responder_pergunta_local(pergunta, df_filtrado, chave_dados=chave_dados)
+        except Exception as e:
+            print(f"⚠️ Erro no motor local de intenções: {e}")
+    if not resposta_local:
+        resposta_local = analise_local_supercompleta(pergunta, df_filtrado, chave_dados=chave_dados)
+    return resposta_local, future
+
+# =============================================================================
+# FILA DE CONSULTAS NÃO BLOQUEANTES (JOBS)
+# =============================================================================
+
+JOB_EXPIRACAO_S = 3600  # Jobs de sessões que fecharam sem coletar a resposta
+
+_jobs = {}
+_lock_jobs = threading.Lock()
+
+
+def submeter_job(pergunta, df_filtrado, tipo_modelo="Gemini Pro", gemini_key=None, sessao_id=None,
+                 modo="relatorio", corrida=False, metadados=None, chave_dados=None):
+    """
+    Enfileira a consulta no pool e devolve um job_id imediatamente.
+    Com corrida=True, a análise local é calculada na hora e fica disponível como resposta preliminar.
+    chave_dados: impressão digital de df_filtrado já calculada (PreCalculoContexto.chave_dados).
+    """
+    job_id = uuid.uuid4().hex[:12]
+    if corrida:
+        preliminar, future = consultar_assistente_em_corrida(
+            pergunta, df_filtrado, tipo_modelo, gemini_key, sessao_id, modo, job_id, chave_dados
+        )
+    else:
+        preliminar = None
+        future = submeter_consulta(pergunta, df_filtrado, tipo_modelo, gemini_key, sessao_id, modo, job_id, chave_dados)
+
+    with _lock_jobs:
+        agora = time.time()
+        for antigo in [j for j, job in _jobs.items() if agora - job['criado_em'] > JOB_EXPIRACAO_S]:
+            _jobs.pop(antigo)['future'].cancel()
+        _jobs[job_id] = {
+            'pergunta': pergunta,
+            'tipo_modelo': tipo_modelo,
+            'sessao_id': sessao_id,
+            'preliminar': preliminar,
+            'future': future,
+            'criado_em': agora,
+            'metadados': metadados or {},
+        }
+    return job_id
+
+
+def estado_job(job_id):
+    """
+    Situação atual do job: status 'na_fila', 'processando', 'concluido' ou 'erro'.
+    Retorna None se o job não existir (expirado ou já descartado).
+    """
+    with _lock_jobs:
+        job = _jobs.get(job_id)
+    if job is None:
+        return None
+
+    estado = {
+        'pergunta': job['pergunta'],
+        'preliminar': job['preliminar'],
+        'metadados': job['metadados'],
+        'segundos': time.time() - job['criado_em'],
+        'posicao': 0,
+        'resposta': None,
+        'erro': None,
+    }
+    future = job['future']
+    if future.done():
+        erro = future.exception() if not future.cancelled() else RuntimeError("Consulta cancelada")
+        if erro is not None:
+            estado['status'] = 'erro'
+            estado['erro'] = str(erro)
+        else:
+            estado['status'] = 'concluido'
+            estado['resposta'] = future.result()
+    else:
+        estado['posicao'] = posicao_na_fila(job['tipo_modelo'], job['sessao_id'], job_id)
+        estado['status'] = 'na_fila' if estado['posicao'] > 0 else 'processando'
+    return estado
+
+
+def descartar_job(job_id):
+    with _lock_jobs:
+        _jobs.pop(job_id, None)
+
+# =============================================================================
+# PRÉ-CÁLCULO ESPECULATIVO DO CONTEXTO QUANDO OS FILTROS MUDAM
+# =============================================================================
+
+ATRASO_PRECALCULO_S = _ler_config("atraso_precalculo_s", 1.5)  # Espera os filtros "assentarem"
+MAX_RELATORIOS_EM_CACHE = 16
+
+_executor_precalculo = ThreadPoolExecutor(max_workers=2, thread_name_prefix="precalculo")
+_cache_relatorios = OrderedDict()
+_cache_analises_locais = OrderedDict()  # Partes da análise local que não dependem da pergunta
+_lock_relatorios = threading.Lock()
+_relatorios_em_voo = SingleFlight()
+
+
+def _montar_relatorio(df):
+    if usar_relatorio_hierarquico(df):
+        return criar_relatorio_hierarquico(df, "")
+    return criar_relatorio_supercompleto(df, "")
+
+
+def obter_relatorio(df, chave_dados=None):
+    """
+    Relatório do recorte de dados, reaproveitando o que o pré-cálculo já montou.
+    Se o pré-cálculo ainda estiver montando o mesmo relatório, espera por ele em vez de refazer.
+    """
+    chave_dados = chave_dados or impressao_digital_dados(df)
+    with _lock_relatorios:
+        relatorio = _cache_relatorios.get(chave_dados)
+        if relatorio is not None:
+            _cache_relatorios.move_to_end(chave_dados)
+            print("♻️ Relatório reaproveitado do pré-cálculo")
+            _anotar(cache_relatorio='hit')
+            return relatorio
+
+    _anotar(cache_relatorio='miss')
+    relatorio = _relatorios_em_voo.executar(chave_dados, _montar_relatorio, df)
+    with _lock_relatorios:
+        _cache_relatorios[chave_dados] = relatorio
+        while len(_cache_relatorios) > MAX_RELATORIOS_EM_CACHE:
+            _cache_relatorios.popitem(last=False)
+    return relatorio
+
+
+def _precalcular_contexto(df, cancelado):
+    """Monta, em etapas canceláveis, o cubo do motor local e o relatório do assistente"""
+    if cancelado.wait(ATRASO_PRECALCULO_S):
+        return None
+
+    chave_dados = impressao_digital_dados(df)
+    if cancelado.is_set():
+        return None
+
+    obter_cubo(df, chave_dados)
+    if cancelado.is_set():
+        return None
+
+    obter_relatorio(df, chave_dados)
+    if cancelado.is_set():
+        return None
+
+    # Fallback local pronto para quando a consulta ao Gemini falhar ou a fila lotar
+    _obter_partes_fixas(df, chave_dados)
+    print("🧠 Contexto do assistente pré-calculado")
+    return chave_dados
+
+
+class PreCalculoContexto:
+    """
+    Pré-cálculo de uma sessão. Cada novo estado de filtros cancela o anterior;
+    repetir o mesmo estado (rerun sem mudança) não dispara nada de novo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chave = None
+        self._future = None
+        self._cancelado = None
+
+    def agendar(self, chave_filtros, df):
+        with self._lock:
+            if chave_filtros == self._chave and self._future is not None:
+                return self._future
+            self._cancelar_atual()
+            self._chave = chave_filtros
+            self._cancelado = threading.Event()
+            self._future = _executor_precalculo.submit(_precalcular_contexto, df, self._cancelado)
+            return self._future
+
+    def cancelar_atual(self):
+        with self._lock:
+            self._cancelar_atual()
+            self._chave = None
 
+    def _cancelar_atual(self):
+        if self._cancelado is not None:
+            self._cancelado.set()
+        if self._future is not None:
+            self._future.cancel()
+
+    def pronto(self):
+        return self._future is not None and self._future.done() and not self._future.cancelled()
+
+    def chave_dados(self):
+        """Impressão digital do recorte já calculada pelo pré-cálculo (None enquanto ele não terminar)"""
+        with self._lock:
+            if not self.pronto() or self._future.exception() is not None:
+                return None
+            return self._future.result()
+
+def estatisticas_cache():
+    """
+    {nome do cache: itens retidos} dos caches do assistente e do motor local, copiados sob os
+    respectivos locks (os jobs sem o future), para a contabilidade de memória do memoria_dashboard
+    """
+    with _lock_relatorios:
+        relatorios = list(_cache_relatorios.values())
+        analises = list(_cache_analises_locais.values())
+    with _lock_resumos:
+        resumos = list(_cache_resumos_mensais.values())
+    with _lock_jobs:
+        jobs = [{k: v for k, v in job.items() if k != 'future'} for job in _jobs.values()]
+    return {
+        'relatórios do assistente': relatorios,
+        'análises locais (fallback)': analises,
+        'resumos mensais': resumos,
+        'cubos do motor local': cubos_em_cache(),
+        'jobs do assistente': jobs,
+    }
+
+# =============================================================================
+# MODO FERRAMENTAS: O MODELO CONSULTA OS AGREGADOS SOB DEMANDA
+# =============================================================================
+
+MAX_PASSOS_FERRAMENTAS = _ler_config("max_passos_ferramentas", 6)
+MAX_ITENS_RESULTADO = 50
+
+
+def _resolver_periodo(period):
+    """Aceita {"inicio": "AAAA-MM-DD", "fim": "AAAA-MM-DD"} ou texto livre ("ontem", "últimos 7 dias")"""
+    if not period:
+        return None
+    if isinstance(period, dict):
+        inicio = pd.Timestamp(period.get("inicio") or period.get("start"))
+        fim = pd.Timestamp(period.get("fim") or period.get("end") or inicio)
+        return inicio.normalize(), fim.normalize()
+    resolvido = extrair_periodo(normalizar(period), date.today())
+    if resolvido is None:
+        raise ValueError(f"Período não reconhecido: {period!r}")
+    return pd.Timestamp(resolvido[0]), pd.Timestamp(resolvido[1])
+
+
+def _recortar(df, period=None, filters=None):
+    """Aplica período e filtros (coluna -> valor ou lista de valores) sobre os dados"""
+    recorte = df
+    intervalo = _resolver_periodo(period)
+    if intervalo is not None:
+        datas = pd.to_datetime(recorte['Data'], errors='coerce').dt.normalize()
+        recorte = recorte[(datas >= intervalo[0]) & (datas <= intervalo[1])]
+
+    for coluna, valor in (filters or {}).items():
+        if coluna not in recorte.columns:
+            raise ValueError(f"Coluna de filtro inexistente: {coluna}")
+        valores = valor if isinstance(valor, list) else [valor]
+        recorte = recorte[recorte[coluna].isin(valores)]
+    return recorte
+
+
+def _validar_dimensao(df, dimension):
+    if dimension not in df.columns or dimension not in DIMENSOES:
+        raise ValueError(f"Dimensão inválida: {dimension}. Use uma de {[c for c in DIMENSOES if c in df.columns]}")
+
+
+def count_by(df, dimension=None, period=None, filters=None):
+    """Total de atendimentos no recorte e, se houver dimensão, a contagem por valor"""
+    recorte = _recortar(df, period, filters)
+    resultado = {"total": int(len(recorte))}
+    if dimension:
+        _validar_dimensao(df, dimension)
+        contagens = recorte[dimension].value_counts()
+        resultado["valores_distintos"] = int(len(contagens))
+        resultado["contagens"] = {str(k): int(v) for k, v in contagens.head(MAX_ITENS_RESULTADO).items()}
+    return resultado
+
+
+def top_n(df, dimension, n=5, period=None, filters=None):
+    """Os N valores da dimensão com mais atendimentos, com percentual sobre o recorte"""
+    _validar_dimensao(df, dimension)
+    recorte = _recortar(df, period, filters)
+    total = len(recorte)
+    contagens = recorte[dimension].value_counts().head(min(int(n), MAX_ITENS_RESULTADO))
+    return {
+        "total": int(total),
+        "top": [
+            {"valor": str(k), "atendimentos": int(v), "percentual": round(v / total * 100, 1) if total else 0.0}
+            for k, v in contagens.items()
+        ],
+    }
+
+
+def daily_series(df, period=None, filters=None):
+    """Atendimentos por dia no recorte (limitado aos dias mais recentes)"""
+    recorte = _recortar(df, period, filters)
+    serie = recorte.groupby(pd.to_datetime(recorte['Data'], errors='coerce').dt.date).size()
+    serie = serie.sort_index().tail(120)
+    return {
+        "dias": int(len(serie)),
+        "media_diaria": round(float(serie.mean()), 1) if len(serie) else 0.0,
+        "serie": {d.isoformat(): int(v) for d, v in serie.items()},
+    }
+
+
+FERRAMENTAS = {
+    "count_by": count_by,
+    "top_n": top_n,
+    "daily_series": daily_series,
+}
+
+
+def descrever_esquema(df):
+    """Descrição compacta dos dados: colunas, período e valores mais comuns de cada dimensão"""
+    linhas = [f"Registros: {len(df)}"]
+    if 'Data' in df.columns and not df.empty:
+        datas = pd.to_datetime(df['Data'], errors='coerce')
+        linhas.append(f"Período: {datas.min():%Y-%m-%d} a {datas.max():%Y-%m-%d}")
+    linhas.append(f"Colunas: {', '.join(map(str, df.columns))}")
+    linhas.append("Dimensões (distintos | exemplos mais frequentes):")
+    for coluna in DIMENSOES:
+        if coluna in df.columns:
+            frequentes = df[coluna].value_counts().head(5).index
+            linhas.append(f"- {coluna} ({df[coluna].nunique()} | {', '.join(map(str, frequentes))})")
+    return "\n".join(linhas)
+
+
+INSTRUCOES_FERRAMENTAS = """VOCÊ: Especialista em análise de dados de atendimentos ao cliente.
+Você NÃO recebe os dados completos. Para obter números, chame uma ferramenta respondendo
+APENAS com um JSON no formato:
+{"ferramenta": "<nome>", "argumentos": {...}}
+
+Ferramentas disponíveis:
+- count_by(dimension=None, period=None, filters=None): total e contagem por valor da dimensão
+- top_n(dimension, n=5, period=None, filters=None): N valores com mais atendimentos
+- daily_series(period=None, filters=None): atendimentos por dia
+
+Argumentos:
+- dimension: uma das dimensões listadas no esquema
+- period: {"inicio": "AAAA-MM-DD", "fim": "AAAA-MM-DD"} ou texto como "ontem", "últimos 7 dias"
+- filters: {"Coluna": "valor"} ou {"Coluna": ["valor1", "valor2"]}
+
+Quando tiver os números necessários, responda com:
+{"resposta": "<resposta final em markdown, em português>"}
+Use somente números vindos das ferramentas."""
+
+
+def _extrair_json(texto):
+    """Extrai o primeiro objeto JSON do texto do modelo (aceita blocos ```json)"""
+    texto = (texto or "").strip()
+    bloco = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", texto, re.DOTALL)
+    candidato = bloco.group(1) if bloco else texto[texto.find("{"): texto.rfind("}") + 1]
+    if not candidato:
+        return None
+    try:
+        return json.loads(candidato)
+    except ValueError:
+        return None
+
+
+def executar_ferramenta(df, nome, argumentos):
+    """Executa a ferramenta pedida pelo modelo; erros voltam como resultado para o modelo corrigir"""
+    funcao = FERRAMENTAS.get(nome)
+    if funcao is None:
+        return {"erro": f"Ferramenta desconhecida: {nome}. Disponíveis: {list(FERRAMENTAS)}"}
+    try:
+        return funcao(df, **(argumentos or {}))
     except Exception as e:
-        print(f"❌ Erro na API do Gemini durante a chamada: {e}")
-        # Se houver um erro de conexão ou qualquer outro erro da API, usa o fallback local sem o flag de modo de erro
-        return analise_local_supercompleta(pergunta, df_filtrado)
+        # Argumentos malformados chegam de várias formas (ex.: filters como lista -> AttributeError);
+        # qualquer falha volta ao modelo em vez de derrubar a consulta inteira
+        print(f"⚠️ Ferramenta {nome} falhou com {argumentos}: {type(e).__name__}: {e}")
+        return {"erro": f"{type(e).__name__}: {e}"}
 
-def criar_relatorio_supercompleto(df, pergunta):
-    """Cria relatório MEGA COMPLETO com ANÁLISES TEMPORAIS AVANÇADAS"""
-    
-    # Verificação de segurança
+
+def consultar_com_ferramentas(pergunta, df, model, limitador=None, sessao_id=None, max_passos=None):
+    """
+    Conduz o ciclo pergunta -> chamadas de ferramenta -> resposta final.
+
+    `model` só precisa de generate_content(prompt, **kwargs) retornando um objeto iterável com .text,
+    então o ciclo pode ser exercitado offline com ModeloRoteirizado.
+    """
+    max_passos = max_passos or MAX_PASSOS_FERRAMENTAS
+    esquema = descrever_esquema(df)
+    historico = []
+
+    for passo in range(1, max_passos + 1):
+        prompt = f"{INSTRUCOES_FERRAMENTAS}\n\nESQUEMA DOS DADOS:\n{esquema}\n\nPERGUNTA DO USUÁRIO: {pergunta}\n"
+        if historico:
+            prompt += "\nCHAMADAS JÁ FEITAS:\n" + "\n".join(historico) + "\n"
+        if passo == max_passos:
+            prompt += "\nÚltimo passo: responda agora com {\"resposta\": ...}.\n"
+
+        texto = _gerar_com_resiliencia(model, prompt, limitador, sessao_id)
+        comando = _extrair_json(texto)
+
+        if not isinstance(comando, dict):
+            # Sem JSON: o modelo respondeu diretamente em texto
+            return texto
+        if "resposta" in comando:
+            return str(comando["resposta"])
+
+        nome = comando.get("ferramenta")
+        argumentos = comando.get("argumentos") or {}
+        resultado = executar_ferramenta(df, nome, argumentos)
+        print(f"🧰 Passo {passo}: {nome}({argumentos})")
+        historico.append(
+            f"{json.dumps({'ferramenta': nome, 'argumentos': argumentos}, ensure_ascii=False)} -> "
+            f"{json.dumps(resultado, ensure_ascii=False)}"
+        )
+
+    return "⚠️ O assistente não concluiu a análise dentro do limite de passos."
+
+
+class ModeloRoteirizado:
+    """
+    Modelo falso para exercitar o modo ferramentas sem rede: devolve as respostas
+    roteirizadas em ordem e guarda os prompts recebidos.
+    """
+
+    def __init__(self, respostas):
+        self.respostas = list(respostas)
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if not self.respostas:
+            raise RuntimeError("Roteiro do modelo falso esgotado")
+        resposta = self.respostas.pop(0)
+        if isinstance(resposta, (dict, list)):
+            resposta = json.dumps(resposta, ensure_ascii=False)
+        return RespostaRoteirizada(resposta)
+
+
+class RespostaRoteirizada(SimpleNamespace):
+    """Resposta falsa compatível com generate_content(stream=True): um único trecho com todo o texto"""
+
+    def __init__(self, texto, usage_metadata=None):
+        super().__init__(text=texto, usage_metadata=usage_metadata)
+
+    def __iter__(self):
+        yield self
+
+# =============================================================================
+# RELATÓRIO ESTRUTURADO + SERIALIZAÇÃO COMPACTA PARA O MODELO
+# =============================================================================
+
+def _nova_secao(relatorio, titulo):
+    secao = {'titulo': titulo, 'fatos': {}, 'tabelas': []}
+    relatorio['secoes'].append(secao)
+    return secao
+
+
+def _adicionar_tabela(secao, nome, colunas, linhas):
+    if linhas:
+        secao['tabelas'].append({'nome': nome, 'colunas': list(colunas), 'linhas': [list(l) for l in linhas]})
+
+
+def _linhas_contagem(serie, n=None, total=None):
+    """[(valor, quantidade[, %])] a partir de um value_counts"""
+    if n is not None:
+        serie = serie.head(n)
+    if total:
+        return [(valor, int(qtd), round(qtd / total * 100, 1)) for valor, qtd in serie.items()]
+    return [(valor, int(qtd)) for valor, qtd in serie.items()]
+
+
+def montar_relatorio_estruturado(df):
+    """
+    Calcula todas as análises do relatório e as guarda em uma estrutura
+    {'secoes': [{'titulo', 'fatos': {rotulo: valor}, 'tabelas': [{'nome', 'colunas', 'linhas'}]}]}.
+    A apresentação fica a cargo dos serializadores.
+    """
+    relatorio = {'secoes': []}
     if not isinstance(df, pd.DataFrame) or df.empty:
-        return "⚠️ Dados não disponíveis para análise"
-    
-    pergunta_lower = pergunta.lower()
-    relatorio = "=== ANÁLISE COMPLETA DE TODOS OS DADOS ===\n\n"
-    
-    # CONTEXTO GERAL
-    relatorio += "📊 CONTEXTO GERAL:\n"
-    relatorio += f"• Total de registros: {len(df)} atendimentos\n"
-    relatorio += f"• Colunas disponíveis: {', '.join(df.columns)}\n"
-    
-    # ✅ ANÁLISE TEMPORAL SUPER AVANÇADA
+        return relatorio
+
+    total = len(df)
+    geral = _nova_secao(relatorio, "CONTEXTO GERAL")
+    geral['fatos']['Total de registros'] = total
+    geral['fatos']['Colunas'] = ', '.join(map(str, df.columns))
+    for coluna, rotulo in [('Atendente', 'Atendentes'), ('Cliente', 'Clientes'), ('Modulos', 'Módulos')]:
+        if coluna in df.columns:
+            geral['fatos'][rotulo] = int(df[coluna].nunique())
+
+    # Datas convertidas uma única vez para todas as análises temporais
+    df_temp = None
     if 'Data' in df.columns:
         try:
             df_temp = df.copy()
             df_temp['Data'] = pd.to_datetime(df_temp['Data'], errors='coerce')
             df_temp = df_temp.dropna(subset=['Data'])
-            
-            if not df_temp.empty:
-                # Dados temporais básicos
-                evolucao_diaria = df_temp.groupby(df_temp['Data'].dt.date).size()
-                evolucao_mensal = df_temp.groupby(df_temp['Data'].dt.to_period('M')).size()
-                
-                relatorio += f"\n📅 ANÁLISE TEMPORAL DETALHADA:\n"
-                relatorio += f"• Período: {df_temp['Data'].min().strftime('%d/%m/%Y')} a {df_temp['Data'].max().strftime('%d/%m/%Y')}\n"
-                relatorio += f"• Dias com registro: {len(evolucao_diaria)}\n"
-                relatorio += f"• Média diária: {evolucao_diaria.mean():.1f} atendimentos\n"
-                
-                if len(evolucao_diaria) > 0:
-                    relatorio += f"• Dia de pico: {evolucao_diaria.idxmax().strftime('%d/%m/%Y')} ({evolucao_diaria.max()} atendimentos)\n"
-                    relatorio += f"• Dia mais calmo: {evolucao_diaria.idxmin().strftime('%d/%m/%Y')} ({evolucao_diaria.min()} atendimentos)\n"
-                
-                # ✅ ANÁLISE DIÁRIA DETALHADA POR ATENDENTE (CRÍTICO!)
-                if 'Atendente' in df_temp.columns:
-                    relatorio += f"\n👥 ATENDIMENTOS DIÁRIOS POR ATENDENTE:\n"
-                    
-                    # Para cada dia, mostrar quantos atendimentos cada atendente fez
-                    atendentes_diarios = df_temp.groupby([df_temp['Data'].dt.date, 'Atendente']).size().reset_index()
-                    atendentes_diarios.columns = ['Data', 'Atendente', 'Atendimentos']
-                    
-                    # Ordenar por data mais recente primeiro
-                    atendentes_diarios = atendentes_diarios.sort_values('Data', ascending=False)
-                    
-                    # Pegar os últimos 5 dias para análise
-                    ultimos_dias = atendentes_diarios['Data'].unique()[:5]
-                    
-                    for dia in ultimos_dias:
-                        dados_dia = atendentes_diarios[atendentes_diarios['Data'] == dia]
-                        relatorio += f"• {dia.strftime('%d/%m/%Y')} - Total: {dados_dia['Atendimentos'].sum()} atendimentos:\n"
-                        
-                        # Ordenar por quantidade descendente
-                        dados_dia = dados_dia.sort_values('Atendimentos', ascending=False)
-                        
-                        for _, row in dados_dia.head(5).iterrows():
-                            relatorio += f"  - {row['Atendente']}: {row['Atendimentos']} atendimentos\n"
-                        relatorio += "\n"
-                
-                # ✅ TOP ATENDENTES POR DIA ESPECÍFICO
-                if 'Atendente' in df_temp.columns:
-                    relatorio += f"\n🎯 TOP ATENDENTES POR DIA (ÚLTIMOS 5 DIAS):\n"
-                    
-                    # Encontrar o dia com mais atendimentos de cada top atendente
-                    top_atendentes = df_temp['Atendente'].value_counts().head(5).index
-                    
-                    for atendente in top_atendentes:
-                        dados_atendente = df_temp[df_temp['Atendente'] == atendente]
-                        dia_top = dados_atendente.groupby(dados_atendente['Data'].dt.date).size()
-                        
-                        if len(dia_top) > 0:
-                            melhor_dia = dia_top.idxmax()
-                            melhor_quantidade = dia_top.max()
-                            total_dias = len(dia_top)
-                            relatorio += f"• {atendente}: Melhor dia {melhor_dia.strftime('%d/%m/%Y')} ({melhor_quantidade} atendimentos) - Atuou em {total_dias} dias\n"
-                
-                # ✅ ANÁLISE DO DIA ANTERIOR ESPECÍFICO
-                if 'Atendente' in df_temp.columns:
-                    # Encontrar a data mais recente nos dados
-                    data_mais_recente = df_temp['Data'].max().date()
-                    
-                    # Calcular o "dia anterior" (último dia com dados)
-                    dados_dia_anterior = df_temp[df_temp['Data'].dt.date == data_mais_recente]
-                    
-                    if not dados_dia_anterior.empty:
-                        relatorio += f"\n📊 DETALHES DO DIA MAIS RECENTE ({data_mais_recente.strftime('%d/%m/%Y')}):\n"
-                        relatorio += f"• Total de atendimentos: {len(dados_dia_anterior)}\n"
-                        
-                        # Atendentes que trabalharam nesse dia
-                        atendentes_dia = dados_dia_anterior['Atendente'].value_counts()
-                        relatorio += f"• Atendentes presentes: {len(atendentes_dia)}\n"
-                        relatorio += f"• Distribuição:\n"
-                        
-                        for atendente, quantidade in atendentes_dia.head(5).items():
-                            relatorio += f"  - {atendente}: {quantidade} atendimentos\n"
-                
-                # ✅ EVOLUÇÃO DOS TOP 3 ATENDENTES (ÚLTIMOS 7 DIAS)
-                if 'Atendente' in df_temp.columns:
-                    relatorio += f"\n📈 EVOLUÇÃO DOS TOP 3 ATENDENTES (ÚLTIMOS DIAS):\n"
-                    
-                    top_3_atendentes = df_temp['Atendente'].value_counts().head(3).index
-                    datas_recentes = sorted(df_temp['Data'].dt.date.unique(), reverse=True)[:7]
-                    
-                    for atendente in top_3_atendentes:
-                        relatorio += f"• {atendente}:\n"
-                        dados_atendente = df_temp[df_temp['Atendente'] == atendente]
-                        
-                        for data in datas_recentes:
-                            atendimentos_dia = len(dados_atendente[dados_atendente['Data'].dt.date == data])
-                            if atendimentos_dia > 0:
-                                relatorio += f"  - {data.strftime('%d/%m')}: {atendimentos_dia} atendimentos\n"
-                
-                # 🆕 ANÁLISE DE SAZONALIDADE SEMANAL
-                if len(evolucao_diaria) > 7:
-                    df_temp['Dia_Semana'] = df_temp['Data'].dt.day_name()
-                    dias_semana = df_temp['Dia_Semana'].value_counts()
-                    
-                    relatorio += f"\n📆 PADRÃO SEMANAL DE ATENDIMENTOS:\n"
-                    for dia, quantidade in dias_semana.items():
-                        percentual = (quantidade / len(df_temp)) * 100
-                        relatorio += f"• {dia}: {quantidade} atendimentos ({percentual:.1f}%)\n"
-                
-                # 🆕 TENDÊNCIA TEMPORAL (CRESCIMENTO/DECLÍNIO)
-                if len(evolucao_mensal) > 1:
-                    primeiro_mes = evolucao_mensal.iloc[0]
-                    ultimo_mes = evolucao_mensal.iloc[-1]
-                    variacao = ((ultimo_mes - primeiro_mes) / primeiro_mes) * 100
-                    
-                    relatorio += f"\n📈 TENDÊNCIA MENSAL:\n"
-                    relatorio += f"• Primeiro mês: {primeiro_mes} atendimentos\n"
-                    relatorio += f"• Último mês: {ultimo_mes} atendimentos\n"
-                    relatorio += f"• Variação: {variacao:+.1f}%\n"
-                
-                # 🆕 ANÁLISE DE HORÁRIO DE PICO (se tiver hora)
-                if 'Data' in df_temp.columns and any(':' in str(x) for x in df_temp['Data'].head()):
-                    try:
-                        df_temp['Hora'] = df_temp['Data'].dt.hour
-                        pico_horario = df_temp['Hora'].value_counts().head(3)
-                        relatorio += f"\n⏰ HORÁRIOS DE PICO:\n"
-                        for hora, quantidade in pico_horario.items():
-                            relatorio += f"• {hora:02d}:00 - {quantidade} atendimentos\n"
-                    except:
-                        pass
-                        
+            if df_temp.empty:
+                df_temp = None
+            else:
+                df_temp['Dia'] = df_temp['Data'].dt.date
         except Exception as e:
-            relatorio += f"❌ Erro em análises temporais: {str(e)}\n\n"
-    
-    # ✅ ANÁLISE TEMPORAL POR MÓDULOS
-    if 'Data' in df.columns and 'Modulos' in df.columns:
-        try:
-            df_temp = df.copy()
-            df_temp['Data'] = pd.to_datetime(df_temp['Data'], errors='coerce')
-            df_temp = df_temp.dropna(subset=['Data'])
-            
-            relatorio += f"\n🔧 EVOLUÇÃO DOS PRINCIPAIS MÓDULOS:\n"
-            top_modulos = df_temp['Modulos'].value_counts().head(3).index
-            
-            for modulo in top_modulos:
-                modulo_data = df_temp[df_temp['Modulos'] == modulo]
-                evolucao_modulo = modulo_data.groupby(modulo_data['Data'].dt.date).size()
-                if len(evolucao_modulo) > 0:
-                    relatorio += f"• {modulo}: {len(modulo_data)} atendimentos em {len(evolucao_modulo)} dias\n"
-                    
-        except Exception as e:
-            relatorio += f"❌ Erro em análise temporal por módulo: {str(e)}\n"
-    
-    # 🆕 ANÁLISE DE EFICIÊNCIA POR ATENDENTE
-    if 'Atendente' in df.columns and 'Data' in df.columns:
+            geral['fatos']['Erro em análises temporais'] = str(e)
+            df_temp = None
+
+    if df_temp is not None:
         try:
-            df_temp = df.copy()
-            df_temp['Data'] = pd.to_datetime(df_temp['Data'], errors='coerce')
-            df_temp = df_temp.dropna(subset=['Data'])
-            
-            relatorio += f"\n⚡ EFICIÊNCIA DOS ATENDENTES:\n"
-            top_atendentes = df_temp['Atendente'].value_counts().head(5)
-            
-            for atendente, total_atendimentos in top_atendentes.items():
-                dias_trabalhados = df_temp[df_temp['Atendente'] == atendente]['Data'].dt.date.nunique()
-                if dias_trabalhados > 0:
-                    media_diaria = total_atendimentos / dias_trabalhados
-                    relatorio += f"• {atendente}: {total_atendimentos} atendimentos em {dias_trabalhados} dias ({media_diaria:.1f}/dia)\n"
-                    
+            evolucao_diaria = df_temp.groupby('Dia').size()
+            evolucao_mensal = df_temp.groupby(df_temp['Data'].dt.to_period('M')).size()
+
+            temporal = _nova_secao(relatorio, "ANÁLISE TEMPORAL")
+            temporal['fatos']['Período'] = f"{df_temp['Data'].min():%d/%m/%Y} a {df_temp['Data'].max():%d/%m/%Y}"
+            temporal['fatos']['Dias com registro'] = len(evolucao_diaria)
+            temporal['fatos']['Média diária'] = round(float(evolucao_diaria.mean()), 1)
+            temporal['fatos']['Dia de pico'] = f"{evolucao_diaria.idxmax():%d/%m/%Y} ({evolucao_diaria.max()})"
+            temporal['fatos']['Dia mais calmo'] = f"{evolucao_diaria.idxmin():%d/%m/%Y} ({evolucao_diaria.min()})"
+
+            if len(evolucao_mensal) > 1:
+                primeiro_mes, ultimo_mes = evolucao_mensal.iloc[0], evolucao_mensal.iloc[-1]
+                temporal['fatos']['Primeiro mês'] = int(primeiro_mes)
+                temporal['fatos']['Último mês'] = int(ultimo_mes)
+                temporal['fatos']['Variação mensal'] = f"{(ultimo_mes - primeiro_mes) / primeiro_mes * 100:+.1f}%"
+
+            if len(evolucao_diaria) > 7:
+                dias_semana = df_temp['Data'].dt.day_name().value_counts()
+                _adicionar_tabela(temporal, "Padrão semanal", ['Dia', 'Atendimentos', '%'],
+                                  _linhas_contagem(dias_semana, total=len(df_temp)))
+
+            # Horário de pico só faz sentido se as datas tiverem hora preenchida
+            if (df_temp['Data'].dt.hour != 0).any():
+                horas = df_temp['Data'].dt.hour.value_counts().head(3)
+                _adicionar_tabela(temporal, "Horários de pico", ['Hora', 'Atendimentos'],
+                                  [(f"{hora:02d}:00", int(qtd)) for hora, qtd in horas.items()])
+
+            if 'Atendente' in df_temp.columns:
+                por_dia_atendente = df_temp.groupby(['Dia', 'Atendente']).size()
+                ultimos_dias = sorted(evolucao_diaria.index, reverse=True)[:5]
+
+                diario = _nova_secao(relatorio, "ATENDIMENTOS DIÁRIOS POR ATENDENTE (ÚLTIMOS 5 DIAS, TOP 5)")
+                linhas = []
+                for dia in ultimos_dias:
+                    dados_dia = por_dia_atendente.loc[dia].sort_values(ascending=False)
+                    for atendente, qtd in dados_dia.head(5).items():
+                        linhas.append((f"{dia:%d/%m/%Y}", int(evolucao_diaria[dia]), atendente, int(qtd)))
+                _adicionar_tabela(diario, "Por dia", ['Data', 'Total dia', 'Atendente', 'Atendimentos'], linhas)
+
+                recente = ultimos_dias[0]
+                distribuicao = por_dia_atendente.loc[recente].sort_values(ascending=False)
+                dia_recente = _nova_secao(relatorio, f"DIA MAIS RECENTE ({recente:%d/%m/%Y})")
+                dia_recente['fatos']['Total de atendimentos'] = int(evolucao_diaria[recente])
+                dia_recente['fatos']['Atendentes presentes'] = len(distribuicao)
+                _adicionar_tabela(dia_recente, "Distribuição", ['Atendente', 'Atendimentos'],
+                                  _linhas_contagem(distribuicao, 5))
+
+                contagem_atendentes = df_temp['Atendente'].value_counts()
+                melhores = _nova_secao(relatorio, "TOP ATENDENTES: MELHOR DIA E EFICIÊNCIA")
+                linhas = []
+                for atendente, total_atendente in contagem_atendentes.head(5).items():
+                    dias_atendente = por_dia_atendente.xs(atendente, level='Atendente')
+                    linhas.append((
+                        atendente, int(total_atendente), len(dias_atendente),
+                        round(total_atendente / len(dias_atendente), 1),
+                        f"{dias_atendente.idxmax():%d/%m/%Y}", int(dias_atendente.max())
+                    ))
+                _adicionar_tabela(melhores, "Atendentes",
+                                  ['Atendente', 'Total', 'Dias', 'Média/dia', 'Melhor dia', 'Qtd melhor dia'], linhas)
+
+                datas_recentes = sorted(evolucao_diaria.index, reverse=True)[:7]
+                evolucao = _nova_secao(relatorio, "EVOLUÇÃO DOS TOP 3 ATENDENTES (ÚLTIMOS 7 DIAS)")
+                top_3 = contagem_atendentes.head(3).index
+                linhas = []
+                for atendente in top_3:
+                    serie = por_dia_atendente.xs(atendente, level='Atendente')
+                    linhas.append([atendente] + [int(serie.get(data, 0)) for data in datas_recentes])
+                _adicionar_tabela(evolucao, "Atendimentos por dia",
+                                  ['Atendente'] + [f"{data:%d/%m}" for data in datas_recentes], linhas)
+
+            if 'Modulos' in df_temp.columns:
+                modulos = _nova_secao(relatorio, "EVOLUÇÃO DOS PRINCIPAIS MÓDULOS")
+                dias_modulo = df_temp.groupby('Modulos')['Dia'].nunique()
+                linhas = [(modulo, int(qtd), int(dias_modulo[modulo]))
+                          for modulo, qtd in df_temp['Modulos'].value_counts().head(3).items()]
+                _adicionar_tabela(modulos, "Módulos", ['Módulo', 'Atendimentos', 'Dias'], linhas)
+
         except Exception as e:
-            relatorio += f"❌ Erro em análise de eficiência: {str(e)}\n"
-    
-    # 🆕 CORRELAÇÃO ENTRE MÓDULOS E TIPOS DE ATENDIMENTO
+            _nova_secao(relatorio, "ERRO")['fatos']['Erro em análises temporais'] = str(e)
+
     if 'Modulos' in df.columns and 'Tipos' in df.columns:
         try:
-            relatorio += f"\n🔗 CORRELAÇÃO MÓDULOS x TIPOS:\n"
-            modulo_tipo = df.groupby(['Modulos', 'Tipos']).size().reset_index()
-            modulo_tipo.columns = ['Modulo', 'Tipo', 'Quantidade']
-            
-            # Encontrar combinações mais frequentes
-            combinacoes_top = modulo_tipo.nlargest(5, 'Quantidade')
-            
-            for _, row in combinacoes_top.iterrows():
-                relatorio += f"• {row['Modulo']} + {row['Tipo']}: {row['Quantidade']} atendimentos\n"
-                
+            combinacoes = df.groupby(['Modulos', 'Tipos']).size().nlargest(5)
+            secao = _nova_secao(relatorio, "CORRELAÇÃO MÓDULOS x TIPOS")
+            _adicionar_tabela(secao, "Combinações mais frequentes", ['Módulo', 'Tipo', 'Atendimentos'],
+                              [(modulo, tipo, int(qtd)) for (modulo, tipo), qtd in combinacoes.items()])
         except Exception as e:
-            relatorio += f"❌ Erro em análise de correlação: {str(e)}\n"
-    
-    # 🆕 ANÁLISE DE CLIENTES RECORRENTES
+            _nova_secao(relatorio, "ERRO")['fatos']['Erro em análise de correlação'] = str(e)
+
     if 'Cliente' in df.columns:
-        try:
-            cliente_frequencia = df['Cliente'].value_counts()
-            clientes_recorrentes = cliente_frequencia[cliente_frequencia > 1]
-            
-            relatorio += f"\n🔄 CLIENTES RECORRENTES:\n"
-            relatorio += f"• Total de clientes únicos: {len(cliente_frequencia)}\n"
-            relatorio += f"• Clientes com +1 atendimento: {len(clientes_recorrentes)}\n"
-            
-            if len(clientes_recorrentes) > 0:
-                relatorio += "• Maior frequência:\n"
-                for cliente, freq in clientes_recorrentes.head(3).items():
-                    relatorio += f"  - {cliente}: {freq} atendimentos\n"
-                    
-        except Exception as e:
-            relatorio += f"❌ Erro em análise de clientes recorrentes: {str(e)}\n"
-    
-    # 🆕 ANÁLISE DE DISTRIBUIÇÃO GEOGRÁFICA DETALHADA
-    if 'UF' in df.columns and 'Cliente' in df.columns:
-        try:
-            uf_clientes = df.groupby('UF')['Cliente'].nunique()
-            relatorio += f"\n🗺️ DISTRIBUIÇÃO GEOGRÁFICA AVANÇADA:\n"
-            for uf, n_clientes in uf_clientes.nlargest(5).items():
-                total_uf = len(df[df['UF'] == uf])
-                relatorio += f"• {uf}: {n_clientes} clientes únicos, {total_uf} atendimentos\n"
-                
-        except Exception as e:
-            relatorio += f"❌ Erro em análise geográfica avançada: {str(e)}\n"
-    
-    # 🆕 ANÁLISE DE COMPLEXIDADE POR MÓDULO
+        clientes = df['Cliente'].value_counts()
+        secao = _nova_secao(relatorio, "CLIENTES")
+        secao['fatos']['Clientes únicos'] = len(clientes)
+        secao['fatos']['Clientes com +1 atendimento'] = int((clientes > 1).sum())
+        _adicionar_tabela(secao, "Top 10", ['Cliente', 'Atendimentos', '%'], _linhas_contagem(clientes, 10, total))
+
+    if 'UF' in df.columns:
+        ufs = df['UF'].value_counts()
+        secao = _nova_secao(relatorio, "DISTRIBUIÇÃO GEOGRÁFICA (UF)")
+        secao['fatos']['Estados atendidos'] = len(ufs)
+        linhas = _linhas_contagem(ufs, 8, total)
+        if 'Cliente' in df.columns:
+            clientes_uf = df.groupby('UF')['Cliente'].nunique()
+            linhas = [linha + (int(clientes_uf.get(linha[0], 0)),) for linha in linhas]
+            _adicionar_tabela(secao, "Por estado", ['UF', 'Atendimentos', '%', 'Clientes únicos'], linhas)
+        else:
+            _adicionar_tabela(secao, "Por estado", ['UF', 'Atendimentos', '%'], linhas)
+
     if 'Modulos' in df.columns and 'Atendente' in df.columns:
         try:
-            relatorio += f"\n🎯 COMPLEXIDADE DOS MÓDULOS:\n"
-            modulo_stats = df.groupby('Modulos').agg({
-                'Atendente': 'nunique',
-                'Cliente': 'nunique'
-            }).round(1)
-            
-            modulo_stats = modulo_stats.nlargest(5, 'Atendente')
-            
-            for modulo, row in modulo_stats.iterrows():
-                relatorio += f"• {modulo}: {row['Atendente']} atendentes, {row['Cliente']} clientes\n"
-                
+            agregacoes = {'Atendente': 'nunique'}
+            if 'Cliente' in df.columns:
+                agregacoes['Cliente'] = 'nunique'
+            complexidade = df.groupby('Modulos').agg(agregacoes).nlargest(5, 'Atendente')
+            secao = _nova_secao(relatorio, "COMPLEXIDADE DOS MÓDULOS")
+            _adicionar_tabela(secao, "Módulos com mais atendentes", ['Módulo'] + [f"{c}s distintos" for c in complexidade.columns],
+                              [(modulo, *map(int, linha)) for modulo, linha in complexidade.iterrows()])
         except Exception as e:
-            relatorio += f"❌ Erro em análise de complexidade: {str(e)}\n"
+            _nova_secao(relatorio, "ERRO")['fatos']['Erro em análise de complexidade'] = str(e)
+
+    for coluna, titulo, n, com_percentual in [
+        ('Nucleos', "NÚCLEOS", 6, False),
+        ('Produtos', "PRODUTOS", 6, False),
+        ('Categorias', "CATEGORIAS", 6, False),
+        ('Tipos', "TIPOS DE ATENDIMENTO", 6, False),
+        ('Atendente', "ATENDENTES", 8, True),
+        ('Canais', "CANAIS DE ATENDIMENTO", None, True),
+        ('Modulos', "MÓDULOS", 6, True),
+    ]:
+        if coluna in df.columns:
+            contagens = df[coluna].value_counts()
+            secao = _nova_secao(relatorio, titulo)
+            secao['fatos']['Distintos'] = len(contagens)
+            colunas = [coluna, 'Atendimentos'] + (['%'] if com_percentual else [])
+            _adicionar_tabela(secao, "Mais frequentes", colunas,
+                              _linhas_contagem(contagens, n, total if com_percentual else None))
 
-    # ANÁLISE DE CLIENTES (mantido do original)
-    if 'Cliente' in df.columns:
-        cliente_stats = df['Cliente'].value_counts()
-        relatorio += "\n🏢 ANÁLISE DE CLIENTES:\n"
-        relatorio += f"• Total de clientes únicos: {len(cliente_stats)}\n"
-        
-        if len(cliente_stats) > 0:
-            relatorio += "• Clientes com mais atendimentos:\n"
-            for i, (cliente, quantidade) in enumerate(cliente_stats.head(10).items(), 1):
-                percentual = (quantidade / len(df)) * 100
-                relatorio += f"  {i}. {cliente}: {quantidade} atendimentos ({percentual:.1f}%)\n"
-        relatorio += "\n"
-    
-    # ANÁLISE GEOGRÁFICA AVANÇADA (mantido do original)
-    if 'UF' in df.columns:
-        uf_stats = df['UF'].value_counts()
-        relatorio += "📍 ANÁLISE GEOGRÁFICA (UF):\n"
-        relatorio += f"• Estados atendidos: {len(uf_stats)}\n"
-        relatorio += "• Distribuição por estado:\n"
-        for uf, quantidade in uf_stats.head(8).items():
-            percentual = (quantidade / len(df)) * 100
-            relatorio += f"  - {uf}: {quantidade} ({percentual:.1f}%)\n"
-        relatorio += "\n"
-    
-    # ANÁLISE DE NÚCLEOS (mantido do original)
-    if 'Nucleos' in df.columns:
-        nucleos_stats = df['Nucleos'].value_counts()
-        relatorio += "🏛️ ANÁLISE DE NÚCLEOS:\n"
-        relatorio += f"• Total de núcleos: {len(nucleos_stats)}\n"
-        if len(nucleos_stats) > 0:
-            relatorio += "• Núcleos mais atendidos:\n"
-            for i, (nucleo, quantidade) in enumerate(nucleos_stats.head(6).items(), 1):
-                relatorio += f"  {i}. {nucleo}: {quantidade} atendimentos\n"
-        relatorio += "\n"
-    
-    # ANÁLISE DE PRODUTOS (mantido do original)
-    if 'Produtos' in df.columns:
-        produtos_stats = df['Produtos'].value_counts()
-        relatorio += "📦 ANÁLISE DE PRODUTOS:\n"
-        relatorio += f"• Total de produtos: {len(produtos_stats)}\n"
-        if len(produtos_stats) > 0:
-            relatorio += "• Produtos mais frequentes:\n"
-            for i, (produto, quantidade) in enumerate(produtos_stats.head(6).items(), 1):
-                relatorio += f"  {i}. {produto}: {quantidade} atendimentos\n"
-        relatorio += "\n"
-    
-    # ANÁLISE DE CATEGORIAS (mantido do original)
-    if 'Categorias' in df.columns:
-        categorias_stats = df['Categorias'].value_counts()
-        relatorio += "📂 ANÁLISE DE CATEGORIAS:\n"
-        relatorio += f"• Total de categorias: {len(categorias_stats)}\n"
-        if len(categorias_stats) > 0:
-            relatorio += "• Categorias predominantes:\n"
-            for i, (categoria, quantidade) in enumerate(categorias_stats.head(6).items(), 1):
-                relatorio += f"  {i}. {categoria}: {quantidade} atendimentos\n"
-        relatorio += "\n"
-    
-    # ANÁLISE DE TIPOS (mantido do original)
-    if 'Tipos' in df.columns:
-        tipos_stats = df['Tipos'].value_counts()
-        relatorio += "🎯 ANÁLISE DE TIPOS DE ATENDIMENTO:\n"
-        relatorio += f"• Total de tipos: {len(tipos_stats)}\n"
-        if len(tipos_stats) > 0:
-            relatorio += "• Tipos mais comuns:\n"
-            for i, (tipo, quantidade) in enumerate(tipos_stats.head(6).items(), 1):
-                relatorio += f"  {i}. {tipo}: {quantidade} atendimentos\n"
-        relatorio += "\n"
-    
-    # ANÁLISE DE ATENDENTES DETALHADA (mantido do original)
-    if 'Atendente' in df.columns:
-        atendentes_stats = df['Atendente'].value_counts()
-        relatorio += "👥 ANÁLISE DE ATENDENTES:\n"
-        relatorio += f"• Total de atendentes: {len(atendentes_stats)}\n"
-        if len(atendentes_stats) > 0:
-            relatorio += "• Performance por atendente:\n"
-            for i, (atendente, quantidade) in enumerate(atendentes_stats.head(8).items(), 1):
-                relatorio += f"  {i}. {atendente}: {quantidade} atendimentos\n"
-        relatorio += "\n"
-    
-    # ANÁLISE DE CANAIS (mantido do original)
-    if 'Canais' in df.columns:
-        canais_stats = df['Canais'].value_counts()
-        relatorio += "📞 ANÁLISE DE CANAIS DE ATENDIMENTO:\n"
-        relatorio += f"• Total de canais: {len(canais_stats)}\n"
-        if len(canais_stats) > 0:
-            relatorio += "• Distribuição por canal:\n"
-            for canal, quantidade in canais_stats.items():
-                relatorio += f"  - {canal}: {quantidade} atendimentos\n"
-        relatorio += "\n"
-    
-    # ANÁLISE DE MÓDULOS (mantido do original)
-    if 'Modulos' in df.columns:
-        modulos_stats = df['Modulos'].value_counts()
-        relatorio += "🔧 ANÁLISE DE MÓDULOS:\n"
-        relatorio += f"• Total de módulos: {len(modulos_stats)}\n"
-        if len(modulos_stats) > 0:
-            relatorio += "• Módulos mais acessados:\n"
-            for i, (modulo, quantidade) in enumerate(modulos_stats.head(6).items(), 1):
-                relatorio += f"  {i}. {modulo}: {quantidade} atendimentos\n"
-        relatorio += "\n"
-    
-    # ANÁLISE DE CONTATOS (mantido do original)
     if 'Contato' in df.columns:
-        contato_stats = df['Contato'].value_counts()
-        relatorio += "📱 ANÁLISE DE CONTATOS:\n"
-        relatorio += f"• Total de contatos únicos: {len(contato_stats)}\n"
-        relatorio += "\n"
-    
-    # 🆕 RESUMO EXECUTIVO PARA IA
-    relatorio += "\n=== RESUMO EXECUTIVO PARA ANÁLISE IA ===\n"
-    relatorio += f"• Volume total: {len(df)} atendimentos\n"
-    if 'Data' in df.columns:
-        try:
-            df_temp = df.copy()
-            df_temp['Data'] = pd.to_datetime(df_temp['Data'], errors='coerce')
-            df_temp = df_temp.dropna(subset=['Data'])
-            if not df_temp.empty:
-                relatorio += f"• Período: {df_temp['Data'].min().strftime('%d/%m/%Y')} a {df_temp['Data'].max().strftime('%d/%m/%Y')}\n"
-        except:
-            pass
-    
-    if 'Atendente' in df.columns:
-        relatorio += f"• Equipe: {df['Atendente'].nunique()} atendentes\n"
-    
-    if 'Cliente' in df.columns:
-        relatorio += f"• Base: {df['Cliente'].nunique()} clientes\n"
-    
-    if 'Modulos' in df.columns:
-        relatorio += f"• Cobertura: {df['Modulos'].nunique()} módulos\n"
-    
+        _nova_secao(relatorio, "CONTATOS")['fatos']['Contatos únicos'] = int(df['Contato'].nunique())
+
     return relatorio
 
+
+def _celula(valor):
+    if isinstance(valor, float):
+        return f"{valor:.1f}"
+    return str(valor).replace("\t", " ").replace("\n", " ")
+
+
+def serializar_relatorio_compacto(relatorio):
+    """
+    Serializa o relatório para o modelo: fatos como 'rótulo: valor' e tabelas em TSV
+    (primeira linha = cabeçalho). Sem emojis nem palavras repetidas por linha.
+    """
+    partes = []
+    for secao in relatorio['secoes']:
+        partes.append(f"## {secao['titulo']}")
+        partes.extend(f"{rotulo}: {_celula(valor)}" for rotulo, valor in secao['fatos'].items())
+        for tabela in secao['tabelas']:
+            partes.append(f"[{tabela['nome']}]")
+            partes.append("\t".join(tabela['colunas']))
+            partes.extend("\t".join(_celula(v) for v in linha) for linha in tabela['linhas'])
+    return "\n".join(partes)
+
+
+def criar_relatorio_supercompleto(df, pergunta):
+    """Cria relatório MEGA COMPLETO com ANÁLISES TEMPORAIS AVANÇADAS, em formato compacto para o modelo"""
+
+    # Verificação de segurança
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return "⚠️ Dados não disponíveis para análise"
+
+    return serializar_relatorio_compacto(montar_relatorio_estruturado(df))
+
+# =============================================================================
+# RELATÓRIO HIERÁRQUICO (MAP-REDUCE POR MÊS) PARA PERÍODOS LONGOS
+# =============================================================================
+
+MESES_LIMITE_HIERARQUICO = _ler_config("meses_limite_hierarquico", 3)
+MAX_MESES_DETALHADOS = _ler_config("max_meses_detalhados", 12)
+MAX_RESUMOS_EM_CACHE = 256
+
+_cache_resumos_mensais = OrderedDict()
+_lock_resumos = threading.Lock()
+
+
+def usar_relatorio_hierarquico(df):
+    """Usa o modo hierárquico quando os dados filtrados cobrem mais meses que o limite configurado"""
+    if not isinstance(df, pd.DataFrame) or df.empty or 'Data' not in df.columns:
+        return False
+    meses = pd.to_datetime(df['Data'], errors='coerce').dt.to_period('M').nunique()
+    return meses > MESES_LIMITE_HIERARQUICO
+
+
+# Dimensões resumidas em cada mês: (coluna, rótulo, quantos valores mais frequentes viram linha)
+DIMENSOES_RESUMO_MENSAL = [('Atendente', 'Atendentes', 5), ('Modulos', 'Módulos', 5), ('Tipos', 'Tipos', 3),
+                           ('Canais', 'Canais', 3), ('UF', 'UFs', 3)]
+MAX_VALORES_MENSAIS = 50   # Acima disso, o mês guarda só os mais frequentes da dimensão
+
+
+def resumo_mensal(df_mes, mes):
+    """
+    Resumo de um único mês (etapa 'map'): indicadores (volume, pico, valores distintos)
+    e as contagens por valor de cada dimensão.
+    """
+    diario = df_mes.groupby(df_mes['Data'].dt.date).size()
+    indicadores = {
+        'Atendimentos': len(df_mes),
+        'Dias': len(diario),
+        'Média/dia': round(float(diario.mean()), 1),
+        'Pico': f"{diario.idxmax():%d/%m} ({diario.max()})",
+    }
+    contagens = {}
+    for coluna, rotulo, n in DIMENSOES_RESUMO_MENSAL:
+        if coluna in df_mes.columns:
+            serie = df_mes[coluna].value_counts()
+            indicadores[rotulo] = len(serie)
+            contagens[coluna] = {'completa': len(serie) <= MAX_VALORES_MENSAIS,
+                                 'valores': {str(valor): int(qtd) for valor, qtd in serie.head(MAX_VALORES_MENSAIS).items()}}
+    if 'Cliente' in df_mes.columns:
+        clientes = df_mes['Cliente'].value_counts()
+        indicadores['Clientes'] = len(clientes)
+        indicadores['Clientes recorrentes'] = int((clientes > 1).sum())
+    return {'mes': mes.strftime("%m/%Y"), 'indicadores': indicadores, 'contagens': contagens}
+
+
+def _tabela_por_mes(resumos, coluna, n):
+    """
+    Linhas = valores que estiveram entre os N mais frequentes de algum mês, colunas = meses:
+    cada valor aparece uma única vez. Célula vazia = fora dos registrados naquele mês.
+    """
+    totais = {}
+    for resumo in resumos:
+        valores = resumo['contagens'][coluna]['valores']
+        for valor in list(valores)[:n]:
+            totais.setdefault(valor, 0)
+    for valor in totais:
+        totais[valor] = sum(resumo['contagens'][coluna]['valores'].get(valor, 0) for resumo in resumos)
+
+    linhas = []
+    for valor in sorted(totais, key=totais.get, reverse=True):
+        celulas = []
+        for resumo in resumos:
+            contagem = resumo['contagens'][coluna]
+            qtd = contagem['valores'].get(valor)
+            celulas.append(qtd if qtd is not None else (0 if contagem['completa'] else ''))
+        linhas.append([valor] + celulas)
+    return linhas
+
+
+def _resumo_mensal_em_cache(df_mes, mes):
+    """Cada mês é cacheado pela sua própria impressão digital: só o mês que mudou é recalculado"""
+    chave = (str(mes), impressao_digital_dados(df_mes))
+    with _lock_resumos:
+        resumo = _cache_resumos_mensais.get(chave)
+        if resumo is not None:
+            _cache_resumos_mensais.move_to_end(chave)
+            return resumo
+
+    resumo = resumo_mensal(df_mes, mes)
+    with _lock_resumos:
+        _cache_resumos_mensais[chave] = resumo
+        while len(_cache_resumos_mensais) > MAX_RESUMOS_EM_CACHE:
+            _cache_resumos_mensais.popitem(last=False)
+    return resumo
+
+
+def montar_relatorio_hierarquico(df):
+    """
+    Relatório de tamanho limitado para períodos longos (etapa 'reduce'), na mesma estrutura de
+    montar_relatorio_estruturado: visão geral + indicadores e mais frequentes dos meses mais
+    recentes + uma linha por mês mais antigo.
+    """
+    relatorio = {'secoes': []}
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return relatorio
+
+    df_temp = df.copy()
+    df_temp['Data'] = pd.to_datetime(df_temp['Data'], errors='coerce')
+    df_temp = df_temp.dropna(subset=['Data'])
+    if df_temp.empty:
+        return relatorio
+    meses = df_temp['Data'].dt.to_period('M')
+    por_mes = df_temp.groupby(meses, sort=True)
+    totais = por_mes.size()
+
+    geral = _nova_secao(relatorio, "VISÃO GERAL (RESUMOS MENSAIS)")
+    geral['fatos']['Total de registros'] = len(df_temp)
+    geral['fatos']['Período'] = f"{df_temp['Data'].min():%d/%m/%Y} a {df_temp['Data'].max():%d/%m/%Y}"
+    geral['fatos']['Meses cobertos'] = len(totais)
+    for coluna, rotulo in [('Atendente', 'Atendentes'), ('Modulos', 'Módulos'), ('Cliente', 'Clientes')]:
+        if coluna in df_temp.columns:
+            contagens = df_temp[coluna].value_counts()
+            geral['fatos'][rotulo] = len(contagens)
+            _adicionar_tabela(geral, f"Top {rotulo.lower()}", [coluna, 'Atendimentos'], _linhas_contagem(contagens, 5))
+
+    meses_detalhados = list(totais.index)[-MAX_MESES_DETALHADOS:]
+    anteriores = totais.iloc[:-len(meses_detalhados)]
+    if len(anteriores):
+        volume = _nova_secao(relatorio, "VOLUME DOS MESES ANTERIORES")
+        _adicionar_tabela(volume, "Meses", ['Mês', 'Atendimentos'],
+                          [(mes.strftime("%m/%Y"), int(total)) for mes, total in anteriores.items()])
+
+    resumos = [_resumo_mensal_em_cache(por_mes.get_group(mes), mes) for mes in meses_detalhados]
+    mensal = _nova_secao(relatorio, f"RESUMOS DOS ÚLTIMOS {len(meses_detalhados)} MESES")
+    rotulos = list(resumos[0]['indicadores'])
+    _adicionar_tabela(mensal, "Indicadores", ['Mês'] + rotulos,
+                      [[resumo['mes']] + [resumo['indicadores'][r] for r in rotulos] for resumo in resumos])
+    for coluna, rotulo, n in DIMENSOES_RESUMO_MENSAL:
+        if coluna in df_temp.columns:
+            _adicionar_tabela(mensal, f"{rotulo}: atendimentos por mês (top {n} de cada mês)",
+                              [coluna] + [resumo['mes'] for resumo in resumos], _tabela_por_mes(resumos, coluna, n))
+
+    return relatorio
+
+
+def criar_relatorio_hierarquico(df, pergunta):
+    """Relatório hierárquico (por mês) em formato compacto para o modelo"""
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return "⚠️ Dados não disponíveis para análise"
+
+    return serializar_relatorio_compacto(montar_relatorio_hierarquico(df))
+
 # 🆕 FUNÇÃO ADICIONAL PARA DETECÇÃO DE ANOMALIAS
 def detectar_anomalias(df):
     """Detecta padrões incomuns nos dados"""
@@ -506,10 +1717,61 @@ def detectar_anomalias(df):
     
     return insights
 
-def analise_local_supercompleta(pergunta, df_filtrado, is_fallback_mode=False):
+def _partes_fixas_analise_local(df):
+    """Alertas e insights adicionais da análise local: dependem só dos dados, não da pergunta"""
+    alertas = ""
+    anomalias = detectar_anomalias(df)
+    if anomalias:
+        alertas += "🚨 **ALERTAS DETECTADOS:**\n"
+        for alerta in anomalias:
+            alertas += f"• {alerta}\n"
+        alertas += "\n"
+
+    insights = "\n💡 **Insights Adicionais:**\n"
+    if 'Data' in df.columns:
+        try:
+            datas = pd.to_datetime(df['Data'], errors='coerce').dropna()
+            if not datas.empty:
+                dias_unicos = datas.dt.date.nunique()
+                insights += f"• **Período analisado:** {dias_unicos} dias\n"
+
+                if dias_unicos > 0:
+                    media_diaria = len(df) / dias_unicos
+                    insights += f"• **Média diária:** {media_diaria:.1f} atendimentos/dia\n"
+        except:
+            pass
+
+    if 'Canais' in df.columns:
+        canal_principal = df['Canais'].value_counts().head(1)
+        if len(canal_principal) > 0:
+            insights += f"• **Canal principal:** {canal_principal.index[0]} ({canal_principal.iloc[0]} atendimentos)\n"
+
+    return alertas, insights
+
+
+def _obter_partes_fixas(df, chave_dados=None):
+    """Partes fixas da análise local; com a impressão digital dos dados, reaproveita o pré-cálculo"""
+    if chave_dados is None:
+        return _partes_fixas_analise_local(df)
+    with _lock_relatorios:
+        partes = _cache_analises_locais.get(chave_dados)
+        if partes is not None:
+            _cache_analises_locais.move_to_end(chave_dados)
+            return partes
+
+    partes = _partes_fixas_analise_local(df)
+    with _lock_relatorios:
+        _cache_analises_locais[chave_dados] = partes
+        while len(_cache_analises_locais) > MAX_RELATORIOS_EM_CACHE:
+            _cache_analises_locais.popitem(last=False)
+    return partes
+
+
+def analise_local_supercompleta(pergunta, df_filtrado, is_fallback_mode=False, chave_dados=None):
     """
     Fallback completo para análise local.
     A mensagem de erro da API só é incluída se is_fallback_mode for True.
+    Com chave_dados (impressão digital do recorte), alertas e insights vêm do pré-cálculo.
     """
     try:
         print(f"🔧 Entrando no fallback local - Tipo: {type(df_filtrado)}")
@@ -524,13 +1786,9 @@ def analise_local_supercompleta(pergunta, df_filtrado, is_fallback_mode=False):
         # Alterei o título para indicar que é um fallback
         resposta = "📊 **Análise Local Detalhada (Modo Fallback):**\n\n"
         
-        # 🆕 DETECÇÃO DE ANOMALIAS NO FALLBACK
-        anomalias = detectar_anomalias(df_filtrado)
-        if anomalias:
-            resposta += "🚨 **ALERTAS DETECTADOS:**\n"
-            for alerta in anomalias:
-                resposta += f"• {alerta}\n"
-            resposta += "\n"
+        # 🆕 DETECÇÃO DE ANOMALIAS NO FALLBACK (e insights gerais, que não dependem da pergunta)
+        alertas, insights = _obter_partes_fixas(df_filtrado, chave_dados)
+        resposta += alertas
         
         # PERGUNTA ESPECÍFICA SOBRE CLIENTES
         if any(palavra in pergunta_lower for palavra in ['cliente', 'clientes']):
@@ -569,28 +1827,7 @@ def analise_local_supercompleta(pergunta, df_filtrado, is_fallback_mode=False):
                 resposta += f"• **Módulos atendidos:** {df_filtrado['Modulos'].nunique()}\n"
         
         # 🆕 INSIGHTS ADICIONAIS NO FALLBACK
-        resposta += "\n💡 **Insights Adicionais:**\n"
-        
-        if 'Data' in df_filtrado.columns:
-            try:
-                df_temp = df_filtrado.copy()
-                df_temp['Data'] = pd.to_datetime(df_temp['Data'], errors='coerce')
-                df_temp = df_temp.dropna(subset=['Data'])
-                
-                if not df_temp.empty:
-                    dias_unicos = df_temp['Data'].dt.date.nunique()
-                    resposta += f"• **Período analisado:** {dias_unicos} dias\n"
-                    
-                    if dias_unicos > 0:
-                        media_diaria = len(df_filtrado) / dias_unicos
-                        resposta += f"• **Média diária:** {media_diaria:.1f} atendimentos/dia\n"
-            except:
-                pass
-        
-        if 'Canais' in df_filtrado.columns:
-            canal_principal = df_filtrado['Canais'].value_counts().head(1)
-            if len(canal_principal) > 0:
-                resposta += f"• **Canal principal:** {canal_principal.index[0]} ({canal_principal.iloc[0]} atendimentos)\n"
+        resposta += insights
         
         if is_fallback_mode:
             resposta += "\n🔑 **ERRO DE CONFIGURAÇÃO:** A chave Gemini não foi encontrada, é inválida, ou o Streamlit falhou na comunicação. "
@@ -0,0 +1,200 @@
+"""
+Modo de perfil do dashboard: mede o tempo de cada etapa do main em um rerun.
+
+Ativado com ?perfil=1 na URL ou DASHBOARD_PERFIL=1 no ambiente. Com "cprofile" ou
+"pyinstrument" no lugar de "1", o rerun inteiro também é perfilado e salvo em disco
+(pela URL, só em modo administrador, já que grava arquivos no servidor).
+"""
+
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+
+from etapas_perfil import _perfil_atual, etapa
+
+PASTA_PERFIS = os.path.join("cache", "perfis")
+MODOS_COM_ARQUIVO = ('cprofile', 'pyinstrument')
+
+# Um profiler por vez no processo: o Python não permite dois perfis ativos ao mesmo tempo
+# (sys.monitoring a partir do 3.12), e um perfil de processo misturaria as duas sessões
+_lock_profiler = threading.Lock()
+
+
+class PerfilExecucao:
+    """Etapas de um rerun: nome, início relativo, duração e nível de aninhamento"""
+
+    def __init__(self, modo):
+        self.modo = modo
+        self.inicio = time.perf_counter()
+        self.etapas = []
+        self.nivel = 0
+        self.arquivo = None
+        self._profiler = None
+
+    def iniciar_profiler(self):
+        if self.modo not in MODOS_COM_ARQUIVO:
+            return
+        if self.modo == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("⚠️ pyinstrument não instalado; usando apenas os tempos por etapa")
+                return
+        if not _lock_profiler.acquire(blocking=False):
+            print("⚠️ Outra sessão está sendo perfilada; usando apenas os tempos por etapa")
+            return
+        try:
+            if self.modo == 'cprofile':
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+            else:
+                self._profiler = Profiler()
+                self._profiler.start()
+        except Exception:
+            self._profiler = None
+            _lock_profiler.release()
+            raise
+
+    def encerrar_profiler(self):
+        if self._profiler is None:
+            return
+        try:
+            os.makedirs(PASTA_PERFIS, exist_ok=True)
+            nome = f"rerun_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+            if self.modo == 'cprofile':
+                self._profiler.disable()
+                self.arquivo = os.path.join(PASTA_PERFIS, f"{nome}.prof")
+                self._profiler.dump_stats(self.arquivo)
+            else:
+                self._profiler.stop()
+                self.arquivo = os.path.join(PASTA_PERFIS, f"{nome}.html")
+                with open(self.arquivo, 'w', encoding='utf-8') as arquivo:
+                    arquivo.write(self._profiler.output_html())
+        finally:
+            self._profiler = None
+            _lock_profiler.release()
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+
+def modo_perfil(admin=False):
+    """'tempos', 'cprofile', 'pyinstrument' ou None (desligado)"""
+    modo = os.getenv('DASHBOARD_PERFIL')
+    via_url = False
+    if not modo:
+        try:
+            modo = st.query_params.get('perfil')
+            via_url = True
+        except Exception:
+            modo = None
+
+    if not modo or str(modo).lower() in ('0', 'false', 'nao', 'não'):
+        return None
+    modo = str(modo).lower()
+    if modo in MODOS_COM_ARQUIVO:
+        return modo if (admin or not via_url) else 'tempos'
+    return 'tempos'
+
+
+# st.plotly_chart é do processo: fica instrumentado só enquanto algum rerun perfilado estiver em
+# andamento (contagem abaixo) e volta ao original quando o último termina
+_plotly_original = None
+_reruns_instrumentados = 0
+_lock_plotly = threading.Lock()
+
+
+def _instrumentar_plotly():
+    """Separa a serialização dos gráficos (st.plotly_chart) do restante de cada aba"""
+    global _plotly_original, _reruns_instrumentados
+    with _lock_plotly:
+        _reruns_instrumentados += 1
+        if _plotly_original is not None:
+            return
+        original = _plotly_original = st.plotly_chart
+
+        def plotly_chart_medido(*args, **kwargs):
+            with etapa("plotly_chart"):
+                return original(*args, **kwargs)
+
+        st.plotly_chart = plotly_chart_medido
+
+
+def _restaurar_plotly():
+    global _plotly_original, _reruns_instrumentados
+    with _lock_plotly:
+        _reruns_instrumentados -= 1
+        if _reruns_instrumentados == 0 and _plotly_original is not None:
+            st.plotly_chart = _plotly_original
+            _plotly_original = None
+
+
+@contextmanager
+def perfil_do_rerun(admin=False):
+    """Envolve o rerun inteiro; ao final mostra a cascata de etapas na sidebar"""
+    modo = modo_perfil(admin)
+    if modo is None:
+        yield None
+        return
+
+    _instrumentar_plotly()
+    perfil = PerfilExecucao(modo)
+    _perfil_atual.perfil = perfil
+    try:
+        perfil.iniciar_profiler()
+        yield perfil
+    finally:
+        perfil.encerrar_profiler()
+        _perfil_atual.perfil = None
+        _restaurar_plotly()
+        mostrar_cascata(perfil)
+
+
+def _agrupar_repetidas(etapas):
+    """Junta chamadas seguidas da mesma etapa (ex.: vários plotly_chart de uma aba) em uma barra"""
+    agrupadas = []
+    for item in sorted(etapas, key=lambda e: e['inicio_ms']):
+        anterior = agrupadas[-1] if agrupadas else None
+        if anterior is not None and anterior['nome'] == item['etapa'] and anterior['nivel'] == item['nivel']:
+            anterior['duracao_ms'] += item['duracao_ms']
+            anterior['chamadas'] += 1
+            anterior['etapa'] = f"{item['etapa']} ×{anterior['chamadas']}"
+            continue
+        agrupadas.append({**item, 'nome': item['etapa'], 'chamadas': 1})
+    return agrupadas
+
+
+def mostrar_cascata(perfil):
+    import pandas as pd
+    import plotly.graph_objects as go
+
+    total_ms = perfil.total_ms
+    etapas = pd.DataFrame(_agrupar_repetidas(perfil.etapas))
+    with st.sidebar.expander(f"⏱️ Tempo por etapa ({total_ms / 1000:.2f}s)", expanded=True):
+        if etapas.empty:
+            st.caption("Nenhuma etapa medida neste rerun.")
+        else:
+            rotulos = ["· " * nivel + nome for nome, nivel in zip(etapas['etapa'], etapas['nivel'])]
+            fig = go.Figure(go.Bar(
+                y=rotulos,
+                x=etapas['duracao_ms'],
+                base=etapas['inicio_ms'],
+                orientation='h',
+                text=[f"{d:.0f} ms" for d in etapas['duracao_ms']],
+                textposition='outside',
+            ))
+            fig.update_layout(
+                height=max(200, 24 * len(etapas)),
+                margin=dict(l=0, r=0, t=10, b=0),
+                xaxis_title="ms desde o início do rerun",
+                yaxis=dict(autorange='reversed'),
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        if perfil.arquivo:
+            st.caption(f"📄 Perfil salvo em `{perfil.arquivo}`")
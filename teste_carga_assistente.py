@@ -0,0 +1,156 @@
+"""
+Teste de carga do assistente com o modelo simulado (sem rede, sem chave de API).
+
+Dispara N perguntas simultâneas por consultar_assistente e resume, a partir da telemetria,
+como o tempo se distribuiu entre fila, relatório e modelo, além de acertos de cache,
+consultas unificadas (single-flight) e fallbacks:
+
+    python teste_carga_assistente.py --perguntas 60 --concorrencia 20 --sessoes 10
+    python teste_carga_assistente.py --latencia 3 --taxa-erro 0.3 --saida resultado_carga.json
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import modelo_simulado
+import novo_assistente
+
+# Mistura de perguntas abertas (vão ao modelo) e quantitativas (motor local)
+PERGUNTAS_CARGA = [
+    "Por que os atendimentos caíram na última semana?",
+    "Explique a distribuição de atendimentos por módulo e sugira melhorias",
+    "Que padrões sazonais existem nos atendimentos?",
+    "Recomende como redistribuir a carga entre os atendentes",
+    "Existe alguma tendência preocupante nos dados?",
+    "Quais os top 5 atendentes?",
+    "Quantos atendimentos tivemos por UF?",
+    "Qual a média diária de atendimentos?",
+]
+
+
+def dados_de_teste(linhas, semente):
+    """Recorte sintético com as colunas usadas pelo relatório do assistente"""
+    gerador = np.random.default_rng(semente)
+    inicio = pd.Timestamp('2025-01-01')
+    return pd.DataFrame({
+        'Data': inicio + pd.to_timedelta(gerador.integers(0, 180, linhas), unit='D'),
+        'Atendente': gerador.choice([f"Atendente {i}" for i in range(12)], linhas),
+        'Modulos': gerador.choice(['Fiscal', 'Folha', 'Estoque', 'Financeiro', 'Vendas'], linhas),
+        'UF': gerador.choice(['SP', 'RJ', 'MG', 'PR', 'BA'], linhas),
+        'Categorias': gerador.choice(['Dúvida', 'Erro', 'Melhoria'], linhas),
+        'Tipos': gerador.choice(['Telefone', 'Chat', 'E-mail'], linhas),
+        'Canais': gerador.choice(['Interno', 'Externo'], linhas),
+        'Cliente': gerador.choice([f"Cliente {i}" for i in range(300)], linhas),
+    })
+
+
+def _percentis(serie):
+    valores = pd.to_numeric(serie, errors='coerce').dropna()
+    if valores.empty:
+        return {}
+    return {f"p{p}": round(float(np.percentile(valores, p)), 1) for p in (50, 95, 99)}
+
+
+def executar_carga(perguntas, concorrencia, sessoes, df, tipo_modelo, modo, semente):
+    """Dispara as perguntas com `concorrencia` threads, cada uma como uma das `sessoes` sessões"""
+    sorteio = random.Random(semente)
+    tarefas = [
+        (sorteio.choice(PERGUNTAS_CARGA), f"sessao-{sorteio.randrange(sessoes)}")
+        for _ in range(perguntas)
+    ]
+
+    def consultar(tarefa):
+        pergunta, sessao_id = tarefa
+        return novo_assistente.consultar_assistente(
+            pergunta, df, tipo_modelo=tipo_modelo, sessao_id=sessao_id, modo=modo
+        )
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix="carga") as executor:
+        respostas = list(executor.map(consultar, tarefas))
+    return respostas, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do assistente com o modelo simulado")
+    parser.add_argument('--perguntas', type=int, default=40)
+    parser.add_argument('--concorrencia', type=int, default=10, help="Perguntas disparadas ao mesmo tempo")
+    parser.add_argument('--sessoes', type=int, default=5, help="Sessões distintas na fila justa")
+    parser.add_argument('--linhas', type=int, default=20000, help="Registros do recorte sintético")
+    parser.add_argument('--modelo', choices=['pro', 'flash'], default='pro')
+    parser.add_argument('--modo', choices=['relatorio', 'ferramentas'], default='relatorio')
+    parser.add_argument('--latencia', type=float, default=None, help="Latência média do modelo simulado (s)")
+    parser.add_argument('--ttft', type=float, default=None, help="Tempo até o primeiro trecho (s)")
+    parser.add_argument('--taxa-erro', type=float, default=None, help="Probabilidade de erro por chamada")
+    parser.add_argument('--sem-motor-local', action='store_true', help="Envia todas as perguntas ao modelo")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', help="Grava o resumo em JSON")
+    args = parser.parse_args()
+
+    # Modelo simulado e telemetria isolada deste teste
+    novo_assistente.BACKEND_MODELO = 'simulado'
+    novo_assistente.TELEMETRIA_ATIVA = True
+    novo_assistente.ARQUIVO_TELEMETRIA = os.path.join(tempfile.mkdtemp(prefix="carga_"), "telemetria.sqlite")
+    if args.sem_motor_local:
+        novo_assistente.MOTOR_LOCAL_ATIVO = False
+    if args.latencia is not None:
+        modelo_simulado.SIMULADO_LATENCIA_S = args.latencia
+    if args.ttft is not None:
+        modelo_simulado.SIMULADO_TTFT_S = args.ttft
+    if args.taxa_erro is not None:
+        modelo_simulado.SIMULADO_TAXA_ERRO = args.taxa_erro
+    modelo_simulado._aleatorio.seed(args.semente)
+
+    tipo_modelo = novo_assistente.MODELO_PRO if args.modelo == 'pro' else novo_assistente.MODELO_FLASH
+    df = dados_de_teste(args.linhas, args.semente)
+
+    print(f"🚀 {args.perguntas} perguntas, {args.concorrencia} simultâneas, {args.sessoes} sessões, "
+          f"{len(df)} registros ({args.modelo}, modo {args.modo})")
+    _, duracao = executar_carga(args.perguntas, args.concorrencia, args.sessoes, df,
+                                tipo_modelo, args.modo, args.semente)
+
+    telemetria = novo_assistente.carregar_telemetria(limite=args.perguntas)
+    cache = telemetria['cache_relatorio'].dropna()
+    resumo = {
+        'perguntas': args.perguntas,
+        'concorrencia': args.concorrencia,
+        'duracao_s': round(duracao, 2),
+        'vazao_por_s': round(args.perguntas / duracao, 2),
+        'origem': telemetria['origem'].fillna('-').value_counts().to_dict(),
+        'motivos_fallback': telemetria['motivo_fallback'].dropna().value_counts().to_dict(),
+        'acerto_cache_relatorio': round(float((cache == 'hit').mean()), 3) if len(cache) else None,
+        'modelo_simulado': modelo_simulado.estatisticas.resumo(),
+        'circuit_breaker': 'aberto' if novo_assistente.breaker_gemini.segundos_restantes() > 0 else 'fechado',
+        'tempos_ms': {
+            metrica: _percentis(telemetria[metrica])
+            for metrica in ('total_ms', 'fila_ms', 'relatorio_ms', 'modelo_ms', 'ttft_ms')
+        },
+    }
+
+    print(f"\n⏱️ {resumo['duracao_s']}s no total ({resumo['vazao_por_s']} perguntas/s)")
+    print(f"📊 Origem das respostas: {resumo['origem']}")
+    if resumo['motivos_fallback']:
+        print(f"⚠️ Fallbacks: {resumo['motivos_fallback']}")
+    print(f"♻️ Acerto do cache de relatório: {resumo['acerto_cache_relatorio']}")
+    print(f"🤖 Modelo simulado: {resumo['modelo_simulado']}")
+    print(f"🔌 Circuit breaker: {resumo['circuit_breaker']}")
+    for metrica, percentis in resumo['tempos_ms'].items():
+        if percentis:
+            print(f"   {metrica:<13} " + "  ".join(f"{p}={v:>8.1f}" for p, v in percentis.items()))
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resumo, arquivo, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resumo salvo em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
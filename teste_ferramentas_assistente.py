@@ -0,0 +1,118 @@
+"""
+Verificação offline do modo ferramentas do assistente (sem rede, sem chave de API).
+
+Roda roteiros do ModeloRoteirizado por consultar_com_ferramentas e confere se os resultados
+de count_by, top_n e daily_series devolvidos ao modelo batem com o cálculo direto no pandas,
+e se argumentos malformados voltam como {"erro": ...} em vez de derrubar a consulta:
+
+    python teste_ferramentas_assistente.py
+    python teste_ferramentas_assistente.py --linhas 50000
+"""
+
+import argparse
+import json
+import sys
+
+import pandas as pd
+
+import novo_assistente
+from teste_carga_assistente import dados_de_teste
+
+
+def _resultados_enviados(modelo):
+    """Resultados das ferramentas como o modelo os recebeu, lidos do último prompt"""
+    prompt = modelo.prompts[-1]
+    if "CHAMADAS JÁ FEITAS:" not in prompt:
+        return []
+    bloco = prompt.split("CHAMADAS JÁ FEITAS:\n", 1)[1]
+    resultados = []
+    for linha in bloco.splitlines():
+        if " -> " in linha:
+            resultados.append(json.loads(linha.split(" -> ", 1)[1]))
+    return resultados
+
+
+def _rodar(df, chamadas):
+    """Executa um roteiro: as chamadas de ferramenta em ordem e depois a resposta final"""
+    roteiro = [{"ferramenta": nome, "argumentos": argumentos} for nome, argumentos in chamadas]
+    roteiro.append({"resposta": "ok"})
+    modelo = novo_assistente.ModeloRoteirizado(roteiro)
+    resposta = novo_assistente.consultar_com_ferramentas(
+        "pergunta de teste", df, modelo, max_passos=len(roteiro)
+    )
+    return resposta, _resultados_enviados(modelo)
+
+
+def cenarios(df):
+    """(descrição, chamadas, função que confere os resultados) de cada roteiro"""
+    datas = pd.to_datetime(df['Data']).dt.date
+    inicio, fim = datas.min(), datas.min() + pd.Timedelta(days=29)
+    periodo = {"inicio": inicio.isoformat(), "fim": fim.isoformat()}
+    no_periodo = df[(datas >= inicio) & (datas <= fim)]
+    sp = df[df['UF'] == 'SP']
+    por_modulo = df['Modulos'].value_counts()
+    top_atendentes = sp['Atendente'].value_counts().head(3)
+    diario = no_periodo.groupby(pd.to_datetime(no_periodo['Data']).dt.date).size()
+
+    return [
+        (
+            "count_by total e por módulo",
+            [("count_by", {}), ("count_by", {"dimension": "Modulos"})],
+            lambda r: (
+                r[0] == {"total": len(df)}
+                and r[1]["contagens"] == {str(k): int(v) for k, v in por_modulo.items()}
+            ),
+        ),
+        (
+            "top_n com filtro",
+            [("top_n", {"dimension": "Atendente", "n": 3, "filters": {"UF": "SP"}})],
+            lambda r: (
+                r[0]["total"] == len(sp)
+                and [(t["valor"], t["atendimentos"]) for t in r[0]["top"]]
+                == [(str(k), int(v)) for k, v in top_atendentes.items()]
+            ),
+        ),
+        (
+            "daily_series em um período",
+            [("daily_series", {"period": periodo})],
+            lambda r: r[0]["serie"] == {d.isoformat(): int(v) for d, v in diario.sort_index().items()},
+        ),
+        (
+            "argumentos malformados voltam como erro",
+            [
+                ("count_by", {"filters": ["UF", "SP"]}),
+                ("top_n", {"dimension": "Inexistente"}),
+                ("daily_series", {"period": "quando der"}),
+                ("media", {}),
+            ],
+            lambda r: len(r) == 4 and all("erro" in resultado for resultado in r),
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica o modo ferramentas com o modelo roteirizado")
+    parser.add_argument('--linhas', type=int, default=5000, help="Registros do recorte sintético")
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    df = dados_de_teste(args.linhas, args.semente)
+    falhas = 0
+    for descricao, chamadas, conferir in cenarios(df):
+        try:
+            resposta, resultados = _rodar(df, chamadas)
+            correto = resposta == "ok" and conferir(resultados)
+        except Exception as e:
+            print(f"   {type(e).__name__}: {e}")
+            correto = False
+        print(f"{'✅' if correto else '❌'} {descricao}")
+        falhas += not correto
+
+    if falhas:
+        print(f"\n❌ {falhas} cenário(s) com divergência")
+        sys.exit(1)
+    print("\n✅ Ferramentas conferem com o cálculo direto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Verificação offline do motor local de intenções (sem rede, sem chave de API).
+
+Confere que perguntas com um valor que não vira filtro (cliente, atendente inexistente, estado
+fora da base) vão para o Gemini em vez de receber o total sem o recorte, que a sigla de UF em
+minúsculas filtra como em maiúsculas e que nomes de valores com termos analíticos (módulo
+"Previsão de Vendas") não mandam uma contagem simples para o Gemini:
+
+    python teste_motor_intencoes.py
+"""
+
+import argparse
+import sys
+from datetime import date
+
+from motor_intencoes import responder_pergunta_local
+from teste_carga_assistente import dados_de_teste
+
+DATA_REFERENCIA = date(2025, 7, 1)
+
+
+def _total(resposta):
+    """Total de atendimentos da resposta local (None se a pergunta foi para o Gemini)"""
+    if resposta is None:
+        return None
+    for linha in resposta.splitlines():
+        if "**Total de atendimentos:**" in linha:
+            return int(linha.rsplit(" ", 1)[1])
+    return None
+
+
+def cenarios(df):
+    """(pergunta, função que confere a resposta local ou None) de cada caso"""
+    sp = int((df['UF'] == 'SP').sum())
+    previsao = int((df['Modulos'] == 'Previsão de Vendas').sum())
+    vai_para_gemini = lambda resposta: resposta is None  # noqa: E731
+
+    return [
+        ("Quantos atendimentos do cliente Cliente 7?", vai_para_gemini),
+        ("Quantos atendimentos o atendente Fulano de Tal fez?", vai_para_gemini),
+        ("Quantos atendimentos no estado de Goiás?", vai_para_gemini),
+        ("Por que os atendimentos caíram?", vai_para_gemini),
+        ("Compare SP e RJ", vai_para_gemini),
+        ("quantos atendimentos em sp?", lambda resposta: _total(resposta) == sp),
+        ("Quantos atendimentos em SP?", lambda resposta: _total(resposta) == sp),
+        ("Quantos atendimentos do módulo Previsão de Vendas?", lambda resposta: _total(resposta) == previsao),
+        ("Quantos clientes distintos?", lambda resposta: _total(resposta) == len(df)),
+        ("Quantos atendimentos por atendente?", lambda resposta: resposta is not None),
+        ("Top 3 atendentes do módulo Fiscal", lambda resposta: resposta is not None and "Fiscal" in resposta),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica as respostas do motor local de intenções")
+    parser.add_argument('--linhas', type=int, default=3000, help="Registros do recorte sintético")
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    df = dados_de_teste(args.linhas, args.semente)
+    df.loc[df.index[::10], 'Modulos'] = 'Previsão de Vendas'
+
+    falhas = 0
+    for pergunta, conferir in cenarios(df):
+        resposta = responder_pergunta_local(pergunta, df, data_referencia=DATA_REFERENCIA)
+        correto = conferir(resposta)
+        destino = "Gemini" if resposta is None else f"local (total: {_total(resposta)})"
+        print(f"{'✅' if correto else '❌'} {pergunta} -> {destino}")
+        falhas += not correto
+
+    if falhas:
+        print(f"\n❌ {falhas} pergunta(s) com resposta inesperada")
+        sys.exit(1)
+    print("\n✅ Motor local responde só o que consegue responder")
+
+
+if __name__ == "__main__":
+    main()